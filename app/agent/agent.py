@@ -1,36 +1,42 @@
+import asyncio
+import base64
 import datetime
-import hashlib
 import json
 import operator
 import logging
-from typing import TypedDict, Annotated, Sequence, List, Union, Dict, Any, Optional
+import time
+from typing import TypedDict, Annotated, Sequence, List, Union, Dict, Any, Optional, AsyncIterator
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
 from utils.files import get_emails
 from utils.settings import WrappedSettings as Settings
-from utils.tool_cache import ToolResultCache
+from utils.tool_cache import get_tool_cache
 from agent.llm_factory import LLMFactory
+from agent.parallel_tools import ParallelToolNode
 from agent.prompt import AGENT_SYSTEM_PROMPT
 from tools.manager import agent_tools
-from tools.google_tools import (
-    CheckCalendar,
-    CreateEvent,
-    BuscarNoDrive,
-)
-from tools.gmail import CheckEmail, SendEmail
 from services.google_auth import GoogleCredentialManager
 from services.audit_callback import SQLAuditCallbackHandler
-from threading import Lock
+from services.request_context import user_credentials_context
 import html
 
 logger = logging.getLogger(__name__)
 
+DIAS_PT = {
+    "Monday": "Segunda-feira", "Tuesday": "Terça-feira",
+    "Wednesday": "Quarta-feira", "Thursday": "Quinta-feira",
+    "Friday": "Sexta-feira", "Saturday": "Sábado", "Sunday": "Domingo"
+}
+
 
 class AgentState(TypedDict):
     """Estado do agente com histórico de mensagens"""
     messages: Annotated[Sequence[BaseMessage], operator.add]
+    # Resumo das mensagens antigas da sessão, que não vão na íntegra em
+    # `messages` (ver agent/context.py).
+    summary: Optional[str]
 
 
 class AgentFactory:
@@ -39,10 +45,17 @@ class AgentFactory:
     
     Características:
     - Suporte a múltiplos modelos LLM
-    - Cache inteligente com TTL
+    - Cache de resultados de ferramentas compartilhado pelo processo
+      (política por ferramenta em agent/tool_cache_policy.py)
     - Validação de credenciais
     - Error handling robusto
     - Rate limiting (delegado a main.py)
+
+    Uma instância por modelo é compartilhada entre requisições e usuários
+    (ver agent/pool.py): nada específico de uma sessão fica guardado nela --
+    as credenciais Google viajam pelo contexto da requisição
+    (services/request_context.py) e o contexto temporal do prompt é
+    preenchido a cada chamada.
     """
     
     def __init__(self, llm: str = "gemini"):
@@ -66,29 +79,9 @@ class AgentFactory:
             logger.error(f"Erro ao inicializar LLM: {e}")
             raise
         
-        # 2. Ferramentas que precisam de credenciais do usuário (Runtime)
-        self.create_event_tool = CreateEvent()
-        self.check_calendar_tool = CheckCalendar()
-        self.check_email_tool = CheckEmail()
-        self.send_email_tool = SendEmail()
-        self.buscar_drive_tool = BuscarNoDrive()
-        
-        # 3. Ferramentas Globais + Ferramentas de Sessão
-        global_tools = [
-            t for t in agent_tools
-            if t.name not in [
-                "CriarEvento", "ConsultarAgenda",
-                "ConsultarEmail", "EnviarEmail", "BuscarNoDrive"
-            ]
-        ]
-        
-        self.tools = global_tools + [
-            self.create_event_tool, 
-            self.check_calendar_tool, 
-            self.check_email_tool, 
-            self.send_email_tool,
-            self.buscar_drive_tool
-        ]
+        # 2. Ferramentas (as de Google leem as credenciais do contexto da
+        #    requisição, então as mesmas instâncias servem a todos os usuários)
+        self.tools = list(agent_tools)
         
         # Vincular ferramentas ao modelo
         try:
@@ -104,44 +97,50 @@ class AgentFactory:
             logger.error(f"Erro ao vincular ferramentas: {e}", exc_info=True)
             self.llm_with_tools = self.llm
         
-        # 4. Cache inteligente com TTL
-        self.cache = ToolResultCache(default_ttl_minutes=10)
-        self.cache_lock = Lock()
-        
-        # 5. Contexto Temporal e Dinâmico
+        # 4. Prompt do sistema (contexto temporal preenchido a cada chamada)
         self._initialize_system_prompt()
         
-        # 6. Criar grafo do agente
+        # 5. Criar grafo do agente
         self.graph = self._create_graph()
         
         logger.info("✅ AgentFactory inicializado com sucesso")
 
     def _initialize_system_prompt(self) -> None:
-        """Inicializa prompt do sistema com contexto dinâmico"""
+        """
+        Monta o template do prompt do sistema. As variáveis (data/hora e
+        contatos) ficam em aberto e são preenchidas por `_prompt_context()` a
+        cada chamada -- a factory vive por muito tempo no pool, então fixar a
+        data aqui deixaria o "Hoje" do prompt desatualizado.
+
+        O resumo da conversa (quando houver) entra no final do MESMO prompt
+        do sistema -- nem todo provedor aceita uma segunda mensagem de sistema
+        no meio do histórico.
+        """
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", AGENT_SYSTEM_PROMPT + "{resumo_conversa}"),
+            MessagesPlaceholder(variable_name="messages"),
+        ])
+
+    def _get_emails_str(self) -> str:
+        """Lista de contatos para o prompt (get_emails já é cacheado -- ver utils/files.py)."""
         try:
-            emails_str = get_emails(True)
+            return json.dumps(get_emails(), ensure_ascii=False)
         except Exception as e:
             logger.warning(f"Não foi possível carregar emails: {e}")
-            emails_str = ""
-        
+            return ""
+
+    def _prompt_context(self, summary: Optional[str] = None) -> Dict[str, str]:
+        """Variáveis do prompt do sistema para a chamada atual."""
         agora = datetime.datetime.now()
-        dias_pt = {
-            "Monday": "Segunda-feira", "Tuesday": "Terça-feira",
-            "Wednesday": "Quarta-feira", "Thursday": "Quinta-feira",
-            "Friday": "Sexta-feira", "Saturday": "Sábado", "Sunday": "Domingo"
+        return {
+            "dia_hoje_pt": DIAS_PT.get(agora.strftime("%A"), ""),
+            "data_hoje": agora.strftime("%d/%m/%Y"),
+            "hora_agora": agora.strftime("%H:%M"),
+            "emails_str": self._get_emails_str(),
+            "resumo_conversa": (
+                f"\n\n### 🗂️ RESUMO DA CONVERSA ATÉ AQUI\n{summary}\n" if summary else ""
+            ),
         }
-        
-        formatted_system_prompt = AGENT_SYSTEM_PROMPT.format(
-            dia_hoje_pt=dias_pt.get(agora.strftime("%A"), ""),
-            data_hoje=agora.strftime("%d/%m/%Y"),
-            hora_agora=agora.strftime("%H:%M"),
-            emails_str=emails_str
-        )
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", formatted_system_prompt),
-            MessagesPlaceholder(variable_name="messages"),
-        ])
 
     def _create_graph(self) -> Any:
         """Cria grafo de execução do agente"""
@@ -151,7 +150,14 @@ class AgentFactory:
             """Chama modelo LLM"""
             messages = state["messages"]
             chain = self.prompt | self.llm_with_tools
-            response = chain.invoke({"messages": messages})
+            response = chain.invoke({"messages": messages, **self._prompt_context(state.get("summary"))})
+            return {"messages": [response]}
+
+        async def acall_model(state: AgentState):
+            """Chama modelo LLM (versão assíncrona, usada por graph.ainvoke)"""
+            messages = state["messages"]
+            chain = self.prompt | self.llm_with_tools
+            response = await chain.ainvoke({"messages": messages, **self._prompt_context(state.get("summary"))})
             return {"messages": [response]}
         
         def router_logic(state: AgentState) -> str:
@@ -166,7 +172,7 @@ class AgentFactory:
         
         # Ferramentas cujo resultado deve ir DIRETO para o usuário, sem passar de
         # novo pelo LLM (equivalente ao `return_direct` do LangChain, mas aplicado
-        # manualmente aqui porque o ToolNode do LangGraph não o lê automaticamente).
+        # manualmente aqui porque o nó de ferramentas (agent/parallel_tools.py) não o lê).
         # Critério: ferramentas que já chamam seu próprio LLM especialista e
         # devolvem uma resposta final e formatada — reprocessá-las pelo
         # orquestrador só arriscaria reformatar/resumir algo que já está pronto.
@@ -196,8 +202,18 @@ class AgentFactory:
                 return "agent"
             return "agent"
         
-        workflow.add_node("agent", call_model)
-        workflow.add_node("tools", ToolNode(self.tools))
+        # Mesmo nó com as duas implementações: graph.invoke usa call_model,
+        # graph.ainvoke usa acall_model (sem bloquear o event loop).
+        workflow.add_node("agent", RunnableLambda(call_model, afunc=acall_model))
+        # tool_calls independentes de um mesmo turno rodam em paralelo
+        # (ver agent/parallel_tools.py), com as ToolMessages na ordem original.
+        # O cache de resultados é o do processo, compartilhado entre modelos.
+        tool_node = ParallelToolNode(
+            self.tools,
+            max_workers=Settings.tool_max_workers,
+            cache=get_tool_cache(),
+        )
+        workflow.add_node("tools", RunnableLambda(tool_node.invoke, afunc=tool_node.ainvoke))
         
         workflow.set_entry_point("agent")
         
@@ -247,16 +263,6 @@ class AgentFactory:
         
         return history
 
-    def _get_cached_result(self, tool_name: str, **kwargs) -> Any:
-        """Obtém resultado em cache se disponível"""
-        with self.cache_lock:
-            return self.cache.get(tool_name, **kwargs)
-
-    def _cache_result(self, tool_name: str, result: Any, ttl_minutes: int = None, **kwargs):
-        """Armazena resultado em cache"""
-        with self.cache_lock:
-            self.cache.set(tool_name, result, ttl_minutes=ttl_minutes, **kwargs)
-
     def _add_user_context_safely(
         self,
         current_content: List[Dict[str, Any]],
@@ -296,6 +302,107 @@ class AgentFactory:
             logger.warning(f"Erro ao adicionar contexto do usuário: {e}")
             return current_content
 
+    def _build_messages(
+        self,
+        input_text: str,
+        session_messages: List[Dict[str, Any]],
+        uploaded_files: List[Dict[str, Any]] = None,
+        user_infos: Dict[str, Any] = None,
+    ) -> List[BaseMessage]:
+        """Monta a lista de mensagens do grafo: histórico + mensagem atual (texto, anexos e contexto do usuário)."""
+        # 1. Reconstruir histórico
+        lc_messages = self._reconstruct_history(session_messages)
+        
+        # 2. Preparar conteúdo da mensagem atual
+        current_content: List[Dict[str, Any]] = []
+        
+        if input_text:
+            current_content.append({
+                "type": "text",
+                "text": input_text
+            })
+        
+        if uploaded_files:
+            file_names = ", ".join(
+                [f.get("name", "arquivo") for f in uploaded_files]
+            ) if uploaded_files else "arquivos"
+            
+            current_content.append({
+                "type": "text",
+                "text": f"\n[ARQUIVO]: Anexados: {file_names}"
+            })
+            
+            # Processar imagens
+            for file in uploaded_files:
+                if file.get('mime', '').startswith('image/'):
+                    try:
+                        encoded = base64.b64encode(file['data']).decode('utf-8')
+                        current_content.append({
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{file['mime']};base64,{encoded}"
+                            }
+                        })
+                    except Exception as e:
+                        logger.warning(f"Erro ao processar imagem: {e}")
+        
+        # 3. Adicionar contexto do usuário (seguro)
+        if user_infos and 'email' in user_infos and 'user' in user_infos:
+            current_content = self._add_user_context_safely(
+                current_content,
+                user_infos
+            )
+        
+        # 4. Adicionar mensagem ao histórico
+        lc_messages.append(HumanMessage(content=current_content))
+        return lc_messages
+
+    @staticmethod
+    def _user_identity(user_infos: Optional[Dict[str, Any]], session_id: Optional[str]) -> Optional[str]:
+        """Quem está perguntando, para o cache por usuário: e-mail do login Google, senão o session_id."""
+        email = (user_infos or {}).get("email")
+        return email or session_id
+
+    @staticmethod
+    def _message_text(content: Any) -> str:
+        """Texto de um `content` do LangChain (alguns modelos devolvem uma lista de partes em vez de string)."""
+        if not isinstance(content, list):
+            return content
+        text_parts = []
+        for part in content:
+            if isinstance(part, dict) and "text" in part:
+                text_parts.append(part["text"])
+            elif hasattr(part, "text"):
+                text_parts.append(part.text)
+            elif isinstance(part, str):
+                text_parts.append(part)
+        return "\n".join(text_parts)
+
+    def _format_output(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte o estado final do grafo no formato de saída de invoke/ainvoke."""
+        last_message = result["messages"][-1]
+        content = self._message_text(last_message.content)
+        
+        # Validar conteúdo
+        if not content:
+            if hasattr(last_message, "tool_calls") and last_message.tool_calls:
+                logger.debug("Resposta vazia mas com tool_calls")
+                content = "🤔 Processando ferramentas..."
+            else:
+                logger.debug("Resposta vazia da LLM")
+                content = "✅ Feito."
+        
+        return {
+            "output": [{
+                "role": "assistant",
+                "content": str(content)
+            }]
+        }
+
+    @staticmethod
+    def _output_message(content: str) -> Dict[str, Any]:
+        return {"output": [{"role": "assistant", "content": content}]}
+
     def invoke(
         self,
         input_text: str,
@@ -303,7 +410,8 @@ class AgentFactory:
         uploaded_files: List[Dict[str, Any]] = None,
         user_credentials: Any = None,
         user_infos: Dict[str, Any] = None,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        session_summary: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Invoca o agente com entrada do usuário
@@ -317,6 +425,8 @@ class AgentFactory:
             session_id: Id da sessão (usado só para marcar as linhas de
                 auditoria em `tool_calls` -- ver services/audit_callback.py).
                 Opcional: se omitido, a auditoria é gravada sem session_id.
+            session_summary: Resumo das mensagens antigas da sessão, que não
+                estão em `session_messages` (ver agent/context.py).
         
         Returns:
             Dict com saída do agente
@@ -325,122 +435,160 @@ class AgentFactory:
             RuntimeError: Se erro na execução
         """
         try:
-            # 1. Configurar credenciais nas ferramentas
+            # 1. Validar credenciais (elas chegam às ferramentas pelo contexto
+            #    da requisição, no passo 3 -- não como estado das instâncias)
             if user_credentials:
                 # Validar e refresh credenciais se necessário
                 if not GoogleCredentialManager.ensure_valid_credentials(user_credentials):
                     logger.warning("Credenciais inválidas ou expiradas")
-                    return {
-                        "output": [{
-                            "role": "assistant",
-                            "content": "⚠️ Suas credenciais expiraram. Faça login novamente."
-                        }]
-                    }
-                
-                for tool in [
-                    self.create_event_tool,
-                    self.check_calendar_tool,
-                    self.check_email_tool,
-                    self.send_email_tool,
-                    self.buscar_drive_tool
-                ]:
-                    tool.set_credentials(user_credentials)
-                
-                logger.debug("✅ Credenciais configuradas nas ferramentas")
-            
-            # 2. Reconstruir histórico
-            lc_messages = self._reconstruct_history(session_messages)
-            
-            # 3. Preparar conteúdo da mensagem atual
-            current_content: List[Dict[str, Any]] = []
-            
-            if input_text:
-                current_content.append({
-                    "type": "text",
-                    "text": input_text
-                })
-            
-            if uploaded_files:
-                file_names = ", ".join(
-                    [f.get("name", "arquivo") for f in uploaded_files]
-                ) if uploaded_files else "arquivos"
-                
-                current_content.append({
-                    "type": "text",
-                    "text": f"\n[ARQUIVO]: Anexados: {file_names}"
-                })
-                
-                # Processar imagens
-                for file in uploaded_files:
-                    if file.get('mime', '').startswith('image/'):
-                        try:
-                            import base64
-                            encoded = base64.b64encode(file['data']).decode('utf-8')
-                            current_content.append({
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{file['mime']};base64,{encoded}"
-                                }
-                            })
-                        except Exception as e:
-                            logger.warning(f"Erro ao processar imagem: {e}")
-            
-            # 4. Adicionar contexto do usuário (seguro)
-            if user_infos and 'email' in user_infos and 'user' in user_infos:
-                current_content = self._add_user_context_safely(
-                    current_content,
-                    user_infos
-                )
+                    return self._output_message("⚠️ Suas credenciais expiraram. Faça login novamente.")
             
-            # 5. Adicionar mensagem ao histórico
-            lc_messages.append(HumanMessage(content=current_content))
+            # 2. Histórico + mensagem atual
+            lc_messages = self._build_messages(input_text, session_messages, uploaded_files, user_infos)
             
-            # 6. Invocar agente (com callback de auditoria/analytics de tool_calls)
+            # 3. Invocar agente (com callback de auditoria/analytics de tool_calls)
             logger.info("Invocando LangGraph...")
             audit_callback = SQLAuditCallbackHandler(session_id=session_id, model_family=self.llm_name)
-            result = self.graph.invoke(
-                {"messages": lc_messages},
-                config={"callbacks": [audit_callback]}
-            )
+            with user_credentials_context(user_credentials, self._user_identity(user_infos, session_id)):
+                result = self.graph.invoke(
+                    {"messages": lc_messages, "summary": session_summary},
+                    config={"callbacks": [audit_callback]}
+                )
             
-            # 7. Processar resposta
-            last_message = result["messages"][-1]
-            content = last_message.content
+            # 4. Processar resposta
+            output = self._format_output(result)
+            logger.info("✅ Agent.invoke finalizado com sucesso")
+            return output
+        
+        except Exception as e:
+            logger.error(f"Erro na execução do agente: {str(e)}", exc_info=True)
+            return self._output_message(f"❌ Erro: {str(e)[:200]}")
+
+    async def ainvoke(
+        self,
+        input_text: str,
+        session_messages: List[Dict[str, Any]],
+        uploaded_files: List[Dict[str, Any]] = None,
+        user_credentials: Any = None,
+        user_infos: Dict[str, Any] = None,
+        session_id: Optional[str] = None,
+        session_summary: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Versão assíncrona de `invoke` (mesmos argumentos e mesmo retorno),
+        usada pelo /chat. Roda o grafo com `graph.ainvoke`: o LLM do
+        orquestrador e as skills com `_arun` nativo são aguardados sem ocupar
+        o event loop, e as ferramentas só síncronas (Google, Chroma) são
+        despachadas pelo LangChain para um executor de threads.
+        """
+        try:
+            if user_credentials:
+                # O refresh do token é uma chamada HTTP síncrona -- fora do event loop.
+                valid = await asyncio.to_thread(
+                    GoogleCredentialManager.ensure_valid_credentials, user_credentials
+                )
+                if not valid:
+                    logger.warning("Credenciais inválidas ou expiradas")
+                    return self._output_message("⚠️ Suas credenciais expiraram. Faça login novamente.")
             
-            # Tratar conteúdo em lista (alguns modelos retornam assim)
-            if isinstance(content, list):
-                text_parts = []
-                for part in content:
-                    if isinstance(part, dict) and "text" in part:
-                        text_parts.append(part["text"])
-                    elif hasattr(part, "text"):
-                        text_parts.append(part.text)
-                    elif isinstance(part, str):
-                        text_parts.append(part)
-                content = "\n".join(text_parts)
+            lc_messages = self._build_messages(input_text, session_messages, uploaded_files, user_infos)
             
-            # Validar conteúdo
-            if not content:
-                if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-                    logger.debug("Resposta vazia mas com tool_calls")
-                    content = "🤔 Processando ferramentas..."
-                else:
-                    logger.debug("Resposta vazia da LLM")
-                    content = "✅ Feito."
+            logger.info("Invocando LangGraph (async)...")
+            audit_callback = SQLAuditCallbackHandler(session_id=session_id, model_family=self.llm_name)
+            with user_credentials_context(user_credentials, self._user_identity(user_infos, session_id)):
+                result = await self.graph.ainvoke(
+                    {"messages": lc_messages, "summary": session_summary},
+                    config={"callbacks": [audit_callback]}
+                )
             
-            logger.info("✅ Agent.invoke finalizado com sucesso")
-            return {
-                "output": [{
-                    "role": "assistant",
-                    "content": str(content)
-                }]
-            }
+            output = self._format_output(result)
+            logger.info("✅ Agent.ainvoke finalizado com sucesso")
+            return output
         
         except Exception as e:
             logger.error(f"Erro na execução do agente: {str(e)}", exc_info=True)
-            return {
-                "output": [{
-                    "role": "assistant",
-                    "content": f"❌ Erro: {str(e)[:200]}"
-                }]
-            }
\ No newline at end of file
+            return self._output_message(f"❌ Erro: {str(e)[:200]}")
+
+    async def astream(
+        self,
+        input_text: str,
+        session_messages: List[Dict[str, Any]],
+        uploaded_files: List[Dict[str, Any]] = None,
+        user_credentials: Any = None,
+        user_infos: Dict[str, Any] = None,
+        session_id: Optional[str] = None,
+        session_summary: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Versão em streaming de `ainvoke`, usada pelo /chat/stream. Gera
+        eventos `{"event": ..., "data": {...}}` à medida que o grafo executa:
+
+        - "token": trecho de texto do orquestrador, assim que o LLM o gera
+          (os LLMs chamados de dentro das skills não são repassados);
+        - "tool_start" / "tool_end": início e fim de cada ferramenta -- os
+          mesmos hooks (on_tool_start / on_tool_end / on_tool_error) que o
+          SQLAuditCallbackHandler usa para gravar a auditoria;
+        - "final": a resposta final, no mesmo formato de retorno de
+          `ainvoke`. É sempre o último evento, inclusive em caso de erro.
+
+        Os tokens podem incluir texto de rodadas intermediárias (antes de uma
+        ferramenta) e uma ferramenta de retorno direto não gera tokens -- a
+        resposta oficial é sempre a do evento "final".
+        """
+        if user_credentials:
+            valid = await asyncio.to_thread(
+                GoogleCredentialManager.ensure_valid_credentials, user_credentials
+            )
+            if not valid:
+                logger.warning("Credenciais inválidas ou expiradas")
+                yield {"event": "final", "data": self._output_message("⚠️ Suas credenciais expiraram. Faça login novamente.")}
+                return
+
+        lc_messages = self._build_messages(input_text, session_messages, uploaded_files, user_infos)
+        audit_callback = SQLAuditCallbackHandler(session_id=session_id, model_family=self.llm_name)
+        tools_started_at: Dict[str, float] = {}
+        result = None
+
+        logger.info("Invocando LangGraph (stream)...")
+        try:
+            with user_credentials_context(user_credentials, self._user_identity(user_infos, session_id)):
+                async for event in self.graph.astream_events(
+                    {"messages": lc_messages, "summary": session_summary},
+                    config={"callbacks": [audit_callback]},
+                    version="v2",
+                ):
+                    kind = event["event"]
+                    if kind == "on_chat_model_stream":
+                        if event.get("metadata", {}).get("langgraph_node") != "agent":
+                            continue
+                        text = self._message_text(event["data"]["chunk"].content)
+                        if text:
+                            yield {"event": "token", "data": {"text": text}}
+                    elif kind == "on_tool_start":
+                        tools_started_at[event["run_id"]] = time.monotonic()
+                        yield {"event": "tool_start", "data": {"id": event["run_id"], "name": event["name"]}}
+                    elif kind in ("on_tool_end", "on_tool_error"):
+                        started = tools_started_at.pop(event["run_id"], None)
+                        output = event["data"].get("output")
+                        success = kind == "on_tool_end" and getattr(output, "status", "success") != "error"
+                        yield {"event": "tool_end", "data": {
+                            "id": event["run_id"],
+                            "name": event["name"],
+                            "success": success,
+                            "cached": bool((getattr(output, "response_metadata", None) or {}).get("cached")),
+                            "duration_ms": int((time.monotonic() - started) * 1000) if started is not None else None,
+                        }}
+                    elif kind == "on_chain_end" and not event.get("parent_ids"):
+                        # Fim do grafo (evento raiz): o estado final, como o de graph.ainvoke.
+                        result = event["data"].get("output")
+        except Exception as e:
+            logger.error(f"Erro na execução do agente: {str(e)}", exc_info=True)
+            yield {"event": "final", "data": self._output_message(f"❌ Erro: {str(e)[:200]}")}
+            return
+
+        if not result or not result.get("messages"):
+            yield {"event": "final", "data": self._output_message("✅ Feito.")}
+            return
+
+        logger.info("✅ Agent.astream finalizado com sucesso")
+        yield {"event": "final", "data": self._format_output(result)}
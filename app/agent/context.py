@@ -0,0 +1,195 @@
+"""
+Montagem do histórico que vai no prompt do orquestrador, com orçamento de
+tokens.
+
+Antes, toda mensagem da sessão era reenviada ao LLM a cada turno -- custo e
+latência cresciam linearmente com o tamanho da conversa, sem teto. As
+sessões internas mais longas eram justamente as mais caras.
+
+Agora o histórico do prompt é:
+
+- o RESUMO da conversa até certa mensagem (`sessions.summary` /
+  `sessions.summary_upto_message_id`), se houver;
+- as últimas CONTEXT_RECENT_TURNS trocas (pergunta do usuário + respostas),
+  SEMPRE na íntegra -- mesmo que sozinhas passem do orçamento do modelo;
+- as trocas anteriores a essas (e posteriores ao resumo), da mais recente
+  para a mais antiga, enquanto couberem no que sobrou do orçamento.
+
+O que ficou de fora da janela (ou já está velho o bastante) é incorporado ao
+resumo DEPOIS do turno, em background (`update_summary`, chamado pelo
+api/chat.py), com uma chamada ao próprio LLM do orquestrador. O resumo fica
+gravado na sessão, então não é recalculado a cada turno: só quando há
+mensagens novas suficientes para sair da janela.
+
+O orçamento é por modelo (MODEL_HISTORY_BUDGETS) e nunca passa de
+MAX_TOKENS (utils/settings.py); só as trocas recentes garantidas podem
+ultrapassá-lo. A contagem de tokens é estimada
+(utils/tokens.py) e cobre só o histórico -- prompt do sistema e definições
+das ferramentas são fixos e ficam de fora da conta.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from services.llm_usage import log_llm_call
+from services.session_store import session_store
+from utils.settings import WrappedSettings as Settings
+from utils.tokens import estimate_messages_tokens, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tokens de histórico (resumo + mensagens) por modelo do orquestrador.
+# Limitados por MAX_TOKENS -- os modelos aceitam muito mais, mas o objetivo
+# aqui é custo e latência, não o tamanho da janela do provedor.
+MODEL_HISTORY_BUDGETS: Dict[str, int] = {
+    "gemini": 8000,
+    "gpt": 6000,
+    "claude": 4000,
+}
+DEFAULT_HISTORY_BUDGET = 4000
+
+SUMMARY_PROMPT = """Você mantém o resumo de uma conversa entre um usuário e a Cidinha, assistente interna da SharkDev.
+
+Atualize o resumo abaixo incorporando as novas mensagens. Preserve fatos, decisões, pedidos em aberto, nomes, datas, e-mails e identificadores que possam ser necessários depois; descarte cumprimentos e repetições. Escreva em português, em tópicos curtos, com no máximo 300 palavras. Responda apenas com o resumo atualizado.
+
+Resumo atual:
+{summary}
+
+Novas mensagens:
+{messages}"""
+
+
+def history_budget(model: str) -> int:
+    """Tokens de histórico permitidos para o modelo `model`."""
+    budget = MODEL_HISTORY_BUDGETS.get(model, DEFAULT_HISTORY_BUDGET)
+    return min(budget, Settings.context_window["max_tokens"])
+
+
+def split_turns(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Agrupa o histórico em trocas: cada uma começa numa mensagem do usuário."""
+    turns: List[List[Dict[str, Any]]] = []
+    for message in messages:
+        if message.get("role") == "user" or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def assemble_context(
+    messages: List[Dict[str, Any]],
+    summary: Optional[str],
+    summary_upto_id: Optional[int],
+    model: str,
+    recent_turns: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Escolhe o que do histórico vai no prompt.
+
+    Args:
+        messages: histórico completo da sessão ({"id", "role", "content"},
+            do mais antigo para o mais recente).
+        summary / summary_upto_id: resumo gravado na sessão e o id da última
+            mensagem que ele cobre.
+        model: modelo do orquestrador (define o orçamento).
+        recent_turns: trocas finais que vão sempre na íntegra; default
+            CONTEXT_RECENT_TURNS.
+
+    Returns:
+        {"summary", "messages", "tokens", "to_summarize", "needs_summary"}:
+        `messages` é o que vai na íntegra; `to_summarize` são as mensagens
+        anteriores à janela ainda não cobertas pelo resumo; `needs_summary`
+        diz se vale atualizar o resumo depois deste turno.
+    """
+    if recent_turns is None:
+        recent_turns = Settings.context_window["recent_turns"]
+    recent_turns = max(1, recent_turns)
+
+    pending = [
+        m for m in messages
+        if summary_upto_id is None or m.get("id") is None or m["id"] > summary_upto_id
+    ]
+    turns = split_turns(pending)
+
+    summary_tokens = estimate_tokens(summary)
+    remaining = history_budget(model) - summary_tokens
+    kept: List[List[Dict[str, Any]]] = []
+    overflowed = False
+    for position, turn in enumerate(reversed(turns)):
+        turn_tokens = estimate_messages_tokens(turn)
+        if position >= recent_turns and turn_tokens > remaining:
+            overflowed = True
+            break
+        kept.append(turn)
+        remaining -= turn_tokens
+    kept.reverse()
+
+    older = turns[: len(turns) - len(kept)]
+    window = [m for turn in kept for m in turn]
+    return {
+        "summary": summary,
+        "messages": window,
+        "tokens": summary_tokens + estimate_messages_tokens(window),
+        "to_summarize": [m for turn in older for m in turn],
+        # Resumo só quando algo já ficou de fora, ou quando acumulou uma
+        # janela inteira de trocas antigas -- não uma chamada ao LLM por turno.
+        "needs_summary": overflowed or len(turns) >= 2 * recent_turns,
+    }
+
+
+def _summary_source(context: Dict[str, Any], recent_turns: int) -> List[Dict[str, Any]]:
+    """
+    Mensagens a incorporar ao resumo: o que ficou fora da janela e o que,
+    dentro dela, é anterior às `recent_turns` trocas finais.
+    """
+    turns = split_turns(context["to_summarize"] + context["messages"])
+    cut = max(len(split_turns(context["to_summarize"])), len(turns) - recent_turns)
+    return [m for turn in turns[:cut] for m in turn if m.get("id") is not None]
+
+
+def update_summary(
+    llm: Any,
+    model_family: str,
+    session_id: str,
+    context: Dict[str, Any],
+    recent_turns: Optional[int] = None,
+) -> None:
+    """
+    Incorpora ao resumo da sessão as mensagens antigas de `context` (o
+    retorno de `assemble_context`) e grava o resultado. Pensado para rodar
+    em background depois da resposta: falhas só são logadas -- na próxima
+    vez que a janela transbordar, tenta de novo.
+    """
+    if recent_turns is None:
+        recent_turns = Settings.context_window["recent_turns"]
+    source = _summary_source(context, max(1, recent_turns))
+    if not source:
+        return
+
+    transcript = "\n".join(
+        f"{'Usuário' if m['role'] == 'user' else 'Cidinha'}: {m['content']}" for m in source
+    )
+    prompt = SUMMARY_PROMPT.format(summary=context["summary"] or "(vazio)", messages=transcript)
+    try:
+        response = llm.invoke([
+            SystemMessage(content="Você resume conversas de forma fiel e concisa."),
+            HumanMessage(content=prompt),
+        ])
+        log_llm_call(
+            model_family=model_family,
+            skill_name="ResumoDeConversa",
+            llm_response=response,
+            session_id=session_id,
+        )
+        content = response.content
+        if isinstance(content, list):
+            content = "\n".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+        summary = str(content).strip()
+        if not summary:
+            return
+        session_store.save_summary(session_id, summary, source[-1]["id"])
+        logger.info(f"Resumo da sessão {session_id} atualizado até a mensagem {source[-1]['id']}")
+    except Exception as e:
+        logger.warning(f"Não foi possível atualizar o resumo da sessão {session_id}: {e}")
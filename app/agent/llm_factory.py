@@ -3,6 +3,7 @@ import logging
 from typing import Dict, Type, Any, Optional
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
+from agent.llm_health import llm_health
 from utils.settings import WrappedSettings as Settings
 
 logger = logging.getLogger(__name__)
@@ -51,7 +52,7 @@ class LLMFactory:
     
     Características:
     - Validação de API keys
-    - Teste de conectividade
+    - Status de conectividade em cache (agent/llm_health.py), só como aviso
     - Mensagens de erro claras
     - Suporte a múltiplos modelos
     """
@@ -130,7 +131,8 @@ class LLMFactory:
         
         Raises:
             ValueError: Se modelo inválido ou API key ausente
-            RuntimeError: Se erro ao conectar com serviço
+            RuntimeError: Se erro ao instanciar o cliente (uma falha na última
+                verificação de saúde, agent/llm_health.py, só gera um aviso no log)
         
         Exemplo:
             >>> try:
@@ -153,7 +155,20 @@ class LLMFactory:
         api_key = os.environ[config["env_key"]]
         
         try:
-            # 2. Criar instância
+            # 2. Conectividade: só lê o último status do registro de saúde,
+            #    que testa os modelos em background -- nenhuma chamada de
+            #    teste aqui. O status é só um aviso: pode ser de até
+            #    LLM_HEALTH_CHECK_INTERVAL_SECONDS atrás e a falha pode ter
+            #    sido momentânea, então o cliente é criado mesmo assim -- se
+            #    o provedor continuar fora, a chamada de verdade falha.
+            health = llm_health.get_status(model_name)
+            if health is not None and not health["ok"]:
+                logger.warning(
+                    f"LLM {model_name} falhou na última verificação de saúde "
+                    f"({health['checked_at']:%H:%M:%S} UTC): {health['error']} -- criando mesmo assim"
+                )
+            
+            # 3. Criar instância
             logger.info(f"Instanciando {config['class'].__name__}...")
             
             llm = config["class"](
@@ -162,15 +177,6 @@ class LLMFactory:
                 temperature=config["temperature"]
             )
             
-            # 3. Testar conexão com LLM
-            logger.info(f"Testando conectividade com {model_name}...")
-            test_response = llm.invoke("test")
-            
-            if not test_response:
-                raise RuntimeError(
-                    f"LLM {model_name} retornou resposta vazia"
-                )
-            
             logger.info(f"✅ LLM {model_name} ({config['model']}) inicializado com sucesso")
             return llm
         
@@ -195,15 +201,14 @@ class LLMFactory:
     @staticmethod
     def create_llm_fast(model_name: str) -> Any:
         """
-        Como create_llm(), mas SEM o ping de teste (`llm.invoke("test")`).
+        Como create_llm(), mas sem consultar o registro de saúde
+        (agent/llm_health.py).
 
         Pensado para as skills especialistas (RevisorDeCodigo, GeradorDeTestes...),
         que criam um LLM e já fazem uma chamada real logo em seguida a cada
-        execução -- usar create_llm() ali dobraria o custo/latência de cada
-        chamada com um teste desnecessário (se a API key estiver com problema,
-        a chamada real já vai falhar sozinha, de forma clara, sem precisar de
-        um teste prévio). O orquestrador principal continua usando create_llm()
-        normalmente, já que ele só é instanciado uma vez por requisição.
+        execução -- se a API key estiver com problema, a chamada real já vai
+        falhar sozinha, de forma clara. Também é o que o próprio registro de
+        saúde usa para instanciar o modelo que vai testar.
 
         Args:
             model_name: Nome do modelo ('gemini', 'gpt', 'claude')
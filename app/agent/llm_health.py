@@ -0,0 +1,115 @@
+"""
+Registro de saúde (conectividade) dos LLMs, por família de modelo.
+
+Antes, `LLMFactory.create_llm` fazia um `llm.invoke("test")` a cada chamada
+-- ou seja, toda mensagem do usuário pagava uma ida-e-volta extra (e
+cobrada) ao provedor antes de qualquer trabalho real. Agora esse teste roda
+FORA do caminho da requisição: uma thread em background testa cada modelo
+configurado no startup e depois a cada LLM_HEALTH_CHECK_INTERVAL_SECONDS,
+guardando o último status e a latência. `create_llm` e o HealthCheckAgregado
+só leem o resultado em cache -- zero chamadas de teste no caminho quente.
+
+O status é informativo: `create_llm` só loga um aviso quando o último teste
+falhou, e não recusa o modelo -- o resultado pode ter minutos e a falha
+pode ter sido passageira, e os agentes que já estão no AgentPool nem
+passam por aqui. Quem decide é a chamada real ao provedor.
+
+Com o intervalo <= 0 a thread não é iniciada e nenhum modelo é testado;
+`create_llm` passa a confiar só na validação de configuração (API key
+presente), como `create_llm_fast` já fazia.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMHealthRegistry:
+    def __init__(self):
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def probe(self, model_name: str) -> Dict[str, Any]:
+        """Testa um modelo agora (chamada real ao provedor) e guarda o resultado."""
+        # Import tardio: llm_factory importa este módulo.
+        from agent.llm_factory import LLMFactory
+
+        start = time.monotonic()
+        try:
+            llm = LLMFactory.create_llm_fast(model_name)
+            response = llm.invoke("test")
+            ok = bool(response)
+            error = None if ok else "resposta vazia"
+        except Exception as e:
+            ok = False
+            error = str(e)[:200]
+        latency_ms = int((time.monotonic() - start) * 1000)
+
+        status = {
+            "ok": ok,
+            "latency_ms": latency_ms,
+            "checked_at": datetime.now(timezone.utc),
+            "error": error,
+        }
+        with self._lock:
+            self._status[model_name] = status
+
+        if ok:
+            logger.info(f"Health LLM: {model_name} OK ({latency_ms}ms)")
+        else:
+            logger.warning(f"Health LLM: {model_name} falhou ({latency_ms}ms): {error}")
+        return status
+
+    def probe_all(self) -> None:
+        """Testa todos os modelos com API key configurada (os demais não geram chamada nenhuma)."""
+        from agent.llm_factory import LLMFactory
+
+        for model_name in LLMFactory.get_available_models():
+            valid, _ = LLMFactory.validate_model(model_name)
+            if valid:
+                self.probe(model_name)
+
+    def get_status(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Último status conhecido de `model_name`, ou None se ainda não foi testado."""
+        with self._lock:
+            status = self._status.get(model_name)
+            return dict(status) if status else None
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
+
+    def start(self, interval_seconds: int) -> None:
+        """Inicia a thread de verificação periódica (idempotente)."""
+        if interval_seconds <= 0:
+            logger.info("Health LLM: verificação periódica desativada (intervalo <= 0)")
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.probe_all()
+                except Exception:
+                    logger.exception("Health LLM: erro inesperado na verificação periódica")
+                self._stop.wait(interval_seconds)
+
+        self._thread = Thread(target=loop, name="llm-health", daemon=True)
+        self._thread.start()
+        logger.info(f"Health LLM: verificação periódica iniciada (a cada {interval_seconds}s)")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# Instância única compartilhada pela aplicação inteira.
+llm_health = LLMHealthRegistry()
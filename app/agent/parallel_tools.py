@@ -0,0 +1,289 @@
+"""
+Nó de ferramentas do grafo, com execução paralela das tool_calls de um turno.
+
+Quando o orquestrador pede várias ferramentas numa mesma AIMessage (ex.:
+ConsultarAgenda para três participantes antes do CriarEvento, ou AjudaShark
++ BuscarNoDrive), elas são independentes entre si -- não faz sentido
+esperar uma terminar para começar a próxima. Aqui elas rodam ao mesmo tempo,
+e o tempo do turno passa a ser o da ferramenta mais lenta, não a soma de
+todas.
+
+Dois limites de concorrência:
+- por turno: no máximo TOOL_MAX_WORKERS tool_calls do mesmo turno rodando ao
+  mesmo tempo (as demais esperam a vez);
+- por ferramenta: TOOL_CONCURRENCY_LIMITS, somando todas as requisições do
+  processo -- para ferramentas que escrevem no Google ou que disparam
+  processos pesados, onde uma rajada de chamadas só atrapalha.
+
+As ToolMessages voltam SEMPRE na mesma ordem das tool_calls, independente de
+qual terminou primeiro, e uma ferramenta que falha vira uma ToolMessage de
+erro (status="error") em vez de derrubar o turno inteiro -- o orquestrador
+vê o erro e decide o que dizer ao usuário.
+
+Cada execução roda numa cópia do contexto da requisição (contextvars), então
+as credenciais Google (services/request_context.py) e os callbacks de
+auditoria chegam a todas as threads/tasks.
+
+Antes de executar, cada tool_call consulta o cache de resultados do processo
+(utils/tool_cache.py), conforme a política da ferramenta
+(agent/tool_cache_policy.py). Só resultados de sucesso são guardados, e
+uma escrita (CriarEvento, EnviarEmail) invalida as leituras em cache do
+mesmo usuário (ConsultarAgenda, ConsultarEmail). No caminho async, as
+operações no cache rodam numa thread quando o backend faz I/O (SQLite,
+Redis). Um acerto no cache também dispara on_tool_start/on_tool_end, com a
+ToolMessage marcada `response_metadata={"cached": True}`: a auditoria grava
+a linha com `cached=True` e o /chat/stream manda tool_start/tool_end como
+para qualquer outra execução.
+"""
+
+import asyncio
+import contextvars
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import get_async_callback_manager_for_config, get_callback_manager_for_config
+from langchain_core.tools import BaseTool
+
+from agent.tool_cache_policy import (
+    GENERATION_CACHE_NAME,
+    GENERATION_TTL_MINUTES,
+    INVALIDATED_BY,
+    cache_key_args,
+    cache_ttl_minutes,
+    invalidated_reads,
+    is_cacheable_result,
+)
+from services.request_context import get_user_identity
+from utils.tool_cache import ToolResultCache, run_cache_io
+
+logger = logging.getLogger(__name__)
+
+# Máximo de execuções simultâneas de cada ferramenta no processo inteiro.
+# Ferramentas fora da lista só são limitadas pelo TOOL_MAX_WORKERS do turno.
+TOOL_CONCURRENCY_LIMITS: Dict[str, int] = {
+    # Escrita no Google: evita rajadas contra a cota de escrita da API.
+    "CriarEvento": 2,
+    "EnviarEmail": 2,
+    # Leitura no Google: várias agendas/buscas de uma vez é o caso comum,
+    # mas sem passar do razoável para a cota por projeto.
+    "ConsultarAgenda": 6,
+    "ConsultarEmail": 4,
+    "BuscarNoDrive": 4,
+    # pip-audit num subprocesso: pesado em CPU e rede.
+    "AuditoriaDeDependencias": 1,
+}
+
+
+class ParallelToolNode:
+    """
+    Substitui o ToolNode do LangGraph no grafo do agente. Usado via
+    `RunnableLambda(node.invoke, afunc=node.ainvoke)`: graph.invoke roda as
+    ferramentas num pool de threads, graph.ainvoke/astream_events com
+    asyncio.gather.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        max_workers: int,
+        concurrency_limits: Optional[Dict[str, int]] = None,
+        cache: Optional[ToolResultCache] = None,
+    ):
+        self.tools_by_name: Dict[str, BaseTool] = {tool.name: tool for tool in tools}
+        self.cache = cache
+        self.max_workers = max(1, max_workers)
+        self.concurrency_limits = dict(
+            TOOL_CONCURRENCY_LIMITS if concurrency_limits is None else concurrency_limits
+        )
+
+        self._sync_limits = {
+            name: BoundedSemaphore(limit) for name, limit in self.concurrency_limits.items()
+        }
+        # asyncio.Semaphore pertence a um event loop -- um conjunto por loop.
+        self._async_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._async_limits_lock = Lock()
+
+    @staticmethod
+    def _tool_calls(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        last_message = state["messages"][-1]
+        return list(getattr(last_message, "tool_calls", None) or [])
+
+    @staticmethod
+    def _error_message(call: Dict[str, Any], error: str) -> ToolMessage:
+        return ToolMessage(
+            content=error,
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    @staticmethod
+    def _as_message(call: Dict[str, Any], output: Any) -> ToolMessage:
+        if isinstance(output, ToolMessage):
+            return output
+        return ToolMessage(content=str(output), name=call["name"], tool_call_id=call["id"])
+
+    def _cache_lookup(self, call: Dict[str, Any]) -> tuple[Optional[Dict[str, Any]], Optional[ToolMessage]]:
+        """(argumentos da chave de cache, ToolMessage em cache) -- ambos None se a chamada não é cacheável."""
+        if self.cache is None:
+            return None, None
+        key_args = cache_key_args(call["name"], call.get("args", {}))
+        if key_args is None:
+            return None, None
+        if call["name"] in INVALIDATED_BY:
+            key_args["__generation"] = self._generation(call["name"], key_args["__user"])
+        cached = self.cache.get(call["name"], **key_args)
+        if cached is None:
+            return key_args, None
+        logger.info(f"Cache hit: {call['name']}")
+        return key_args, ToolMessage(
+            content=cached,
+            name=call["name"],
+            tool_call_id=call["id"],
+            response_metadata={"cached": True},
+        )
+
+    @staticmethod
+    def _report_cached(call: Dict[str, Any], config: RunnableConfig, message: ToolMessage) -> None:
+        """Dispara on_tool_start/on_tool_end para um resultado vindo do cache (auditoria e streaming)."""
+        run = get_callback_manager_for_config(config).on_tool_start(
+            {"name": call["name"]}, str(call.get("args", {})), name=call["name"], inputs=call.get("args", {})
+        )
+        run.on_tool_end(message)
+
+    @staticmethod
+    async def _areport_cached(call: Dict[str, Any], config: RunnableConfig, message: ToolMessage) -> None:
+        run = await get_async_callback_manager_for_config(config).on_tool_start(
+            {"name": call["name"]}, str(call.get("args", {})), name=call["name"], inputs=call.get("args", {})
+        )
+        await run.on_tool_end(message)
+
+    def _cache_store(self, call: Dict[str, Any], key_args: Optional[Dict[str, Any]], message: ToolMessage) -> None:
+        if key_args is None or message.status == "error" or not is_cacheable_result(message.content):
+            return
+        self.cache.set(call["name"], message.content, ttl_minutes=cache_ttl_minutes(call["name"]), **key_args)
+
+    def _generation(self, tool_name: str, identity: str) -> int:
+        return self.cache.get(GENERATION_CACHE_NAME, tool=tool_name, user=identity) or 0
+
+    def _invalidate_reads(self, call: Dict[str, Any]) -> None:
+        """Depois de uma escrita (com sucesso ou não), descarta as leituras em cache do usuário."""
+        reads = invalidated_reads(call["name"])
+        identity = get_user_identity()
+        if self.cache is None or not reads or not identity:
+            return
+        for read in reads:
+            self.cache.set(
+                GENERATION_CACHE_NAME,
+                self._generation(read, identity) + 1,
+                ttl_minutes=GENERATION_TTL_MINUTES,
+                tool=read,
+                user=identity,
+            )
+
+    async def _cache_io(self, func, *args):
+        """Operação no cache a partir do caminho async (numa thread, se o backend faz I/O)."""
+        if self.cache is None:
+            return func(*args)
+        return await run_cache_io(self.cache, func, *args)
+
+    def _async_limit(self, tool_name: str) -> Optional[asyncio.Semaphore]:
+        limit = self.concurrency_limits.get(tool_name)
+        if not limit:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._async_limits_lock:
+            per_loop = self._async_limits.setdefault(loop, {})
+            if tool_name not in per_loop:
+                per_loop[tool_name] = asyncio.Semaphore(limit)
+            return per_loop[tool_name]
+
+    def _run_one(self, call: Dict[str, Any], config: RunnableConfig) -> ToolMessage:
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._error_message(call, f"Erro: ferramenta desconhecida '{call['name']}'.")
+
+        key_args, cached = self._cache_lookup(call)
+        if cached is not None:
+            self._report_cached(call, config, cached)
+            return cached
+
+        limit = self._sync_limits.get(call["name"])
+        try:
+            if limit is None:
+                message = self._as_message(call, tool.invoke({**call, "type": "tool_call"}, config))
+            else:
+                with limit:
+                    message = self._as_message(call, tool.invoke({**call, "type": "tool_call"}, config))
+        except Exception as e:
+            logger.warning(f"Ferramenta {call['name']} falhou: {e}")
+            return self._error_message(call, f"Erro ao executar {call['name']}: {str(e)[:500]}")
+        finally:
+            self._invalidate_reads(call)
+
+        self._cache_store(call, key_args, message)
+        return message
+
+    async def _arun_one(self, call: Dict[str, Any], config: RunnableConfig) -> ToolMessage:
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._error_message(call, f"Erro: ferramenta desconhecida '{call['name']}'.")
+
+        key_args, cached = await self._cache_io(self._cache_lookup, call)
+        if cached is not None:
+            await self._areport_cached(call, config, cached)
+            return cached
+
+        limit = self._async_limit(call["name"])
+        try:
+            if limit is None:
+                message = self._as_message(call, await tool.ainvoke({**call, "type": "tool_call"}, config))
+            else:
+                async with limit:
+                    message = self._as_message(call, await tool.ainvoke({**call, "type": "tool_call"}, config))
+        except Exception as e:
+            logger.warning(f"Ferramenta {call['name']} falhou: {e}")
+            return self._error_message(call, f"Erro ao executar {call['name']}: {str(e)[:500]}")
+        finally:
+            await self._cache_io(self._invalidate_reads, call)
+
+        await self._cache_io(self._cache_store, call, key_args, message)
+        return message
+
+    def invoke(self, state: Dict[str, Any], config: RunnableConfig) -> Dict[str, List[ToolMessage]]:
+        """Executa as tool_calls da última AIMessage em paralelo (threads)."""
+        calls = self._tool_calls(state)
+        if len(calls) <= 1:
+            return {"messages": [self._run_one(call, config) for call in calls]}
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(calls)),
+            thread_name_prefix="tool",
+        ) as executor:
+            # Uma cópia do contexto por tarefa: um mesmo Context não pode
+            # estar ativo em duas threads ao mesmo tempo.
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._run_one, call, config)
+                for call in calls
+            ]
+            return {"messages": [future.result() for future in futures]}
+
+    async def ainvoke(self, state: Dict[str, Any], config: RunnableConfig) -> Dict[str, List[ToolMessage]]:
+        """Executa as tool_calls da última AIMessage em paralelo (asyncio)."""
+        calls = self._tool_calls(state)
+        turn_limit = asyncio.Semaphore(self.max_workers)
+
+        async def run(call: Dict[str, Any]) -> ToolMessage:
+            async with turn_limit:
+                return await self._arun_one(call, config)
+
+        # gather devolve os resultados na ordem das tool_calls.
+        messages = await asyncio.gather(*(run(call) for call in calls))
+        return {"messages": list(messages)}
@@ -0,0 +1,62 @@
+"""
+Pool de AgentFactory por modelo, reaproveitado entre requisições.
+
+Montar uma AgentFactory custa caro para o que é feito a cada mensagem:
+instanciar o cliente do LLM, vincular as ~19 ferramentas, montar o prompt e
+compilar o StateGraph do LangGraph. Nada disso depende da sessão ou do
+usuário -- as credenciais Google viajam pelo contexto da requisição
+(services/request_context.py) -- então basta uma instância por modelo
+("gemini", "gpt", "claude") por processo, criada na primeira vez em que o
+modelo é pedido (ou no startup, via `warm_up`) e reaproveitada dali em diante.
+"""
+
+import logging
+from threading import Lock
+from typing import Dict, Iterable
+
+from agent.agent import AgentFactory
+
+logger = logging.getLogger(__name__)
+
+
+class AgentPool:
+    def __init__(self):
+        self._agents: Dict[str, AgentFactory] = {}
+        self._lock = Lock()
+
+    def get(self, llm: str) -> AgentFactory:
+        """
+        Devolve a AgentFactory do modelo `llm`, criando-a se ainda não existir.
+
+        Raises:
+            ValueError: Se modelo inválido
+            RuntimeError: Se erro ao inicializar LLM (a falha não fica no
+                pool -- a próxima chamada tenta de novo)
+        """
+        agent = self._agents.get(llm)
+        if agent is not None:
+            return agent
+
+        with self._lock:
+            agent = self._agents.get(llm)
+            if agent is None:
+                agent = AgentFactory(llm=llm)
+                self._agents[llm] = agent
+                logger.info(f"AgentPool: agente '{llm}' criado e adicionado ao pool")
+        return agent
+
+    def warm_up(self, models: Iterable[str]) -> None:
+        """Cria antecipadamente os agentes de `models` (falhas só são logadas)."""
+        for llm in models:
+            try:
+                self.get(llm)
+            except (ValueError, RuntimeError) as e:
+                logger.warning(f"AgentPool: não foi possível pré-carregar '{llm}': {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._agents.clear()
+
+
+# Instância única compartilhada pela aplicação inteira.
+agent_pool = AgentPool()
@@ -0,0 +1,119 @@
+"""
+Política de cache de resultados por ferramenta (usada pelo nó de ferramentas,
+agent/parallel_tools.py, com o cache do processo -- utils/tool_cache.py).
+
+Só é cacheado o que está listado em TOOL_CACHE_POLICIES; qualquer ferramenta
+fora da lista (CriarEvento, EnviarEmail, as skills com LLM...) sempre
+executa. Cada política define:
+
+- "ttl_minutes": por quanto tempo o resultado vale;
+- "normalize": argumentos de texto livre comparados de forma normalizada
+  (minúsculas, espaços colapsados, sem pontuação final) -- "Como faço deploy?"
+  e "como faço  deploy" caem na mesma entrada;
+- "per_user": o resultado depende de QUEM pergunta (agenda, e-mail, Drive),
+  então a chave inclui a identidade do usuário da requisição
+  (services/request_context.py). Sem identidade conhecida, não cacheia.
+
+As ferramentas reportam falhas como texto ("Erro ao consultar agenda: ...")
+em vez de exceção; esses resultados (UNCACHEABLE_PREFIXES) também não são
+guardados, para uma falha momentânea não ficar presa no cache pelo TTL.
+O mesmo vale para o pedido de login (MSG_LOGIN): depois que o usuário faz
+login, a próxima consulta tem que ir ao Google.
+
+Escritas invalidam as leituras do mesmo usuário (INVALIDATED_BY): depois de
+um CriarEvento, a ConsultarAgenda em cache daquele usuário já não vale. As
+entradas dessas leituras levam na chave uma "geração" por (ferramenta,
+usuário), guardada no próprio cache -- então vale entre workers com o
+backend sqlite/redis --, e cada escrita incrementa a geração, o que torna
+todas as entradas anteriores inalcançáveis (saem pelo TTL).
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from services.request_context import get_user_identity
+from tools.google_tools import MSG_LOGIN
+
+TOOL_CACHE_POLICIES: Dict[str, Dict[str, Any]] = {
+    # RAG: mesma pergunta, mesma resposta até a base ser reindexada.
+    "AjudaShark": {"ttl_minutes": 30, "normalize": ["pergunta", "temas"]},
+    "RAGDaBaseDeCodigo": {"ttl_minutes": 30, "normalize": ["pergunta"]},
+    "OnboardingGuiado": {"ttl_minutes": 30, "normalize": ["pergunta"]},
+    # Monitoramento: barato de recalcular, mas não precisa ser a cada pergunta.
+    "MonitorDeCustosLLM": {"ttl_minutes": 1},
+    "HealthCheckAgregado": {"ttl_minutes": 1},
+    # pip-audit do mesmo requirements.txt: a base de vulnerabilidades muda devagar.
+    "AuditoriaDeDependencias": {"ttl_minutes": 60},
+    # Leituras no Google, por usuário. TTL curto: agenda e caixa de entrada mudam.
+    "ConsultarAgenda": {"ttl_minutes": 2, "per_user": True},
+    "ConsultarEmail": {"ttl_minutes": 2, "per_user": True},
+    "BuscarNoDrive": {"ttl_minutes": 5, "per_user": True, "normalize": ["query"]},
+}
+
+# Leitura por usuário -> escritas que mudam o que ela devolve.
+INVALIDATED_BY: Dict[str, List[str]] = {
+    "ConsultarAgenda": ["CriarEvento"],
+    "ConsultarEmail": ["EnviarEmail"],
+}
+
+# Entrada do cache com a geração de cada (leitura, usuário). Vive bem mais
+# que o TTL das leituras: se expirar e voltar a 0, as entradas da geração 0
+# já expiraram há muito tempo.
+GENERATION_CACHE_NAME = "__generation"
+GENERATION_TTL_MINUTES = 24 * 60
+
+UNCACHEABLE_PREFIXES = (
+    "Erro",
+    "Não consegui",
+    "Usuário não logado",
+    "(Resumo automático indisponível",
+    MSG_LOGIN,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(value: Any) -> Any:
+    """Normaliza texto livre para comparação (listas viram listas ordenadas)."""
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip().lower().rstrip("?!.;: ")
+    if isinstance(value, (list, tuple)):
+        return sorted(normalize_text(v) for v in value)
+    return value
+
+
+def cache_key_args(tool_name: str, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Argumentos que identificam o resultado de `tool_name` no cache, ou None se
+    essa chamada não deve ser cacheada.
+    """
+    policy = TOOL_CACHE_POLICIES.get(tool_name)
+    if policy is None:
+        return None
+
+    key_args = dict(args or {})
+    for name in policy.get("normalize", []):
+        if name in key_args:
+            key_args[name] = normalize_text(key_args[name])
+
+    if policy.get("per_user"):
+        identity = get_user_identity()
+        if not identity:
+            return None
+        key_args["__user"] = identity
+
+    return key_args
+
+
+def cache_ttl_minutes(tool_name: str) -> int:
+    return TOOL_CACHE_POLICIES[tool_name]["ttl_minutes"]
+
+
+def is_cacheable_result(content: Any) -> bool:
+    """False para resultados vazios ou que são, na verdade, uma mensagem de erro."""
+    return isinstance(content, str) and bool(content) and not content.startswith(UNCACHEABLE_PREFIXES)
+
+
+def invalidated_reads(tool_name: str) -> List[str]:
+    """Leituras em cache que uma execução de `tool_name` invalida."""
+    return [read for read, writes in INVALIDATED_BY.items() if tool_name in writes]
@@ -12,9 +12,11 @@ Sem ADMIN_TOKEN configurado no .env, estas rotas ficam DESATIVADAS por
 completo (503) -- diferente do X-API-Key, que fica desabilitado (permissivo)
 quando não configurado. Aqui o padrão seguro é "fechado por default", porque
 o dano potencial de deixar isso aberto é maior (criar/revogar acesso à API).
+
+As rotas são `def` (não `async def`): só fazem acesso síncrono ao banco, e
+assim o FastAPI as executa no threadpool em vez de bloquear o event loop.
 """
 
-import hashlib
 import logging
 import secrets
 
@@ -30,6 +32,8 @@ from api.schemas import (
 )
 from db.base import get_db
 from db.models import ApiClient, Employee
+from services.api_keys import api_key_registry, hash_api_key
+from utils.files import invalidate_emails_cache
 from utils.settings import WrappedSettings as Settings
 
 logger = logging.getLogger(__name__)
@@ -54,29 +58,31 @@ async def verify_admin(x_admin_token: str = Header(default=None, alias=ADMIN_HEA
 # ---------------------------------------------------------------------------
 
 @router.get("/employees", response_model=list[EmployeeOut], dependencies=[Depends(verify_admin)])
-async def list_employees(db: DBSession = Depends(get_db)):
+def list_employees(db: DBSession = Depends(get_db)):
     rows = db.query(Employee).order_by(Employee.nome).all()
     return [EmployeeOut(id=r.id, nome=r.nome, email=r.email, ativo=r.ativo) for r in rows]
 
 
 @router.post("/employees", response_model=EmployeeOut, dependencies=[Depends(verify_admin)])
-async def create_employee(payload: EmployeeCreate, db: DBSession = Depends(get_db)):
+def create_employee(payload: EmployeeCreate, db: DBSession = Depends(get_db)):
     if db.query(Employee).filter(Employee.email == payload.email).first():
         raise HTTPException(status_code=409, detail="Já existe um funcionário com esse email.")
     row = Employee(nome=payload.nome, email=payload.email, ativo=True)
     db.add(row)
     db.commit()
+    invalidate_emails_cache()
     return EmployeeOut(id=row.id, nome=row.nome, email=row.email, ativo=row.ativo)
 
 
 @router.delete("/employees/{employee_id}", response_model=EmployeeOut, dependencies=[Depends(verify_admin)])
-async def deactivate_employee(employee_id: int, db: DBSession = Depends(get_db)):
+def deactivate_employee(employee_id: int, db: DBSession = Depends(get_db)):
     """Soft delete -- marca como inativo, mas mantém o histórico (mensagens antigas, por exemplo, referenciam o nome)."""
     row = db.query(Employee).filter(Employee.id == employee_id).first()
     if row is None:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado.")
     row.ativo = False
     db.commit()
+    invalidate_emails_cache()
     return EmployeeOut(id=row.id, nome=row.nome, email=row.email, ativo=row.ativo)
 
 
@@ -85,27 +91,28 @@ async def deactivate_employee(employee_id: int, db: DBSession = Depends(get_db))
 # ---------------------------------------------------------------------------
 
 @router.get("/api-clients", response_model=list[ApiClientOut], dependencies=[Depends(verify_admin)])
-async def list_api_clients(db: DBSession = Depends(get_db)):
+def list_api_clients(db: DBSession = Depends(get_db)):
     rows = db.query(ApiClient).order_by(ApiClient.created_at.desc()).all()
     return [ApiClientOut(id=r.id, name=r.name, active=r.active) for r in rows]
 
 
 @router.post("/api-clients", response_model=ApiClientCreated, dependencies=[Depends(verify_admin)])
-async def create_api_client(payload: ApiClientCreate, db: DBSession = Depends(get_db)):
+def create_api_client(payload: ApiClientCreate, db: DBSession = Depends(get_db)):
     """Gera uma nova chave. O valor em texto puro só aparece nesta resposta -- não fica recuperável depois."""
     plaintext_key = secrets.token_urlsafe(32)
-    key_hash = hashlib.sha256(plaintext_key.encode()).hexdigest()
-    row = ApiClient(name=payload.name, key_hash=key_hash, active=True)
+    row = ApiClient(name=payload.name, key_hash=hash_api_key(plaintext_key), active=True)
     db.add(row)
     db.commit()
+    api_key_registry.invalidate()
     return ApiClientCreated(id=row.id, name=row.name, api_key=plaintext_key)
 
 
 @router.delete("/api-clients/{client_id}", response_model=ApiClientOut, dependencies=[Depends(verify_admin)])
-async def revoke_api_client(client_id: int, db: DBSession = Depends(get_db)):
+def revoke_api_client(client_id: int, db: DBSession = Depends(get_db)):
     row = db.query(ApiClient).filter(ApiClient.id == client_id).first()
     if row is None:
         raise HTTPException(status_code=404, detail="Cliente não encontrado.")
     row.active = False
     db.commit()
+    api_key_registry.invalidate()
     return ApiClientOut(id=row.id, name=row.name, active=row.active)
\ No newline at end of file
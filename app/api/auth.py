@@ -19,21 +19,17 @@ tem como anexar um header customizado. A proteção real desse fluxo é o
 próprio `state` (amarrado à sessão) e o consentimento na tela do Google.
 """
 
-import hashlib
 import json
 import logging
-from datetime import datetime, timezone
 from typing import Optional
 
 import requests
-from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query
 from fastapi.responses import RedirectResponse
 from google_auth_oauthlib.flow import Flow
-from sqlalchemy.orm import Session as DBSession
 
 from api.schemas import GoogleStatusResponse
-from db.base import get_db
-from db.models import ApiClient
+from services.api_keys import api_key_registry
 from services.session_store import session_store
 from utils.files import get_emails
 from utils.settings import WrappedSettings as Settings
@@ -52,10 +48,7 @@ SCOPES = [
 ]
 
 
-async def verify_api_key(
-    x_api_key: Optional[str] = Header(default=None, alias=API_KEY_HEADER),
-    db: DBSession = Depends(get_db),
-):
+def verify_api_key(x_api_key: Optional[str] = Header(default=None, alias=API_KEY_HEADER)):
     """
     Dependency do FastAPI usada nas rotas de /chat. Cada chave é guardada só
     como hash (sha256) na tabela `api_clients` -- o texto puro só existe no
@@ -65,24 +58,26 @@ async def verify_api_key(
     Se a tabela estiver vazia (nenhum cliente cadastrado e nenhuma API_KEY
     legada configurada no .env), a verificação fica desabilitada -- mesmo
     comportamento "modo dev" que já existia antes desta migração para SQL.
+
+    A verificação consulta o cache em memória de services/api_keys.py, não
+    o banco: a tabela só é relida quando o cache vence ou é invalidado pelas
+    rotas /admin/api-clients, e o `last_used_at` é gravado em lote.
+
+    `def` (e não `async def`) de propósito: quando o cache vence, a releitura
+    da tabela é síncrona, e o FastAPI executa dependencies síncronas no
+    threadpool em vez de no event loop.
     """
-    if db.query(ApiClient).count() == 0:
+    if not api_key_registry.has_clients():
         return
 
     if not x_api_key:
         raise HTTPException(status_code=401, detail="X-API-Key ausente.")
 
-    key_hash = hashlib.sha256(x_api_key.encode()).hexdigest()
-    client = (
-        db.query(ApiClient)
-        .filter(ApiClient.key_hash == key_hash, ApiClient.active == True)  # noqa: E712
-        .first()
-    )
-    if client is None:
+    client_id = api_key_registry.lookup(x_api_key)
+    if client_id is None:
         raise HTTPException(status_code=401, detail="X-API-Key inválida, revogada ou ausente.")
 
-    client.last_used_at = datetime.now(timezone.utc)
-    db.commit()
+    api_key_registry.touch(client_id)
 
 
 router = APIRouter(prefix="/auth/google", tags=["auth"])
@@ -115,7 +110,7 @@ def _get_flow() -> Flow:
 
 
 @router.get("/login")
-async def google_login(session_id: Optional[str] = Query(default=None)):
+def google_login(session_id: Optional[str] = Query(default=None)):
     """
     Inicia o login Google: redireciona o navegador para a tela de consentimento.
     Passe seu `session_id` (se já tiver um de uma conversa em andamento) para
@@ -133,7 +128,7 @@ async def google_login(session_id: Optional[str] = Query(default=None)):
 
 
 @router.get("/callback")
-async def google_callback(code: str, state: str):
+def google_callback(code: str, state: str):
     """Endpoint de retorno chamado pelo próprio Google após o consentimento."""
     sid = state
     try:
@@ -192,7 +187,7 @@ async def google_callback(code: str, state: str):
 
 
 @router.get("/status", response_model=GoogleStatusResponse)
-async def google_status(session_id: str = Query(...)):
+def google_status(session_id: str = Query(...)):
     """Verifica se a sessão informada está autenticada no Google."""
     creds_dict = session_store.get_google_credentials(session_id)
     user_info = session_store.get_user_info(session_id) or {}
@@ -205,7 +200,7 @@ async def google_status(session_id: str = Query(...)):
 
 
 @router.post("/logout")
-async def google_logout(session_id: str = Query(...)):
+def google_logout(session_id: str = Query(...)):
     """Remove as credenciais Google da sessão (mantém o histórico de conversa)."""
     session_store.set_google_credentials(session_id, None)
     session_store.set_user_info(session_id, None)
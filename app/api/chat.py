@@ -6,24 +6,49 @@ suportar anexos opcionais no mesmo request — é o equivalente ao popover de
 upload que existia ao lado do chat_input no Streamlit. Texto e arquivos viajam
 juntos, exatamente como antes.
 
-Notamos que cada chamada cria uma AgentFactory nova (em vez de reaproveitar
-uma por sessão). Isso é deliberado: as tools de Calendar/Gmail guardam as
-credenciais do usuário como estado da própria instância (`tool.set_credentials`),
-então uma AgentFactory compartilhada entre sessões/usuários correria o risco de
-uma requisição ler as credenciais de outra. Criar uma instância nova por
-chamada custa pouco (é só montar o grafo e vincular as tools) e elimina esse
-risco por completo. Se isso um dia pesar em volume alto de requisições, dá para
-otimizar reaproveitando uma factory por sessão — mas exigiria revisar as tools
-para não guardarem credenciais como atributo de instância.
+O agente não é montado a cada chamada: `agent_pool` (agent/pool.py) guarda
+uma AgentFactory já compilada por modelo e a reaproveita entre requisições e
+usuários. Isso só é seguro porque as tools de Calendar/Gmail/Drive não
+guardam mais as credenciais do usuário como atributo de instância -- elas as
+leem do contexto da requisição (services/request_context.py), que a
+AgentFactory define durante cada invoke.
+
+O /chat é assíncrono de ponta a ponta: o agente roda via `ainvoke` e as
+chamadas síncronas ao banco (session_store) vão para o threadpool do
+Starlette (`run_in_threadpool`). Assim, uma chamada lenta a um LLM não segura
+as demais requisições atendidas pelo mesmo worker do Uvicorn. Rotas sem nada
+assíncrono a aguardar (como o histórico) são `def` simples -- o FastAPI já as
+executa no threadpool.
+
+O /chat/stream faz a mesma coisa, mas responde em Server-Sent Events: tokens
+do orquestrador e início/fim de cada ferramenta vão chegando ao cliente
+enquanto o agente trabalha, em vez de tudo só no final -- para o usuário, o
+tempo até o primeiro byte pesa bem mais que a latência total.
+
+Nos dois, o agente não recebe o histórico inteiro: `assemble_context`
+(agent/context.py) escolhe as mensagens recentes que cabem no orçamento de
+tokens do modelo, mais o resumo das antigas. Quando o resumo precisa avançar,
+isso é feito em background, depois da resposta já ter sido enviada.
+
+Históricos longos não trafegam inteiros a cada chamada: o
+/chat/{session_id}/history é paginado por cursor (`after_id` + `limit`), e
+o /chat com `incremental=true` devolve só as mensagens do turno (com ids, que
+servem de cursor) -- nesse modo, nem a leitura do banco traz a conversa toda.
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 import google.oauth2.credentials
 
-from agent.agent import AgentFactory
+from agent.context import assemble_context, update_summary
+from agent.pool import agent_pool
 from api.auth import verify_api_key
 from api.schemas import ChatMessage, ChatResponse, HistoryResponse
 from services.session_store import session_store
@@ -32,6 +57,12 @@ from utils.settings import WrappedSettings as Settings
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["chat"])
 
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Turnos do /chat/stream ainda rodando (inclusive de clientes que já desconectaram).
+_running_turns: Set[asyncio.Task] = set()
+
 
 def _build_credentials(creds_dict: Optional[dict]) -> Optional[google.oauth2.credentials.Credentials]:
     if not creds_dict:
@@ -39,6 +70,78 @@ def _build_credentials(creds_dict: Optional[dict]) -> Optional[google.oauth2.cre
     return google.oauth2.credentials.Credentials(**creds_dict)
 
 
+async def _prepare_turn(
+    session_id: Optional[str],
+    llm: str,
+    files: List[UploadFile],
+    full_history: bool = True,
+) -> Dict[str, Any]:
+    """
+    Passos comuns a /chat e /chat/stream antes de rodar o agente: resolve a
+    sessão, lê os anexos, carrega histórico/credenciais/perfil (uma única
+    consulta -- `session_store.load_context`) e monta a janela de histórico
+    do prompt, as duas coisas numa thread, e pega a AgentFactory do pool
+    (HTTP 400 se o modelo for inválido).
+
+    Com `full_history=False`, "history" traz só o que o prompt precisa (as
+    mensagens ainda não resumidas), não a conversa inteira.
+    """
+    def load() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        # Na mesma thread da consulta: contar os tokens do histórico (e, na
+        # primeira vez, carregar o vocabulário do tiktoken) não roda no event loop.
+        context = session_store.load_context(session_id, full_history)
+        window = assemble_context(
+            context["messages"], context["summary"], context["summary_upto_message_id"], llm
+        )
+        return context, window
+
+    context, window = await run_in_threadpool(load)
+    sid = context["session_id"]
+
+    files_to_send = []
+    for f in files:
+        content = await f.read()
+        files_to_send.append({
+            "name": f.filename,
+            "data": content,
+            "mime": f.content_type or "application/octet-stream",
+        })
+
+    try:
+        factory = await run_in_threadpool(agent_pool.get, llm)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "sid": sid,
+        "history": context["messages"],
+        "factory": factory,
+        "window": window,
+        "agent_kwargs": {
+            "session_messages": window["messages"],
+            "session_summary": window["summary"],
+            "uploaded_files": files_to_send,
+            "user_credentials": _build_credentials(context["google_credentials"]),
+            "user_infos": context["user_info"] or {},
+            "session_id": sid,
+        },
+    }
+
+
+def _summary_task(turn: Dict[str, Any]) -> Optional[BackgroundTask]:
+    """Atualização do resumo da sessão, para rodar depois da resposta -- None se não for necessária."""
+    window = turn["window"]
+    if not window["needs_summary"]:
+        return None
+    factory = turn["factory"]
+    return BackgroundTask(update_summary, factory.llm, factory.llm_name, turn["sid"], window)
+
+
+def _sse(event: str, data: Any) -> str:
+    """Formata um evento no padrão Server-Sent Events (`event:` + `data:` em JSON)."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     message: str = Form(..., description="Mensagem do usuário para a Cidinha."),
@@ -50,55 +153,155 @@ async def chat(
         default=Settings.orchestrator,
         description="Modelo: 'gemini' (padrão, configurável via ORCHESTRATOR_MODEL), 'gpt' ou 'claude'."
     ),
+    incremental: bool = Form(
+        default=False,
+        description="Se verdadeiro, `history` traz só as mensagens deste turno, não a conversa inteira."
+    ),
     files: List[UploadFile] = File(default=[]),
+    background_tasks: BackgroundTasks = None,
     _api_key: None = Depends(verify_api_key),
 ):
-    sid = session_store.get_or_create(session_id)
-
-    files_to_send = []
-    for f in files:
-        content = await f.read()
-        files_to_send.append({
-            "name": f.filename,
-            "data": content,
-            "mime": f.content_type or "application/octet-stream",
-        })
-
-    history = session_store.get_messages(sid)
-    creds_dict = session_store.get_google_credentials(sid)
-    user_infos = session_store.get_user_info(sid) or {}
-
-    try:
-        factory = AgentFactory(llm=llm)
-    except (ValueError, RuntimeError) as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    turn = await _prepare_turn(session_id, llm, files, full_history=not incremental)
+    sid = turn["sid"]
 
-    result = factory.invoke(
-        input_text=message,
-        session_messages=history,
-        uploaded_files=files_to_send,
-        user_credentials=_build_credentials(creds_dict),
-        user_infos=user_infos,
-        session_id=sid,
-    )
+    result = await turn["factory"].ainvoke(input_text=message, **turn["agent_kwargs"])
 
     outputs = result.get("output", [])
     reply_text = outputs[0]["content"] if outputs else ""
 
-    # Persiste a mensagem do usuário e a(s) resposta(s) da Cidinha no histórico da sessão
-    session_store.append_messages(sid, [{"role": "user", "content": message}] + outputs)
-    updated_history = session_store.get_messages(sid)
+    # Persiste a mensagem do usuário e a(s) resposta(s) da Cidinha no
+    # histórico da sessão -- uma transação; o histórico devolvido é o que já
+    # estava carregado mais o turno novo, sem reler do banco.
+    new_messages = [{"role": "user", "content": message}] + outputs
+    ids = await run_in_threadpool(session_store.save_turn, sid, new_messages)
+    new_messages = [{**m, "id": message_id} for m, message_id in zip(new_messages, ids)]
+
+    summary_task = _summary_task(turn)
+    if summary_task is not None:
+        background_tasks.add_task(summary_task)
 
     return ChatResponse(
         session_id=sid,
         reply=reply_text,
-        history=[ChatMessage(**m) for m in updated_history],
+        history=[ChatMessage(**m) for m in (new_messages if incremental else turn["history"] + new_messages)],
+    )
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    message: str = Form(..., description="Mensagem do usuário para a Cidinha."),
+    session_id: Optional[str] = Form(
+        default=None,
+        description="session_id de uma conversa em andamento. Omita para iniciar uma nova."
+    ),
+    llm: str = Form(
+        default=Settings.orchestrator,
+        description="Modelo: 'gemini' (padrão, configurável via ORCHESTRATOR_MODEL), 'gpt' ou 'claude'."
+    ),
+    files: List[UploadFile] = File(default=[]),
+    _api_key: None = Depends(verify_api_key),
+):
+    """
+    Mesma conversa do /chat, mas respondida em Server-Sent Events, à medida
+    que o agente trabalha:
+
+    - `session`: primeiro evento, enviado de imediato, com o `session_id`;
+    - `token`: trecho de texto gerado pelo orquestrador;
+    - `tool_start` / `tool_end`: início e fim de cada ferramenta (nome,
+      sucesso, duração e se o resultado veio do cache);
+    - `final`: a resposta completa (`reply`), a mesma que o /chat devolveria;
+    - `error`: o agente falhou; nada é gravado, como no /chat.
+
+    O agente roda numa task própria, separada da conexão: se o cliente
+    desconectar no meio, o turno vai até o fim e o histórico é gravado
+    exatamente como no /chat (a mensagem do usuário e a resposta, inclusive
+    quando uma ferramenta já mandou um e-mail ou criou um evento). Com o
+    cliente conectado, a gravação acontece antes do evento `final` -- quem
+    quiser o histórico completo pode chamar /chat/{session_id}/history em
+    seguida.
+    """
+    turn = await _prepare_turn(session_id, llm, files, full_history=False)
+    sid = turn["sid"]
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run_turn() -> None:
+        summary_task = None
+        try:
+            async for event in turn["factory"].astream(input_text=message, **turn["agent_kwargs"]):
+                if event["event"] == "final":
+                    outputs = event["data"].get("output", [])
+                    await run_in_threadpool(
+                        session_store.save_turn, sid, [{"role": "user", "content": message}] + outputs
+                    )
+                    summary_task = _summary_task(turn)
+                    event = {"event": "final", "data": {
+                        "session_id": sid,
+                        "reply": outputs[0]["content"] if outputs else "",
+                    }}
+                await queue.put(event)
+        except Exception as e:
+            logger.exception(f"/chat/stream: erro no turno da sessão {sid}")
+            await queue.put({"event": "error", "data": {"session_id": sid, "detail": str(e)[:500]}})
+        finally:
+            await queue.put(None)
+        if summary_task is not None:
+            await summary_task()
+
+    async def events() -> AsyncIterator[str]:
+        task = asyncio.create_task(run_turn())
+        # Referência forte: a task tem que sobreviver ao fim da resposta.
+        _running_turns.add(task)
+        task.add_done_callback(_running_turns.discard)
+
+        yield _sse("session", {"session_id": sid})
+        while (event := await queue.get()) is not None:
+            yield _sse(event["event"], event["data"])
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Sem cache e sem buffering em proxies (ex.: nginx), senão os eventos
+        # só chegam ao cliente todos juntos no final.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.get("/chat/{session_id}/history", response_model=HistoryResponse)
-async def get_history(session_id: str, _api_key: None = Depends(verify_api_key)):
+def get_history(
+    session_id: str,
+    after_id: Optional[int] = Query(
+        default=None,
+        description="Devolve só as mensagens com id maior que este (o `next_after_id` da página anterior)."
+    ),
+    limit: Optional[int] = Query(
+        default=None,
+        ge=1,
+        le=HISTORY_MAX_PAGE_SIZE,
+        description=f"Mensagens por página (padrão: {HISTORY_PAGE_SIZE} com `after_id`; sem nenhum dos dois, a conversa inteira)."
+    ),
+    _api_key: None = Depends(verify_api_key),
+):
+    """
+    Histórico da sessão em ordem cronológica, paginado por cursor. Sem
+    `limit` nem `after_id`, devolve a conversa inteira, como antes da
+    paginação -- clientes antigos não mudam de comportamento.
+    """
     if not session_store.exists(session_id):
         raise HTTPException(status_code=404, detail="Sessão não encontrada (ou expirada).")
-    history = session_store.get_messages(session_id)
-    return HistoryResponse(session_id=session_id, history=[ChatMessage(**m) for m in history])
\ No newline at end of file
+    if limit is None and after_id is None:
+        history = session_store.get_messages(session_id)
+        return HistoryResponse(
+            session_id=session_id,
+            history=[ChatMessage(**m) for m in history],
+            next_after_id=None,
+        )
+    limit = limit or HISTORY_PAGE_SIZE
+    # Um a mais que o pedido, só para saber se existe próxima página.
+    history = session_store.get_messages(session_id, after_id=after_id, limit=limit + 1)
+    has_more = len(history) > limit
+    history = history[:limit]
+    return HistoryResponse(
+        session_id=session_id,
+        history=[ChatMessage(**m) for m in history],
+        next_after_id=history[-1]["id"] if has_more else None,
+    )
\ No newline at end of file
@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 
 
 class ChatMessage(BaseModel):
+    id: Optional[int] = Field(default=None, description="Id da mensagem -- use como `after_id` para paginar o histórico.")
     role: str = Field(..., description="'user' ou 'assistant'")
     content: str
 
@@ -13,12 +14,19 @@ class ChatResponse(BaseModel):
         description="Guarde este id e reenvie nas próximas chamadas para continuar a mesma conversa."
     )
     reply: str = Field(..., description="Resposta da Cidinha para esta mensagem.")
-    history: List[ChatMessage] = Field(..., description="Histórico completo da conversa até agora.")
+    history: List[ChatMessage] = Field(
+        ...,
+        description="Histórico completo da conversa até agora -- ou, com `incremental=true`, só as mensagens deste turno."
+    )
 
 
 class HistoryResponse(BaseModel):
     session_id: str
     history: List[ChatMessage]
+    next_after_id: Optional[int] = Field(
+        default=None,
+        description="Se houver mais mensagens, passe este valor como `after_id` para buscar a próxima página."
+    )
 
 
 class GoogleStatusResponse(BaseModel):
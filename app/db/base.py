@@ -8,12 +8,34 @@ Postgres em produção, só trocando DATABASE_URL no .env. O restante do código
 (app/db/models.py, app/services/session_store.py, etc.) não faz nenhuma
 suposição específica de dialeto, então migrar de um para o outro não exige
 mudar mais nada além dessa variável de ambiente.
+
+Pool de conexões: com os defaults do SQLAlchemy, uma conexão derrubada pelo
+servidor (restart, proxy/PgBouncer fechando conexões ociosas) só era
+descoberta quando uma requisição falhava ao usá-la, e o tamanho do pool não
+era configurável por ambiente. Agora tamanho, overflow, timeout, recycle e
+pre-ping vêm de DB_POOL_* (utils/settings.py) e valem para cada worker.
+
+SQLite: cada conexão nova sai com `journal_mode=WAL` (leitores não bloqueiam
+mais o escritor e vice-versa), `synchronous=NORMAL` (seguro em WAL; só
+perde as últimas transações numa queda de energia, não corrompe o arquivo) e
+`busy_timeout` (uma escrita espera a outra terminar em vez de falhar na hora
+com "database is locked"). Escritas continuam em série -- é o limite do
+SQLite --, mas sem erro sob carga de vários workers.
+
+`pool_status()` expõe conexões em uso, overflow e o tempo de espera por uma
+conexão livre (total, máximo e timeouts desde a subida), lido pelo /health.
 """
 
 import logging
+import time
+from threading import Lock
+from typing import Any, Dict
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from utils.settings import WrappedSettings as Settings
 
@@ -27,7 +49,83 @@ Base = declarative_base()
 _is_sqlite = Settings.database_url.startswith("sqlite")
 _connect_args = {"check_same_thread": False} if _is_sqlite else {}
 
-engine = create_engine(Settings.database_url, connect_args=_connect_args)
+
+class PoolMetrics:
+    """Contadores de espera por conexão do pool (thread-safe, acumulados desde a subida)."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def record(self, wait_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_ms / waits, 3) if waits else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedQueuePool(QueuePool):
+    """QueuePool que mede quanto cada checkout esperou por uma conexão livre."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        pool_metrics.record((time.perf_counter() - start) * 1000)
+        return connection
+
+
+def _engine_options() -> Dict[str, Any]:
+    pool = Settings.db_pool
+    if _is_sqlite and make_url(Settings.database_url).database in (None, "", ":memory:"):
+        # SQLite em memória: cada conexão seria um banco diferente, então o
+        # SQLAlchemy usa um pool próprio (uma conexão por thread). Sem tuning.
+        return {}
+    return {
+        "poolclass": _TimedQueuePool,
+        "pool_size": pool["pool_size"],
+        "max_overflow": pool["max_overflow"],
+        "pool_timeout": pool["pool_timeout"],
+        "pool_recycle": pool["pool_recycle"],
+        "pool_pre_ping": pool["pool_pre_ping"],
+    }
+
+
+engine = create_engine(Settings.database_url, connect_args=_connect_args, **_engine_options())
+
+if _is_sqlite:
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={int(Settings.db_pool['sqlite_busy_timeout_ms'])}")
+        finally:
+            cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -40,6 +138,22 @@ def get_db():
         db.close()
 
 
+def pool_status() -> Dict[str, Any]:
+    """Estado atual do pool (conexões em uso, ociosas, overflow) e as métricas de espera."""
+    pool = engine.pool
+    status: Dict[str, Any] = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": Settings.db_pool["max_overflow"],
+        })
+    status.update(pool_metrics.snapshot())
+    return status
+
+
 def init_db() -> None:
     """
     Cria as tabelas que ainda não existirem (idempotente -- não apaga nem
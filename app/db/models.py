@@ -8,6 +8,10 @@ antes de partir pro código:
 - ApiClient               -> clientes da API com chave individual revogável (antes: uma única API_KEY)
 - ToolCall                -> auditoria + analytics de uso das ferramentas (unificação de "agent_actions" e "tool_usage")
 - KnowledgeDocument       -> controle de quais arquivos já foram indexados no Chroma (Shark Helper)
+- KnowledgeChunk          -> os chunks de cada arquivo indexado: id no Chroma + hash do texto (reindexação por delta)
+- KnowledgeTerm           -> índice invertido (BM25) dos chunks, para a busca híbrida (services/retrieval.py)
+- LLMCall                 -> cada chamada a um LLM, com tokens e custo estimado (MonitorDeCustosLLM)
+- LLMUsageHourly/Daily    -> totais de `llm_calls` por hora/dia, modelo e skill (services/llm_rollups.py)
 """
 
 import uuid
@@ -19,6 +23,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -47,6 +52,10 @@ class SessionModel(Base):
     user_email = Column(String, nullable=True)
     created_at = Column(DateTime, default=_utcnow)
     last_active = Column(DateTime, default=_utcnow)
+    # Resumo das mensagens mais antigas, usado no lugar delas no prompt
+    # (agent/context.py), e o id da última mensagem que ele cobre.
+    summary = Column(Text, nullable=True)
+    summary_upto_message_id = Column(Integer, nullable=True)
 
     messages = relationship(
         "Message", back_populates="session", cascade="all, delete-orphan"
@@ -136,6 +145,8 @@ class ToolCall(Base):
     success = Column(Boolean, default=True)
     error_message = Column(Text, nullable=True)
     duration_ms = Column(Integer, nullable=True)
+    # Resultado servido do cache de ferramentas, sem executar de novo.
+    cached = Column(Boolean, default=False)
     created_at = Column(DateTime, default=_utcnow, index=True)
 
 
@@ -153,6 +164,44 @@ class KnowledgeDocument(Base):
     indexed_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
 
 
+class KnowledgeChunk(Base):
+    """
+    Um chunk (página ou trecho) de um arquivo indexado no Chroma. `id` é o
+    mesmo id do vetor no Chroma, derivado de (coleção, arquivo, posição,
+    hash do texto) -- ver services/knowledge_tracking.py.
+    """
+
+    __tablename__ = "knowledge_chunks"
+    __table_args__ = (UniqueConstraint("collection", "filename", "chunk_index", name="uq_knowledge_chunk"),)
+
+    id = Column(String, primary_key=True)
+    collection = Column(String, nullable=False)
+    filename = Column(String, nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    chunk_hash = Column(String, nullable=False)
+    # Termos do chunk no índice BM25; NULL = ainda não indexado (chunks de
+    # antes do índice existir -- ver `python -m services.retrieval`).
+    num_terms = Column(Integer, nullable=True)
+    indexed_at = Column(DateTime, default=_utcnow)
+
+
+class KnowledgeTerm(Base):
+    """
+    Índice invertido dos chunks: quantas vezes `term` aparece no chunk
+    `chunk_id`. Gravado junto com `knowledge_chunks`, na mesma transação,
+    e consultado pela parte BM25 da busca híbrida (services/retrieval.py).
+    """
+
+    __tablename__ = "knowledge_terms"
+    # A busca lê todos os chunks de uma coleção que contêm um dos termos.
+    __table_args__ = (Index("ix_knowledge_terms_collection_term", "collection", "term"),)
+
+    chunk_id = Column(String, primary_key=True)
+    term = Column(String, primary_key=True)
+    collection = Column(String, nullable=False)
+    tf = Column(Integer, nullable=False)
+
+
 class LLMCall(Base):
     """
     Registro de cada chamada a um LLM (orquestrador OU o LLM interno de uma
@@ -163,6 +212,9 @@ class LLMCall(Base):
     """
 
     __tablename__ = "llm_calls"
+    # Consultas por período (MonitorDeCustosLLM, reconstrução dos totais)
+    # filtram por created_at e agrupam por modelo.
+    __table_args__ = (Index("ix_llm_calls_created_at_model", "created_at", "model"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     session_id = Column(String, nullable=True, index=True)
@@ -171,4 +223,35 @@ class LLMCall(Base):
     tokens_in = Column(Integer, nullable=True)
     tokens_out = Column(Integer, nullable=True)
     estimated_cost_usd = Column(Float, nullable=True)
-    created_at = Column(DateTime, default=_utcnow, index=True)
\ No newline at end of file
+    created_at = Column(DateTime, default=_utcnow, index=True)
+
+
+class _LLMUsageRollup:
+    """
+    Colunas comuns dos totais pré-agregados de `llm_calls`: uma linha por
+    (início do período, modelo, skill). Mantidos incrementalmente, no mesmo
+    commit que grava as linhas de `llm_calls` -- ver services/llm_rollups.py.
+    """
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bucket_start = Column(DateTime, nullable=False)
+    model = Column(String, nullable=False)
+    skill_name = Column(String, nullable=False)
+    calls = Column(Integer, nullable=False, default=0)
+    tokens_in = Column(Integer, nullable=False, default=0)
+    tokens_out = Column(Integer, nullable=False, default=0)
+    estimated_cost_usd = Column(Float, nullable=False, default=0.0)
+
+
+class LLMUsageHourly(_LLMUsageRollup, Base):
+    __tablename__ = "llm_usage_hourly"
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "model", "skill_name", name="uq_llm_usage_hourly_bucket"),
+    )
+
+
+class LLMUsageDaily(_LLMUsageRollup, Base):
+    __tablename__ = "llm_usage_daily"
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "model", "skill_name", name="uq_llm_usage_daily_bucket"),
+    )
@@ -10,8 +10,15 @@ os.environ["OAUTHLIB_RELAX_TOKEN_SCOPE"] = "1"
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from agent.llm_health import llm_health
+from agent.pool import agent_pool
 from api import admin, auth, chat
-from db.base import init_db
+from db.base import init_db, pool_status
+from services.api_keys import api_key_registry
+from services.retention import retention_job
+from services.telemetry_writer import telemetry_writer
+from utils.settings import WrappedSettings as Settings
+from utils.tool_cache import get_tool_cache
 
 logging.basicConfig(
     level=logging.INFO,
@@ -45,12 +52,37 @@ app.include_router(admin.router)
 async def on_startup():
     """Cria as tabelas que não existirem e roda as seeds iniciais (idempotente)."""
     init_db()
+    # Auditoria de ferramentas e uso de LLM são gravados em lote, fora das requisições.
+    telemetry_writer.start()
+    # Testes de conectividade dos LLMs rodam em background, fora do caminho das requisições.
+    llm_health.start(Settings.llm_health_check_interval_seconds)
+    # Expirados saem do cache de ferramentas mesmo sem ninguém lê-los.
+    get_tool_cache().start_sweeper(Settings.tool_cache["sweep_seconds"])
+    # last_used_at das chaves de API é gravado em lote, não a cada requisição.
+    api_key_registry.start_flusher(Settings.api_key_cache["flush_seconds"])
+    # Arquiva e apaga telemetria e sessões antigas (só se RETENTION_INTERVAL_HOURS > 0).
+    retention_job.start(Settings.retention["interval_hours"])
+    # Deixa o agente do orquestrador padrão pronto antes da primeira mensagem.
+    agent_pool.warm_up([Settings.orchestrator])
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    llm_health.stop()
+    get_tool_cache().stop_sweeper()
+    api_key_registry.stop_flusher()
+    retention_job.stop()
+    # Por último: grava a telemetria que ainda estiver na fila.
+    telemetry_writer.stop()
 
 
 @app.get("/health", tags=["health"])
 async def health_check():
-    """Checagem simples de disponibilidade (útil para load balancer / orquestrador)."""
-    return {"status": "ok"}
+    """
+    Checagem simples de disponibilidade (útil para load balancer / orquestrador),
+    com o estado do pool de conexões e da fila de telemetria deste worker.
+    """
+    return {"status": "ok", "db_pool": pool_status(), "telemetry": telemetry_writer.stats()}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""
+Cache das chaves de API (tabela `api_clients`) para o `verify_api_key`
+(api/auth.py).
+
+Antes, toda chamada a /chat e ao histórico fazia três idas ao banco só para
+autenticar: um COUNT(*) da tabela (para saber se a verificação está
+ligada), a busca pelo hash da chave e um UPDATE de `last_used_at` com
+commit. Agora:
+
+- os hashes das chaves ATIVAS ficam num dict em memória, recarregado no
+  máximo a cada API_KEY_CACHE_SECONDS -- verificar uma chave é uma consulta
+  ao dict. O mesmo recarregamento responde "existe algum cliente
+  cadastrado?", que liga/desliga a verificação;
+- as rotas /admin/api-clients chamam `invalidate()` ao criar ou revogar uma
+  chave, então neste processo a mudança vale na hora. Em OUTROS workers,
+  uma revogação leva até API_KEY_CACHE_SECONDS para valer -- mantenha o
+  TTL curto. Uma chave desconhecida força um recarregamento (no máximo um
+  a cada MISS_REFRESH_SECONDS), para uma chave recém-criada em outro worker
+  não ser recusada até o TTL vencer;
+- `last_used_at` é só anotado em memória e gravado em lote por uma thread
+  em background (a cada API_KEY_LAST_USED_FLUSH_SECONDS) e no shutdown. O
+  valor no banco fica atrasado em até esse intervalo -- é um dado
+  informativo, não de segurança.
+"""
+
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+from threading import Event, Lock, Thread
+from typing import Dict, Optional
+
+from sqlalchemy import update
+
+from db.base import SessionLocal
+from db.models import ApiClient
+from utils.settings import WrappedSettings as Settings
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre recarregamentos provocados por chaves desconhecidas
+# (evita que chaves inválidas em sequência virem uma consulta por requisição).
+MISS_REFRESH_SECONDS = 5
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class ApiKeyRegistry:
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = Settings.api_key_cache["ttl_seconds"] if ttl_seconds is None else ttl_seconds
+        self._active: Dict[str, int] = {}  # key_hash -> api_clients.id
+        self._has_clients = False
+        self._loaded_at: Optional[float] = None
+        # Incrementado a cada invalidate(): um recarregamento que começou
+        # antes da invalidação não pode dar o snapshot por atualizado.
+        self._generation = 0
+        self._refresh_lock = Lock()
+        self._last_used: Dict[int, datetime] = {}
+        self._last_used_lock = Lock()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    # ------------------------------------------------------------------
+    # Verificação
+    # ------------------------------------------------------------------
+
+    def _is_fresh(self, max_age: float) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < max_age
+
+    def _ensure_fresh(self, max_age: float) -> None:
+        """Relê a tabela se o snapshot for mais velho que `max_age` -- uma thread por vez, as outras esperam."""
+        if self._is_fresh(max_age):
+            return
+        with self._refresh_lock:
+            # Outra thread pode ter recarregado enquanto esperávamos o lock.
+            if self._is_fresh(max_age):
+                return
+            generation = self._generation
+            db = SessionLocal()
+            try:
+                rows = db.query(ApiClient.id, ApiClient.key_hash, ApiClient.active).all()
+            finally:
+                db.close()
+            # Troca o dict inteiro (não muta o atual): leitores concorrentes
+            # veem o snapshot antigo ou o novo, nunca um pela metade.
+            self._active = {r.key_hash: r.id for r in rows if r.active}
+            # Clientes revogados também contam: revogar a última chave não
+            # pode desligar a verificação.
+            self._has_clients = bool(rows)
+            if generation == self._generation:
+                self._loaded_at = time.monotonic()
+
+    def has_clients(self) -> bool:
+        """False se não há nenhum cliente cadastrado -- verificação desligada ("modo dev")."""
+        self._ensure_fresh(self.ttl_seconds)
+        return self._has_clients
+
+    def lookup(self, api_key: str) -> Optional[int]:
+        """Id do cliente dono da chave, se ela existir e estiver ativa; senão None."""
+        key_hash = hash_api_key(api_key)
+        self._ensure_fresh(self.ttl_seconds)
+        client_id = self._active.get(key_hash)
+        if client_id is None:
+            self._ensure_fresh(MISS_REFRESH_SECONDS)
+            client_id = self._active.get(key_hash)
+        return client_id
+
+    def invalidate(self) -> None:
+        """Descarta o snapshot -- a próxima verificação relê a tabela. Chamado pelas rotas /admin/api-clients."""
+        self._generation += 1
+        self._loaded_at = None
+
+    # ------------------------------------------------------------------
+    # last_used_at
+    # ------------------------------------------------------------------
+
+    def touch(self, client_id: int) -> None:
+        """Anota o uso da chave agora; gravado no banco no próximo `flush()`."""
+        with self._last_used_lock:
+            self._last_used[client_id] = datetime.now(timezone.utc)
+
+    def flush(self) -> int:
+        """Grava os `last_used_at` pendentes numa única transação. Devolve quantos clientes atualizou."""
+        with self._last_used_lock:
+            pending, self._last_used = self._last_used, {}
+        if not pending:
+            return 0
+
+        db = SessionLocal()
+        try:
+            # UPDATE em lote pela chave primária (um executemany).
+            db.execute(update(ApiClient), [
+                {"id": client_id, "last_used_at": used_at} for client_id, used_at in pending.items()
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Devolve o que não foi gravado, sem sobrescrever usos mais recentes.
+            with self._last_used_lock:
+                for client_id, used_at in pending.items():
+                    self._last_used.setdefault(client_id, used_at)
+            raise
+        finally:
+            db.close()
+        return len(pending)
+
+    def start_flusher(self, interval_seconds: int) -> None:
+        """Inicia a thread que grava `last_used_at` periodicamente (idempotente)."""
+        if interval_seconds <= 0:
+            logger.info("API keys: gravação periódica de last_used_at desativada (só no shutdown)")
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("API keys: erro ao gravar last_used_at")
+
+        self._thread = Thread(target=loop, name="api-key-flush", daemon=True)
+        self._thread.start()
+        logger.info(f"API keys: last_used_at gravado a cada {interval_seconds}s")
+
+    def stop_flusher(self) -> None:
+        """Para a thread e grava o que estiver pendente (chamado no shutdown)."""
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("API keys: erro ao gravar last_used_at no shutdown")
+
+
+# Instância única compartilhada pela aplicação inteira.
+api_key_registry = ApiKeyRegistry()
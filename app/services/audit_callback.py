@@ -12,21 +12,22 @@ especialistas (RevisorDeCodigo, GeradorDeTestes...) registram seu próprio
 uso separadamente, via services/llm_usage.py, já que elas chamam um LLM por
 fora do grafo principal.
 
-Falhas ao gravar a auditoria NUNCA devem interromper a resposta ao usuário
--- por isso todo acesso ao banco aqui está protegido por try/except que só
-loga o erro.
+Falhas ao gravar a auditoria NUNCA devem interromper a resposta ao usuário.
+As linhas não são gravadas aqui: vão para a fila de services/telemetry_writer.py,
+que grava em lote numa thread à parte (e só loga se falhar).
 """
 
 import logging
 import time
+from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 from uuid import UUID
 
 from langchain_core.callbacks import BaseCallbackHandler
 
-from db.base import SessionLocal
 from db.models import ToolCall
 from services.llm_usage import log_llm_call
+from services.telemetry_writer import telemetry_writer
 
 logger = logging.getLogger(__name__)
 
@@ -59,7 +60,10 @@ class SQLAuditCallbackHandler(BaseCallbackHandler):
         result_text = getattr(output, "content", None)
         if result_text is None:
             result_text = str(output)
-        self._persist(run_id, result=str(result_text), success=True, error=None)
+        # Resultado servido do cache de ferramentas (agent/parallel_tools.py):
+        # a ferramenta não rodou de novo.
+        cached = bool((getattr(output, "response_metadata", None) or {}).get("cached"))
+        self._persist(run_id, result=str(result_text), success=True, error=None, cached=cached)
 
     def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
         self._persist(run_id, result=None, success=False, error=str(error))
@@ -80,48 +84,23 @@ class SQLAuditCallbackHandler(BaseCallbackHandler):
         except Exception:
             logger.exception("Falha ao registrar uso de LLM do orquestrador (resposta ao usuário não é afetada)")
 
-    def _persist(self, run_id: UUID, result: Optional[str], success: bool, error: Optional[str]) -> None:
-        started = self._started_at.pop(run_id, None)
-        tool_name = self._tool_name.pop(run_id, "desconhecida")
-        params = self._params.pop(run_id, None)
-        duration_ms = int((time.monotonic() - started) * 1000) if started is not None else None
-
-        try:
-            db = SessionLocal()
-            try:
-                db.add(ToolCall(
-                    session_id=self.session_id,
-                    tool_name=tool_name,
-                    params=(params[:2000] if params else None),
-                    result=(result[:4000] if result else None),  # evita linhas gigantes na tabela
-                    success=success,
-                    error_message=(error[:2000] if error else None),
-                    duration_ms=duration_ms,
-                ))
-                db.commit()
-            finally:
-                db.close()
-        except Exception:
-            logger.exception("Falha ao gravar auditoria de tool_call (a resposta ao usuário segue normalmente)")
+    def _persist(
+        self, run_id: UUID, result: Optional[str], success: bool, error: Optional[str], cached: bool = False
+    ) -> None:
         started = self._started_at.pop(run_id, None)
         tool_name = self._tool_name.pop(run_id, "desconhecida")
         params = self._params.pop(run_id, None)
         duration_ms = int((time.monotonic() - started) * 1000) if started is not None else None
 
-        try:
-            db = SessionLocal()
-            try:
-                db.add(ToolCall(
-                    session_id=self.session_id,
-                    tool_name=tool_name,
-                    params=(params[:2000] if params else None),
-                    result=(result[:4000] if result else None),  # evita linhas gigantes na tabela
-                    success=success,
-                    error_message=(error[:2000] if error else None),
-                    duration_ms=duration_ms,
-                ))
-                db.commit()
-            finally:
-                db.close()
-        except Exception:
-            logger.exception("Falha ao gravar auditoria de tool_call (a resposta ao usuário segue normalmente)")
\ No newline at end of file
+        # Só enfileira -- a gravação é feita em lote, fora da requisição.
+        telemetry_writer.submit(ToolCall, {
+            "session_id": self.session_id,
+            "tool_name": tool_name,
+            "params": params[:2000] if params else None,
+            "result": result[:4000] if result else None,  # evita linhas gigantes na tabela
+            "success": success,
+            "error_message": error[:2000] if error else None,
+            "duration_ms": duration_ms,
+            "cached": cached,
+            "created_at": datetime.now(timezone.utc),
+        })
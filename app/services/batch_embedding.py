@@ -0,0 +1,129 @@
+"""
+Embeddings de documentos em lote, para as ingestões (utils/embedding.py e
+services/text_ingestion.py).
+
+Antes, cada página/chunk era uma chamada `embed_query` -- uma requisição
+HTTP por vez, em série: um PDF de 300 páginas eram 300 idas e voltas à API
+do Gemini. Agora os textos vão em lotes de EMBEDDING_BATCH_SIZE numa única
+chamada `embed_documents`, e até EMBEDDING_MAX_CONCURRENCY lotes ficam em voo
+ao mesmo tempo.
+
+Se a API recusar por limite de taxa (429 / RESOURCE_EXHAUSTED) ou
+instabilidade (5xx), o lote é repetido com espera exponencial e jitter, até
+EMBEDDING_MAX_RETRIES vezes; outros erros sobem na hora.
+
+Os documentos passam a ser gerados com task_type RETRIEVAL_DOCUMENT (o
+padrão do `embed_documents`) em vez do RETRIEVAL_QUERY implícito no
+`embed_query` que era usado para indexar.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+from utils.settings import WrappedSettings as Settings
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+_RETRYABLE_MARKERS = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "rate limit", "quota")
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Limite de taxa ou erro transitório do servidor (olhando também a causa encadeada)."""
+    while exc is not None:
+        code = getattr(exc, "code", None)
+        if isinstance(code, int) and (code == 429 or code >= 500):
+            return True
+        message = str(exc)
+        if any(marker.lower() in message.lower() for marker in _RETRYABLE_MARKERS):
+            return True
+        exc = exc.__cause__
+    return False
+
+
+def _embed_batch(
+    embedding_func: GoogleGenerativeAIEmbeddings,
+    batch: List[str],
+    max_retries: int,
+) -> List[List[float]]:
+    attempt = 0
+    while True:
+        try:
+            return embedding_func.embed_documents(batch, batch_size=len(batch))
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            attempt += 1
+            logger.warning(f"Embeddings: lote de {len(batch)} recusado ({e}); tentativa {attempt} em {delay:.1f}s")
+            time.sleep(delay)
+
+
+def embed_documents(
+    texts: Sequence[str],
+    embedding_func: Optional[GoogleGenerativeAIEmbeddings] = None,
+    batch_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    max_retries: Optional[int] = None,
+) -> List[List[float]]:
+    """
+    Embeddings de `texts`, na mesma ordem, em lotes paralelos. Parâmetros
+    não informados vêm de Settings.embedding_batches.
+    """
+    config = Settings.embedding_batches
+    batch_size = max(1, batch_size or config["batch_size"])
+    max_concurrency = max(1, max_concurrency or config["max_concurrency"])
+    max_retries = config["max_retries"] if max_retries is None else max_retries
+    if embedding_func is None:
+        embedding_func = GoogleGenerativeAIEmbeddings(model=Settings.gemini["embedding"])
+
+    texts = list(texts)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return []
+    if len(batches) == 1 or max_concurrency == 1:
+        results = [_embed_batch(embedding_func, batch, max_retries) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches)), thread_name_prefix="embed") as pool:
+            results = list(pool.map(lambda batch: _embed_batch(embedding_func, batch, max_retries), batches))
+    return [vector for batch in results for vector in batch]
+
+
+async def aembed_documents(
+    texts: Sequence[str],
+    embedding_func: Optional[GoogleGenerativeAIEmbeddings] = None,
+    batch_size: Optional[int] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    max_retries: Optional[int] = None,
+) -> List[List[float]]:
+    """
+    Versão assíncrona de `embed_documents`: cada lote roda numa thread e
+    `semaphore` limita quantos ficam em voo -- passe o mesmo semáforo para
+    várias chamadas (ex.: vários documentos de services/ingestion_pipeline.py)
+    para o limite valer para todas juntas.
+    """
+    config = Settings.embedding_batches
+    batch_size = max(1, batch_size or config["batch_size"])
+    max_retries = config["max_retries"] if max_retries is None else max_retries
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, config["max_concurrency"]))
+    if embedding_func is None:
+        embedding_func = GoogleGenerativeAIEmbeddings(model=Settings.gemini["embedding"])
+
+    texts = list(texts)
+
+    async def run(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            return await asyncio.to_thread(_embed_batch, embedding_func, batch, max_retries)
+
+    results = await asyncio.gather(*(run(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)))
+    return [vector for batch in results for vector in batch]
@@ -1,24 +1,228 @@
+"""
+Acesso ao Chroma: um cliente por processo e um handle por coleção.
+
+Antes, cada consulta de RAG (AjudaShark, RAGDaBaseDeCodigo, OnboardingGuiado)
+e cada HealthCheckAgregado criava um `CloudClient` novo -- com o handshake
+de autenticação/tenant que vem junto -- e um `get_or_create_collection`,
+tudo antes da consulta de verdade. Agora o cliente, a função de embedding e
+cada coleção são criados uma vez e reaproveitados (o cliente HTTP por trás
+mantém as conexões abertas), e uma consulta custa só a ida e volta da
+própria consulta.
+
+Se uma chamada falhar com o handle em cache (conexão derrubada, coleção
+recriada por uma ingestão em outro processo), `query()` descarta cliente e
+coleções e tenta UMA vez de novo com tudo recriado; se falhar de novo, o
+erro sobe para a ferramenta, como antes.
+
+Os embeddings das perguntas vêm do cache persistente de
+services/embedding_cache.py: `query()` manda `query_embeddings` prontos e
+só os textos nunca vistos passam pela API de embedding.
+
+Backend (CHROMA_BACKEND):
+
+- "cloud" (padrão): Chroma Cloud, com CHROMA_API_KEY/TENANT/DATABASE. Cada
+  consulta é uma ida e volta pela internet;
+- "local": chromadb embarcado (`PersistentClient`) gravando em CHROMA_PATH.
+  A busca vetorial roda no próprio processo -- bom para desenvolvimento,
+  CI e deploys de uma máquina só. A API das coleções é a mesma, então
+  ingestão, ferramentas e health check não mudam.
+
+Nos dois backends os embeddings continuam vindo do Gemini (GEMINI_API_KEY):
+as coleções copiadas guardam vetores do Gemini, e uma pergunta só pode ser
+comparada com eles se for embutida pelo mesmo modelo. Ou seja, "local" tira
+o Chroma da rede, não o embedding -- perguntas que não estão no cache de
+embeddings ainda chamam a API, e a ingestão também.
+
+Para levar as coleções de um backend para o outro (ids, textos, metadados e
+os próprios vetores, sem gerar embeddings de novo):
+
+    cd app && python -m services.chroma --de cloud --para local
+    cd app && python -m services.chroma --de local --para cloud --colecao shark_helper
+
+Os ids são preservados, então o mapa de `knowledge_chunks` continua valendo
+no destino e a próxima ingestão lá segue por delta. Ids que existem no
+destino mas não na origem (chunks apagados na origem depois de uma cópia
+anterior) são removidos do destino, para as duas ficarem iguais.
+"""
+
+import logging
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Set
+
 import chromadb
 from chromadb.utils.embedding_functions.google_embedding_function import GoogleGenerativeAiEmbeddingFunction
+
+from services.embedding_cache import embedding_cache
 from utils.settings import WrappedSettings as Settings
 
-def get_client():
-    # Agora 'Settings' é o wrapper, então Settings.chroma existe e é um dict
-    client = chromadb.CloudClient(
+logger = logging.getLogger(__name__)
+
+_lock = Lock()
+_client: Optional[Any] = None
+_embedding_function: Optional[GoogleGenerativeAiEmbeddingFunction] = None
+_collections: Dict[str, Any] = {}
+
+BACKENDS = ("cloud", "local")
+# Registros por chamada de get/upsert na cópia entre backends.
+TRANSFER_BATCH_SIZE = 300
+
+
+def create_client(backend: str):
+    """Cliente novo do backend `backend` ("cloud" ou "local"), sem passar pelo cache do processo."""
+    if backend == "cloud":
+        return chromadb.CloudClient(
             api_key=Settings.chroma['api_key'],
             tenant=Settings.chroma['tenant'],
             database=Settings.chroma['database']
         )
-    
-    return client
+    if backend == "local":
+        return chromadb.PersistentClient(path=Settings.chroma['path'])
+    raise ValueError(f"Backend do Chroma desconhecido: '{backend}' (use {' ou '.join(BACKENDS)})")
 
-def get_collection(name):
-    client = get_client()
-    collection = client.get_or_create_collection(
-        name=name,
-        embedding_function=GoogleGenerativeAiEmbeddingFunction(
+
+def get_client():
+    """Cliente do Chroma compartilhado pelo processo (criado na primeira chamada, conforme CHROMA_BACKEND)."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = create_client(Settings.chroma['backend'])
+    return _client
+
+
+def _get_embedding_function() -> GoogleGenerativeAiEmbeddingFunction:
+    global _embedding_function
+    if _embedding_function is None:
+        _embedding_function = GoogleGenerativeAiEmbeddingFunction(
             api_key=Settings.gemini['api_key'],
             model_name=Settings.gemini['embedding']
         )
-    )
-    return collection
\ No newline at end of file
+    return _embedding_function
+
+
+def get_collection(name: str):
+    """Handle da coleção `name` (get_or_create só na primeira vez por processo)."""
+    collection = _collections.get(name)
+    if collection is not None:
+        return collection
+    client = get_client()
+    with _lock:
+        collection = _collections.get(name)
+        if collection is None:
+            collection = client.get_or_create_collection(
+                name=name,
+                embedding_function=_get_embedding_function()
+            )
+            _collections[name] = collection
+    return collection
+
+
+def reset() -> None:
+    """Descarta o cliente e os handles em cache; a próxima chamada reconecta."""
+    global _client
+    with _lock:
+        _client = None
+        _collections.clear()
+
+
+def embed_queries(query_texts: List[str]) -> List[List[float]]:
+    """Embeddings das perguntas, pelo cache persistente (só os textos novos vão para a API)."""
+    embedding_function = _get_embedding_function()
+    model = f"{Settings.gemini['embedding']}:{getattr(embedding_function, 'task_type', '')}"
+    return embedding_cache.embed_queries(model, query_texts, embedding_function.embed_query)
+
+
+def query(name: str, query_texts: List[str], n_results: int, **kwargs) -> Dict[str, Any]:
+    """`collection.query` na coleção `name`, reconectando e tentando de novo uma vez se falhar."""
+    if embedding_cache.enabled:
+        search = {"query_embeddings": embed_queries(query_texts)}
+    else:
+        search = {"query_texts": query_texts}
+    return _with_retry(name, lambda collection: collection.query(n_results=n_results, **search, **kwargs))
+
+
+def get(name: str, ids: List[str], **kwargs) -> Dict[str, Any]:
+    """`collection.get` por ids na coleção `name`, com a mesma reconexão de `query()`."""
+    return _with_retry(name, lambda collection: collection.get(ids=ids, **kwargs))
+
+
+def _with_retry(name: str, call: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        return call(get_collection(name))
+    except Exception as e:
+        logger.warning(f"Chroma: consulta em '{name}' falhou ({e}); reconectando e tentando de novo")
+        reset()
+        return call(get_collection(name))
+
+
+def heartbeat() -> int:
+    """Heartbeat do Chroma pelo cliente compartilhado; se falhar, descarta o cliente antes de propagar o erro."""
+    try:
+        return get_client().heartbeat()
+    except Exception:
+        reset()
+        raise
+
+
+def transfer_collection(name: str, source: Any, target: Any, batch_size: int = TRANSFER_BATCH_SIZE) -> int:
+    """
+    Copia a coleção `name` do cliente `source` para o cliente `target` em
+    lotes, com os vetores já gerados. Upsert por id: rodar de novo só
+    sobrescreve; ids do destino que não estão mais na origem são apagados.
+    Devolve quantos registros foram copiados.
+    """
+    origem = source.get_collection(name=name)
+    destino = target.get_or_create_collection(name=name, embedding_function=_get_embedding_function())
+    total = origem.count()
+    copiados = 0
+    ids_origem: Set[str] = set()
+    while copiados < total:
+        lote = origem.get(
+            limit=batch_size,
+            offset=copiados,
+            include=["embeddings", "documents", "metadatas"],
+        )
+        if not lote["ids"]:
+            break
+        destino.upsert(
+            ids=lote["ids"],
+            embeddings=lote["embeddings"],
+            documents=lote["documents"],
+            metadatas=lote["metadatas"],
+        )
+        ids_origem.update(lote["ids"])
+        copiados += len(lote["ids"])
+        logger.info(f"Chroma: '{name}' {copiados}/{total} registro(s) copiado(s)")
+
+    sobrando: List[str] = []
+    offset = 0
+    while True:
+        lote = destino.get(limit=batch_size, offset=offset, include=[])
+        if not lote["ids"]:
+            break
+        sobrando.extend(id_ for id_ in lote["ids"] if id_ not in ids_origem)
+        offset += len(lote["ids"])
+    for start in range(0, len(sobrando), batch_size):
+        destino.delete(ids=sobrando[start:start + batch_size])
+    if sobrando:
+        logger.info(f"Chroma: '{name}' {len(sobrando)} registro(s) que não estão na origem apagado(s) do destino")
+    return copiados
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Copia coleções do Chroma entre backends (cloud <-> local).")
+    parser.add_argument("--de", required=True, choices=BACKENDS, help="Backend de origem.")
+    parser.add_argument("--para", required=True, choices=BACKENDS, help="Backend de destino.")
+    parser.add_argument("--colecao", action="append", help="Coleção a copiar (repetível; padrão: todas).")
+    args = parser.parse_args()
+    if args.de == args.para:
+        parser.error("--de e --para precisam ser backends diferentes")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    source, target = create_client(args.de), create_client(args.para)
+    nomes = args.colecao or [c.name for c in source.list_collections()]
+    for nome in nomes:
+        n = transfer_collection(nome, source, target)
+        print(f"✅ '{nome}': {n} registro(s) copiado(s) de {args.de} para {args.para}")
@@ -0,0 +1,179 @@
+"""
+Cache persistente dos embeddings das perguntas feitas às bases de RAG.
+
+Com `query_texts`, o Chroma gera o embedding de cada texto chamando a API do
+Gemini (uma requisição por texto) antes de buscar -- e o AjudaShark manda
+`temas + [pergunta]`, então uma chamada da ferramenta eram várias idas à
+API de embedding. Perguntas se repetem muito ("como configuro o ambiente?"),
+então o vetor é guardado aqui e a consulta vai para o Chroma já com
+`query_embeddings` (ver services/chroma.query).
+
+Para a API vai o texto só com NFC e espaços colapsados -- maiúsculas ficam
+como o usuário escreveu, porque identificadores (nome de bloco, código de
+erro) podem depender delas. A chave é o hash de (modelo + task_type, esse
+texto em casefold): "Como faço deploy?" e "como faço deploy?" dividem a
+mesma entrada, com o vetor da primeira forma que chegou ao cache. Trocar
+GEMINI_EMBEDDING_MODEL não aproveita vetores do modelo antigo (chaves
+diferentes); eles só saem pelo LRU.
+
+Os vetores ficam num SQLite local (EMBEDDING_CACHE_PATH, em WAL) como
+float32 -- metade do tamanho de um JSON de floats e lido sem parse --,
+compartilhado pelos workers da máquina. Acima de EMBEDDING_CACHE_MAX_ENTRIES,
+saem os usados há mais tempo. O "último uso" só é regravado se estiver
+mais velho que TOUCH_INTERVAL_SECONDS, para um acerto não virar uma escrita
+no arquivo toda vez.
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import time
+import unicodedata
+from array import array
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils.settings import WrappedSettings as Settings
+
+logger = logging.getLogger(__name__)
+
+TOUCH_INTERVAL_SECONDS = 3600
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """O texto que vai para a API de embedding: NFC e espaços colapsados."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key_text(text: str) -> str:
+    """O texto que identifica a entrada no cache: o normalizado, em casefold."""
+    return normalize_text(text).casefold()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_entries: int = 20000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abre o arquivo na primeira vez que for usado (chamar com o lock)."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_query_embeddings_last_used ON query_embeddings (last_used)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(model: str, normalized: str) -> str:
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, key_texts: Sequence[str]) -> Dict[str, List[float]]:
+        """Vetores já guardados, por texto de chave (`cache_key_text`; os que faltarem não aparecem)."""
+        keys = {self._key(model, text): text for text in key_texts}
+        if not keys:
+            return {}
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                f"SELECT key, vector, last_used FROM query_embeddings WHERE key IN ({','.join('?' * len(keys))})",
+                list(keys),
+            ).fetchall()
+            stale = [key for key, _, last_used in rows if now - last_used > TOUCH_INTERVAL_SECONDS]
+            if stale:
+                conn.executemany("UPDATE query_embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in stale])
+        found: Dict[str, List[float]] = {}
+        for key, blob, _ in rows:
+            vector = array("f")
+            vector.frombytes(blob)
+            found[keys[key]] = vector.tolist()
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, Sequence[float]]) -> None:
+        """Guarda vetores por texto de chave (`cache_key_text`) e despeja os menos usados acima do limite."""
+        if not vectors:
+            return
+        now = time.time()
+        rows = [
+            (self._key(model, text), model, array("f", vector).tobytes(), now)
+            for text, vector in vectors.items()
+        ]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO query_embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                conn.execute(
+                    "DELETE FROM query_embeddings WHERE key IN "
+                    "(SELECT key FROM query_embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._stats["evicted"] += excess
+
+    def embed_queries(
+        self,
+        model: str,
+        texts: Sequence[str],
+        embed: Callable[[List[str]], Sequence[Sequence[float]]],
+    ) -> List[List[float]]:
+        """
+        Embeddings de `texts`, na mesma ordem. Só os textos que não estão no
+        cache vão para `embed` (numa chamada só, normalizados -- sem casefold
+        -- e sem repetição).
+        """
+        keys = [cache_key_text(text) for text in texts]
+        try:
+            found = self.get_many(model, keys)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache de embeddings indisponível, gerando direto: {e}")
+            found = {}
+
+        # chave -> texto enviado à API (a primeira forma em que a chave aparece)
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = normalize_text(text)
+        hits = sum(1 for key in keys if key in found)
+        with self._lock:
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(keys) - hits
+        if missing:
+            vectors = embed(list(missing.values()))
+            computed = {key: [float(x) for x in vector] for key, vector in zip(missing, vectors)}
+            try:
+                self.put_many(model, computed)
+            except sqlite3.Error as e:
+                logger.warning(f"Não consegui gravar no cache de embeddings: {e}")
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"path": self.path, "max_entries": self.max_entries, **self._stats}
+
+
+# Instância única compartilhada pela aplicação inteira.
+embedding_cache = EmbeddingCache(**Settings.embedding_cache)
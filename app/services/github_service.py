@@ -12,15 +12,30 @@ Duas estratégias de busca:
   configurada de uma vez (menos previsível — a Search API de commits é mais
   sensível a rate limit — mas necessária para não precisar listar todos os
   repositórios manualmente).
+
+`afetch_recent_commits` é a versão assíncrona (httpx), usada pelo
+GeradorDeStandup quando o grafo roda via `ainvoke`: não ocupa uma thread
+enquanto espera o GitHub e busca os repositórios informados em paralelo.
+
+As duas tratam falhas do mesmo jeito -- status de erro E falhas de conexão/
+timeout (`requests.RequestException` / `httpx.HTTPError`): um repositório
+que falha é pulado com um aviso; a Search API falhando vira GitHubError.
+
+As duas versões compartilham um cache de 5 minutos por (usuário, janela,
+repositórios) -- pedir o standup de novo, ou de dois workers, não gasta
+outra rodada da cota da Search API. Chamadas simultâneas iguais viram uma só.
 """
 
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
+import httpx
 import requests
 
 from utils.settings import WrappedSettings as Settings
+from utils.tool_cache import CacheDecorator
 
 logger = logging.getLogger(__name__)
 
@@ -50,15 +65,7 @@ def _since_iso(hours: int) -> str:
     return since.strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-def _commits_via_repo_endpoint(username: str, repo: str, since_iso: str) -> List[Dict[str, Any]]:
-    url = f"{GITHUB_API}/repos/{repo}/commits"
-    params = {"author": username, "since": since_iso, "per_page": 100}
-    resp = requests.get(url, headers=_headers(), params=params, timeout=TIMEOUT_SECONDS)
-    if resp.status_code == 404:
-        logger.warning(f"Repositório '{repo}' não encontrado ou sem acesso — pulando.")
-        return []
-    resp.raise_for_status()
-    commits = resp.json()
+def _parse_repo_commits(repo: str, commits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return [
         {
             "repo": repo,
@@ -71,13 +78,7 @@ def _commits_via_repo_endpoint(username: str, repo: str, since_iso: str) -> List
     ]
 
 
-def _commits_via_search(username: str, org: str, since_iso: str) -> List[Dict[str, Any]]:
-    url = f"{GITHUB_API}/search/commits"
-    query = f"author:{username} org:{org} committer-date:>{since_iso}"
-    params = {"q": query, "sort": "committer-date", "order": "desc", "per_page": 100}
-    resp = requests.get(url, headers=_headers(), params=params, timeout=TIMEOUT_SECONDS)
-    resp.raise_for_status()
-    items = resp.json().get("items", [])
+def _parse_search_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return [
         {
             "repo": item.get("repository", {}).get("full_name", "?"),
@@ -90,6 +91,51 @@ def _commits_via_search(username: str, org: str, since_iso: str) -> List[Dict[st
     ]
 
 
+def _search_query(username: str, org: str, since_iso: str) -> Dict[str, Any]:
+    query = f"author:{username} org:{org} committer-date:>{since_iso}"
+    return {"q": query, "sort": "committer-date", "order": "desc", "per_page": 100}
+
+
+def _commits_via_repo_endpoint(username: str, repo: str, since_iso: str) -> List[Dict[str, Any]]:
+    url = f"{GITHUB_API}/repos/{repo}/commits"
+    params = {"author": username, "since": since_iso, "per_page": 100}
+    resp = requests.get(url, headers=_headers(), params=params, timeout=TIMEOUT_SECONDS)
+    if resp.status_code == 404:
+        logger.warning(f"Repositório '{repo}' não encontrado ou sem acesso — pulando.")
+        return []
+    resp.raise_for_status()
+    return _parse_repo_commits(repo, resp.json())
+
+
+def _commits_via_search(username: str, org: str, since_iso: str) -> List[Dict[str, Any]]:
+    url = f"{GITHUB_API}/search/commits"
+    resp = requests.get(url, headers=_headers(), params=_search_query(username, org, since_iso), timeout=TIMEOUT_SECONDS)
+    resp.raise_for_status()
+    return _parse_search_items(resp.json().get("items", []))
+
+
+async def _acommits_via_repo_endpoint(
+    client: httpx.AsyncClient, username: str, repo: str, since_iso: str
+) -> List[Dict[str, Any]]:
+    url = f"{GITHUB_API}/repos/{repo}/commits"
+    params = {"author": username, "since": since_iso, "per_page": 100}
+    resp = await client.get(url, params=params)
+    if resp.status_code == 404:
+        logger.warning(f"Repositório '{repo}' não encontrado ou sem acesso — pulando.")
+        return []
+    resp.raise_for_status()
+    return _parse_repo_commits(repo, resp.json())
+
+
+async def _acommits_via_search(
+    client: httpx.AsyncClient, username: str, org: str, since_iso: str
+) -> List[Dict[str, Any]]:
+    resp = await client.get(f"{GITHUB_API}/search/commits", params=_search_query(username, org, since_iso))
+    resp.raise_for_status()
+    return _parse_search_items(resp.json().get("items", []))
+
+
+@CacheDecorator(ttl_minutes=5, name="github.recent_commits")
 def fetch_recent_commits(
     username: str,
     since_hours: int = 24,
@@ -107,7 +153,7 @@ def fetch_recent_commits(
         for repo in repos:
             try:
                 all_commits.extend(_commits_via_repo_endpoint(username, repo, since_iso))
-            except requests.HTTPError as e:
+            except requests.RequestException as e:
                 logger.warning(f"Falha ao buscar commits em '{repo}': {e}")
         return sorted(all_commits, key=lambda c: c["date"], reverse=True)
 
@@ -120,5 +166,46 @@ def fetch_recent_commits(
 
     try:
         return _commits_via_search(username, Settings.github_org, since_iso)
-    except requests.HTTPError as e:
-        raise GitHubError(f"Falha ao consultar a API de busca do GitHub: {e}")
\ No newline at end of file
+    except requests.RequestException as e:
+        raise GitHubError(f"Falha ao consultar a API de busca do GitHub: {e}")
+
+
+@CacheDecorator(ttl_minutes=5, name="github.recent_commits")
+async def afetch_recent_commits(
+    username: str,
+    since_hours: int = 24,
+    repos: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Versão assíncrona de `fetch_recent_commits` (mesmo retorno, mesmos
+    erros: `httpx.HTTPError` aqui cobre o mesmo que `requests.RequestException` lá).
+    """
+    since_iso = _since_iso(since_hours)
+
+    if not repos and not Settings.github_org:
+        raise GitHubError(
+            "Nenhum repositório foi informado e GITHUB_ORG não está configurado no "
+            "servidor — não é possível buscar em 'toda a organização'. Informe "
+            "repositórios específicos (formato 'org/repo') ou configure GITHUB_ORG."
+        )
+
+    async with httpx.AsyncClient(headers=_headers(), timeout=TIMEOUT_SECONDS) as client:
+        if repos:
+            results = await asyncio.gather(
+                *(_acommits_via_repo_endpoint(client, username, repo, since_iso) for repo in repos),
+                return_exceptions=True,
+            )
+            all_commits: List[Dict[str, Any]] = []
+            for repo, result in zip(repos, results):
+                if isinstance(result, httpx.HTTPError):
+                    logger.warning(f"Falha ao buscar commits em '{repo}': {result}")
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    all_commits.extend(result)
+            return sorted(all_commits, key=lambda c: c["date"], reverse=True)
+
+        try:
+            return await _acommits_via_search(client, username, Settings.github_org, since_iso)
+        except httpx.HTTPError as e:
+            raise GitHubError(f"Falha ao consultar a API de busca do GitHub: {e}")
@@ -0,0 +1,292 @@
+"""
+Pipeline de ingestão em massa de uma pasta de PDFs (e .md/.txt) numa
+coleção do Chroma:
+
+    extração (processos, pypdf) -> plano/chunks -> embeddings (lotes, async) -> upsert (lotes)
+
+O `create_embedding` antigo lia cada PDF duas vezes (uma para o hash, outra
+para o PdfReader), extraía o texto página a página num único núcleo e
+processava um arquivo de cada vez, sempre da pasta fixa `dados`. Carregar
+uma base grande deixava CPU e rede ociosas a maior parte do tempo.
+
+Aqui cada etapa trabalha em paralelo com as outras:
+
+- extração: um ProcessPoolExecutor (INGESTION_EXTRACT_WORKERS, padrão um por
+  CPU) lê cada arquivo UMA vez, calcula o hash e, se o arquivo mudou desde a
+  última indexação, extrai o texto das páginas;
+- plano: compara os chunks com o mapa de `knowledge_chunks` e reaproveita
+  vetores de texto que só mudou de lugar (services/knowledge_tracking.py);
+- embeddings: só os chunks novos, em lotes de EMBEDDING_BATCH_SIZE, com no
+  máximo EMBEDDING_MAX_CONCURRENCY lotes em voo somando TODOS os documentos
+  (services/batch_embedding.aembed_documents);
+- upsert/delete no Chroma em lotes e commit do mapa no banco.
+
+Entre as etapas há filas limitadas (INGESTION_QUEUE_SIZE documentos): se os
+embeddings ficam para trás, a extração espera em vez de acumular PDFs
+inteiros em memória. O progresso (arquivos, páginas, embeddings por segundo)
+sai no log a cada poucos segundos. Um arquivo com erro é registrado e
+pulado, sem parar o resto. Arquivos que estavam indexados e saíram da pasta
+são apagados da coleção antes da extração (`remover_ausentes`).
+
+Uso:
+
+    cd app && python -m services.ingestion_pipeline --colecao shark_helper --dir dados
+    cd app && python -m services.ingestion_pipeline --colecao onboarding_docs --dir dados_onboarding --workers 4
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from services.batch_embedding import aembed_documents
+from services.chroma import get_collection
+from services.knowledge_tracking import aplicar_chunks, planejar_chunks, reaproveitar_embeddings, remover_ausentes
+from utils.settings import WrappedSettings as Settings
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".md", ".txt")
+UPSERT_WORKERS = 2
+PROGRESS_SECONDS = 5
+
+
+def _extract(full_path: str, filename: str, known_hash: Optional[str]) -> Dict[str, Any]:
+    """
+    Roda num processo do pool: lê o arquivo uma vez e, se o hash mudou,
+    devolve os chunks (páginas do PDF ou trechos do texto) com metadados.
+    """
+    with open(full_path, "rb") as f:
+        data = f.read()
+
+    if filename.lower().endswith(".pdf"):
+        content_hash = hashlib.md5(data).hexdigest()
+        if content_hash == known_hash:
+            return {"filename": filename, "content_hash": content_hash, "skipped": True}
+
+        from pypdf import PdfReader
+
+        reader = PdfReader(io.BytesIO(data))
+        num_pages = reader.get_num_pages()
+        docs, indices, metadatas = [], [], []
+        for i in range(num_pages):
+            text = reader.pages[i].extract_text()
+            if not text or not text.strip():
+                continue
+            docs.append(text)
+            indices.append(i + 1)
+            metadatas.append({"doc": filename, "page": i + 1})
+    else:
+        # Mesmo hash e chunking de services/text_ingestion.py, para as duas
+        # ingestões reconhecerem o que a outra já indexou (os dois normalizam
+        # as quebras de linha: aqui o arquivo é lido em binário, lá em texto).
+        from services.text_ingestion import chunk_document, text_content_hash
+
+        content = data.decode("utf-8", errors="ignore")
+        content_hash = text_content_hash(content)
+        if content_hash == known_hash:
+            return {"filename": filename, "content_hash": content_hash, "skipped": True}
+        docs, metadatas = chunk_document(filename, content)
+        num_pages = len(docs)
+        indices = list(range(len(docs)))
+
+    return {
+        "filename": filename,
+        "content_hash": content_hash,
+        "skipped": False,
+        "num_pages": num_pages,
+        "docs": docs,
+        "indices": indices,
+        "metadatas": metadatas,
+    }
+
+
+def _known_hashes(collection: str) -> Dict[str, Optional[str]]:
+    from db.base import SessionLocal
+    from db.models import KnowledgeDocument
+
+    db = SessionLocal()
+    try:
+        return dict(
+            db.query(KnowledgeDocument.filename, KnowledgeDocument.content_hash)
+            .filter(KnowledgeDocument.collection == collection)
+            .all()
+        )
+    finally:
+        db.close()
+
+
+class _Progress:
+    def __init__(self, files_total: int):
+        self.started = time.monotonic()
+        self.counts = {
+            "files_total": files_total,
+            "files_done": 0,
+            "skipped": 0,
+            "errors": 0,
+            "pages": 0,
+            "embedded": 0,
+            "reused": 0,
+            "deleted": 0,
+            "removed_files": 0,
+        }
+
+    def add(self, **deltas: int) -> None:
+        for name, value in deltas.items():
+            self.counts[name] += value
+
+    def report(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        c = self.counts
+        return (
+            f"{c['files_done'] + c['skipped'] + c['errors']}/{c['files_total']} arquivo(s) "
+            f"({c['skipped']} sem mudança, {c['errors']} com erro), {c['pages']} página(s)/chunk(s), "
+            f"{c['embedded']} embedding(s) ({c['embedded'] / elapsed:.1f}/s), "
+            f"{c['reused']} reaproveitado(s), {c['deleted']} apagado(s), "
+            f"{c['removed_files']} arquivo(s) removido(s) da pasta — {elapsed:.1f}s"
+        )
+
+
+async def run_pipeline(
+    collection: str,
+    directory: str,
+    extract_workers: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    embedding_func: Any = None,
+) -> Dict[str, int]:
+    """Indexa `directory` em `collection` (só o que mudou). Devolve os contadores finais."""
+    config = Settings.ingestion
+    extract_workers = extract_workers or config["extract_workers"] or os.cpu_count() or 1
+    queue_size = max(1, queue_size or config["queue_size"])
+    embed_workers = max(1, Settings.embedding_batches["max_concurrency"])
+
+    files = sorted(f for f in os.listdir(directory) if f.lower().endswith(SUPPORTED_EXTENSIONS))
+    progress = _Progress(len(files))
+    collection_obj = get_collection(collection)
+    removidos = await asyncio.to_thread(remover_ausentes, collection_obj, collection, files, SUPPORTED_EXTENSIONS)
+    progress.add(removed_files=len(removidos), deleted=sum(removidos.values()))
+    if not files:
+        logger.warning(f"Nenhum arquivo {SUPPORTED_EXTENSIONS} em '{directory}'.")
+        return progress.counts
+
+    known = await asyncio.to_thread(_known_hashes, collection)
+    if embedding_func is None:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        embedding_func = GoogleGenerativeAIEmbeddings(model=Settings.gemini["embedding"])
+
+    extracted: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    embedded: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    embed_slots = asyncio.Semaphore(embed_workers)
+    loop = asyncio.get_running_loop()
+
+    with ProcessPoolExecutor(max_workers=extract_workers) as pool:
+        extract_slots = asyncio.Semaphore(extract_workers)
+
+        async def extract_one(filename: str) -> None:
+            # O put fica dentro do semáforo: com a fila cheia, os processos
+            # param de extrair em vez de acumular documentos esperando vaga.
+            async with extract_slots:
+                try:
+                    doc = await loop.run_in_executor(
+                        pool, _extract, os.path.join(directory, filename), filename, known.get(filename)
+                    )
+                except Exception as e:
+                    logger.error(f"Ingestão: erro ao extrair '{filename}': {e}")
+                    progress.add(errors=1)
+                    return
+                if doc["skipped"]:
+                    progress.add(skipped=1)
+                    return
+                await extracted.put(doc)
+
+        async def embed_stage() -> None:
+            while (doc := await extracted.get()) is not None:
+                try:
+                    plano = await asyncio.to_thread(
+                        planejar_chunks, collection, doc["filename"], doc["docs"], doc["indices"]
+                    )
+                    vectors = await asyncio.to_thread(reaproveitar_embeddings, collection_obj, plano)
+                    if plano["embed"]:
+                        novos = await aembed_documents(
+                            [doc["docs"][p] for p in plano["embed"]],
+                            embedding_func=embedding_func,
+                            semaphore=embed_slots,
+                        )
+                        vectors.update(zip(plano["embed"], novos))
+                except Exception as e:
+                    logger.error(f"Ingestão: erro ao gerar embeddings de '{doc['filename']}': {e}")
+                    progress.add(errors=1)
+                    continue
+                await embedded.put((doc, plano, vectors))
+
+        async def upsert_stage() -> None:
+            while (item := await embedded.get()) is not None:
+                doc, plano, vectors = item
+                try:
+                    await asyncio.to_thread(
+                        aplicar_chunks, collection_obj, plano, doc["docs"], doc["metadatas"],
+                        vectors, doc["content_hash"], doc["num_pages"],
+                    )
+                except Exception as e:
+                    logger.error(f"Ingestão: erro ao gravar '{doc['filename']}': {e}")
+                    progress.add(errors=1)
+                    continue
+                progress.add(
+                    files_done=1,
+                    pages=len(doc["docs"]),
+                    embedded=len(plano["embed"]),
+                    reused=len(plano["reuse"]),
+                    deleted=len(plano["delete"]),
+                )
+
+        async def reporter() -> None:
+            while True:
+                await asyncio.sleep(PROGRESS_SECONDS)
+                logger.info(f"Ingestão '{collection}': {progress.report()}")
+
+        reporting = asyncio.create_task(reporter())
+        embedders = [asyncio.create_task(embed_stage()) for _ in range(embed_workers)]
+        upserters = [asyncio.create_task(upsert_stage()) for _ in range(UPSERT_WORKERS)]
+        try:
+            await asyncio.gather(*(extract_one(f) for f in files))
+            for _ in embedders:
+                await extracted.put(None)
+            await asyncio.gather(*embedders)
+            for _ in upserters:
+                await embedded.put(None)
+            await asyncio.gather(*upserters)
+        finally:
+            reporting.cancel()
+
+    logger.info(f"Ingestão '{collection}' concluída: {progress.report()}")
+    return progress.counts
+
+
+def ingest_directory(collection: str, directory: str, **kwargs) -> Dict[str, int]:
+    """Atalho síncrono para `run_pipeline` (scripts e chamadas fora de um event loop)."""
+    return asyncio.run(run_pipeline(collection, directory, **kwargs))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db.base import init_db
+
+    parser = argparse.ArgumentParser(description="Indexa uma pasta de PDFs/.md/.txt numa coleção do Chroma.")
+    parser.add_argument("--colecao", required=True, help="Coleção do Chroma (ex.: shark_helper).")
+    parser.add_argument("--dir", default="dados", help="Pasta com os arquivos (padrão: dados).")
+    parser.add_argument("--workers", type=int, default=None, help="Processos de extração (padrão: INGESTION_EXTRACT_WORKERS).")
+    parser.add_argument("--fila", type=int, default=None, help="Documentos por fila entre etapas (padrão: INGESTION_QUEUE_SIZE).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    init_db()
+    resultado = ingest_directory(args.colecao, args.dir, extract_workers=args.workers, queue_size=args.fila)
+    print(f"✅ {resultado['files_done']} arquivo(s) indexado(s), {resultado['skipped']} sem mudança, "
+          f"{resultado['errors']} com erro, {resultado['removed_files']} removido(s) da pasta; "
+          f"{resultado['embedded']} embedding(s) gerado(s).")
@@ -1,100 +1,365 @@
 """
-Ingestão de arquivos de texto/markdown (READMEs, ADRs, docs de onboarding)
-no Chroma -- irmã de app/utils/embedding.py, que só lida com PDF. Chunking
-mais simples aqui: por número de caracteres, já que não há conceito de
-"página" em markdown puro.
+Controle de quais arquivos já foram indexados em cada coleção do Chroma
+(tabela `knowledge_documents`) e de quais chunks cada um gerou
+(`knowledge_chunks`). As ingestões (utils/embedding.py para PDF,
+services/text_ingestion.py para markdown/texto) consultam o `content_hash`
+gravado aqui para pular arquivos que não mudaram desde a última execução.
 
-Usado para popular as coleções consultadas por RAGDaBaseDeCodigo
-(tools/knowledge_rag.py) e OnboardingGuiado.
+Reindexação por delta: os ids dos vetores eram `uuid4()`, então reindexar um
+arquivo alterado gravava uma segunda cópia inteira dele no Chroma, e os
+chunks antigos ficavam lá para sempre, disputando espaço em toda consulta.
+Agora o id de cada chunk é derivado de (coleção, arquivo, posição, hash do
+texto), e `sincronizar_documento` compara os chunks novos com o mapa gravado
+em `knowledge_chunks`:
+
+- mesmo id: o chunk não mudou, nada a fazer;
+- id novo cujo texto já existia em outra posição (ex.: um parágrafo inserido
+  no começo deslocou os seguintes): o vetor é copiado do Chroma, sem gerar
+  embedding de novo;
+- id novo com texto novo: gera o embedding;
+- id antigo que não aparece mais: é apagado do Chroma.
+
+O mesmo delta mantém o índice BM25 da busca híbrida (`knowledge_terms`):
+termos dos chunks que saíram são apagados e só os chunks novos são
+tokenizados.
+
+Arquivos indexados antes desse mapa existir (ids aleatórios) são limpos pelo
+metadado `doc` na primeira reindexação.
+
+Arquivos que saíram da pasta: depois de listar o diretório, as ingestões
+chamam `remover_ausentes`, que compara a listagem com `knowledge_documents`
+da coleção e, para cada arquivo que sumiu, aplica um plano vazio -- os
+vetores saem do Chroma, e o mapa, os termos BM25 e o registro do documento
+saem do banco.
+
+Ordem das escritas: upsert no Chroma, delete no Chroma e só então o commit
+do mapa no banco. Se o processo cair no meio, a próxima execução refaz o
+delta a partir do mapa antigo -- upsert e delete por id são idempotentes.
 """
 
 import hashlib
 import logging
-import os
-import uuid
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from sqlalchemy import select
 
-from services.chroma import get_collection
-from services.knowledge_tracking import registrar_documento_indexado
-from utils.settings import WrappedSettings as Settings
+from db.base import SessionLocal
+from db.models import KnowledgeChunk, KnowledgeDocument, KnowledgeTerm
+from services.retrieval import indexar_termos
 
 logger = logging.getLogger(__name__)
 
-CHUNK_SIZE_CHARS = 3000
-CHUNK_OVERLAP_CHARS = 300
+# Registros por chamada de upsert/get/delete no Chroma (o mesmo lote de 300
+# que a ingestão de PDF já usava, dentro do limite por requisição do Chroma Cloud).
+CHROMA_BATCH_SIZE = 300
+
+
+def _batches(items: Sequence[Any], size: int = CHROMA_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(collection: str, filename: str, chunk_index: int, text_hash: str) -> str:
+    return hashlib.sha256(f"{collection}\0{filename}\0{chunk_index}\0{text_hash}".encode("utf-8")).hexdigest()[:32]
 
 
-def _split_into_chunks(text: str, chunk_size: int = CHUNK_SIZE_CHARS, overlap: int = CHUNK_OVERLAP_CHARS) -> List[str]:
-    if len(text) <= chunk_size:
-        return [text] if text.strip() else []
+def documento_inalterado(collection: str, filename: str, content_hash: str) -> bool:
+    """True se `filename` já foi indexado em `collection` com esse mesmo conteúdo."""
+    db = SessionLocal()
+    try:
+        existing = (
+            db.query(KnowledgeDocument.content_hash)
+            .filter(KnowledgeDocument.collection == collection, KnowledgeDocument.filename == filename)
+            .first()
+        )
+        return existing is not None and existing.content_hash == content_hash
+    finally:
+        db.close()
 
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start = end - overlap
-    return [c for c in chunks if c.strip()]
 
+def _registrar(db, collection: str, filename: str, num_pages: Optional[int], content_hash: Optional[str]) -> None:
+    doc = (
+        db.query(KnowledgeDocument)
+        .filter(KnowledgeDocument.collection == collection, KnowledgeDocument.filename == filename)
+        .first()
+    )
+    if doc is None:
+        doc = KnowledgeDocument(collection=collection, filename=filename)
+        db.add(doc)
+    doc.num_pages = num_pages
+    doc.content_hash = content_hash
 
-def create_text_embedding(collection: str, directory: str) -> int:
+
+def registrar_documento_indexado(
+    collection: str,
+    filename: str,
+    num_pages: Optional[int],
+    content_hash: Optional[str],
+) -> None:
+    """
+    Grava (ou atualiza) o registro de `filename` em `collection` com o hash
+    do conteúdo indexado e quantas páginas/chunks ele gerou.
     """
-    Indexa todos os arquivos .md/.txt de `directory` na coleção `collection`
-    do Chroma. Retorna quantos arquivos foram processados.
+    db = SessionLocal()
+    try:
+        _registrar(db, collection, filename, num_pages, content_hash)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception(f"Erro ao registrar indexação de '{filename}' em '{collection}'")
+        raise
+    finally:
+        db.close()
+
 
-    Reindexação: se o arquivo já foi indexado antes com o mesmo conteúdo
-    (mesmo content_hash em knowledge_documents), pula -- evita reprocessar
-    (e pagar por embeddings de novo) sem necessidade a cada execução.
+def planejar_chunks(
+    collection: str,
+    filename: str,
+    chunks: Sequence[str],
+    indices: Optional[Sequence[int]] = None,
+) -> Dict[str, Any]:
     """
-    if not os.path.isdir(directory):
-        logger.warning(f"Diretório '{directory}' não existe -- nada para indexar.")
-        return 0
+    Compara os chunks atuais de `filename` (na posição `indices[i]`; padrão:
+    0, 1, 2...) com o mapa gravado e devolve o plano de sincronização:
+    `ids`/`hashes`/`indices` de todos os chunks, `embed` (posições que
+    precisam de embedding), `reuse` (posição -> id antigo com o mesmo texto),
+    `delete` (ids antigos que saíram) e `legacy` (arquivo sem mapa ainda).
+    """
+    indices = list(range(len(chunks))) if indices is None else list(indices)
+    hashes = [chunk_hash(text) for text in chunks]
+    ids = [chunk_id(collection, filename, index, h) for index, h in zip(indices, hashes)]
 
-    collection_obj = get_collection(collection)
-    embedding_func = GoogleGenerativeAIEmbeddings(model=Settings.gemini["embedding"])
+    db = SessionLocal()
+    try:
+        existing = (
+            db.query(KnowledgeChunk.id, KnowledgeChunk.chunk_hash)
+            .filter(KnowledgeChunk.collection == collection, KnowledgeChunk.filename == filename)
+            .all()
+        )
+    finally:
+        db.close()
 
-    from db.base import SessionLocal
-    from db.models import KnowledgeDocument
+    existing_ids = {row.id for row in existing}
+    by_hash = {row.chunk_hash: row.id for row in existing}
+    new_ids = set(ids)
 
-    processados = 0
-    for filename in os.listdir(directory):
-        if not filename.lower().endswith((".md", ".txt")):
+    embed: List[int] = []
+    reuse: Dict[int, str] = {}
+    for position, (id_, h) in enumerate(zip(ids, hashes)):
+        if id_ in existing_ids:
             continue
+        if h in by_hash:
+            reuse[position] = by_hash[h]
+        else:
+            embed.append(position)
 
-        full_path = os.path.join(directory, filename)
-        with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-        content_hash = hashlib.md5(content.encode("utf-8")).hexdigest()
-
-        db = SessionLocal()
-        try:
-            existing = (
-                db.query(KnowledgeDocument)
-                .filter(KnowledgeDocument.collection == collection, KnowledgeDocument.filename == filename)
-                .first()
-            )
-            if existing is not None and existing.content_hash == content_hash:
-                logger.info(f"'{filename}' sem mudanças desde a última indexação — pulando.")
-                continue
-        finally:
-            db.close()
-
-        chunks = _split_into_chunks(content)
-        if not chunks:
+    return {
+        "collection": collection,
+        "filename": filename,
+        "ids": ids,
+        "hashes": hashes,
+        "indices": indices,
+        "embed": embed,
+        "reuse": reuse,
+        "delete": sorted(existing_ids - new_ids),
+        "legacy": not existing,
+    }
+
+
+def reaproveitar_embeddings(collection_obj: Any, plano: Dict[str, Any]) -> Dict[int, List[float]]:
+    """
+    Busca no Chroma os vetores de `plano["reuse"]`. Posições cujo vetor
+    antigo não foi encontrado passam para `plano["embed"]`.
+    """
+    if not plano["reuse"]:
+        return {}
+    vectors: Dict[str, List[float]] = {}
+    for old_ids in _batches(sorted(set(plano["reuse"].values()))):
+        found = collection_obj.get(ids=old_ids, include=["embeddings"])
+        # `embeddings` pode vir como array do numpy: nada de `or []` aqui.
+        found_vectors = found.get("embeddings")
+        if found_vectors is None:
             continue
+        vectors.update((id_, list(vector)) for id_, vector in zip(found.get("ids") or [], found_vectors))
 
-        ids, embeddings, metadatas, docs = [], [], [], []
-        for i, chunk in enumerate(chunks):
-            ids.append(str(uuid.uuid4()))
-            embeddings.append(embedding_func.embed_query(chunk))
-            metadatas.append({"doc": filename, "chunk": i})
-            docs.append(chunk)
+    reused: Dict[int, List[float]] = {}
+    for position, old_id in plano["reuse"].items():
+        if old_id in vectors:
+            reused[position] = vectors[old_id]
+        else:
+            plano["embed"].append(position)
+    plano["embed"].sort()
+    plano["reuse"] = {position: plano["reuse"][position] for position in reused}
+    return reused
 
-        collection_obj.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=docs)
-        registrar_documento_indexado(collection, filename, len(chunks), content_hash)
-        processados += 1
-        logger.info(f"Indexado: {filename} ({len(chunks)} chunk(s)) em '{collection}'.")
 
-    return processados
\ No newline at end of file
+def aplicar_chunks(
+    collection_obj: Any,
+    plano: Dict[str, Any],
+    documents: Sequence[str],
+    metadatas: Sequence[Dict[str, Any]],
+    embeddings: Dict[int, List[float]],
+    content_hash: Optional[str],
+    num_pages: Optional[int] = None,
+    removido: bool = False,
+) -> None:
+    """
+    Executa o plano: grava no Chroma os chunks novos (`embeddings` por
+    posição, gerados ou reaproveitados), apaga os que saíram e grava o novo
+    mapa, os termos do índice BM25 (services/retrieval.py) e o registro do
+    documento numa transação. Com `removido=True` (arquivo que saiu da
+    pasta, plano vazio), o registro do documento é apagado em vez de gravado.
+    """
+    collection, filename = plano["collection"], plano["filename"]
+
+    if plano["legacy"]:
+        collection_obj.delete(where={"doc": filename})
+
+    positions = sorted(embeddings)
+    for batch in _batches(positions):
+        collection_obj.upsert(
+            ids=[plano["ids"][p] for p in batch],
+            embeddings=[embeddings[p] for p in batch],
+            metadatas=[metadatas[p] for p in batch],
+            documents=[documents[p] for p in batch],
+        )
+    for old_ids in _batches(plano["delete"]):
+        collection_obj.delete(ids=old_ids)
+
+    db = SessionLocal()
+    try:
+        removidos = select(KnowledgeChunk.id).where(
+            KnowledgeChunk.collection == collection,
+            KnowledgeChunk.filename == filename,
+            KnowledgeChunk.id.notin_(plano["ids"]),
+        )
+        db.query(KnowledgeTerm).filter(KnowledgeTerm.chunk_id.in_(removidos)).delete(synchronize_session=False)
+        (
+            db.query(KnowledgeChunk)
+            .filter(
+                KnowledgeChunk.collection == collection,
+                KnowledgeChunk.filename == filename,
+                KnowledgeChunk.id.notin_(plano["ids"]),
+            )
+            .delete(synchronize_session=False)
+        )
+
+        # Índice BM25: os chunks novos e os que ficaram mas ainda não tinham
+        # termos (indexados antes do índice existir).
+        position_by_id = {id_: p for p, id_ in enumerate(plano["ids"])}
+        sem_termos = [
+            row.id
+            for row in db.query(KnowledgeChunk.id).filter(
+                KnowledgeChunk.collection == collection,
+                KnowledgeChunk.filename == filename,
+                KnowledgeChunk.num_terms.is_(None),
+            )
+            if row.id in position_by_id
+        ]
+        num_terms = indexar_termos(
+            db,
+            collection,
+            {plano["ids"][p]: documents[p] for p in positions}
+            | {id_: documents[position_by_id[id_]] for id_ in sem_termos},
+        )
+        for id_ in sem_termos:
+            db.query(KnowledgeChunk).filter(KnowledgeChunk.id == id_).update(
+                {KnowledgeChunk.num_terms: num_terms[id_]}, synchronize_session=False
+            )
+
+        db.add_all(
+            KnowledgeChunk(
+                id=plano["ids"][p],
+                collection=collection,
+                filename=filename,
+                chunk_index=plano["indices"][p],
+                chunk_hash=plano["hashes"][p],
+                num_terms=num_terms[plano["ids"][p]],
+            )
+            for p in positions
+        )
+        if removido:
+            db.query(KnowledgeDocument).filter(
+                KnowledgeDocument.collection == collection, KnowledgeDocument.filename == filename
+            ).delete(synchronize_session=False)
+        else:
+            _registrar(db, collection, filename, len(documents) if num_pages is None else num_pages, content_hash)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception(f"Erro ao gravar o mapa de chunks de '{filename}' em '{collection}'")
+        raise
+    finally:
+        db.close()
+
+
+def sincronizar_documento(
+    collection_obj: Any,
+    collection: str,
+    filename: str,
+    documents: Sequence[str],
+    metadatas: Sequence[Dict[str, Any]],
+    content_hash: Optional[str],
+    num_pages: Optional[int] = None,
+    indices: Optional[Sequence[int]] = None,
+    embedding_func: Any = None,
+) -> Dict[str, int]:
+    """
+    Planeja, gera só os embeddings que faltam e aplica. Devolve quantos
+    chunks foram gerados, reaproveitados, mantidos e apagados.
+    """
+    from services.batch_embedding import embed_documents
+
+    plano = planejar_chunks(collection, filename, documents, indices)
+    embeddings = reaproveitar_embeddings(collection_obj, plano)
+    if plano["embed"]:
+        vectors = embed_documents([documents[p] for p in plano["embed"]], embedding_func=embedding_func)
+        embeddings.update(zip(plano["embed"], vectors))
+    aplicar_chunks(collection_obj, plano, documents, metadatas, embeddings, content_hash, num_pages)
+
+    stats = {
+        "embedded": len(plano["embed"]),
+        "reused": len(plano["reuse"]),
+        "unchanged": len(documents) - len(embeddings),
+        "deleted": len(plano["delete"]),
+    }
+    logger.info(f"'{filename}' em '{collection}': {stats}")
+    return stats
+
+
+def remover_ausentes(
+    collection_obj: Any,
+    collection: str,
+    presentes: Iterable[str],
+    extensoes: Sequence[str],
+) -> Dict[str, int]:
+    """
+    Apaga de `collection` (Chroma, mapa, índice BM25 e knowledge_documents)
+    os arquivos com extensão em `extensoes` que estão registrados mas não
+    aparecem em `presentes` (a listagem atual da pasta). Só olha as
+    extensões que quem chama indexa. Devolve arquivo -> chunks apagados.
+    """
+    presentes = set(presentes)
+    extensoes = tuple(ext.lower() for ext in extensoes)
+    db = SessionLocal()
+    try:
+        registrados = [
+            row.filename
+            for row in db.query(KnowledgeDocument.filename).filter(KnowledgeDocument.collection == collection)
+        ]
+    finally:
+        db.close()
+
+    removidos: Dict[str, int] = {}
+    for filename in sorted(registrados):
+        if filename in presentes or not filename.lower().endswith(extensoes):
+            continue
+        plano = planejar_chunks(collection, filename, [])
+        aplicar_chunks(collection_obj, plano, [], [], {}, content_hash=None, removido=True)
+        removidos[filename] = len(plano["delete"])
+        logger.info(f"'{filename}' saiu da pasta: {len(plano['delete'])} chunk(s) apagado(s) de '{collection}'")
+    return removidos
@@ -0,0 +1,235 @@
+"""
+Totais pré-agregados de `llm_calls`, por hora e por dia (tabelas
+`llm_usage_hourly` e `llm_usage_daily`: chamadas, tokens e custo por
+modelo × skill × período).
+
+O MonitorDeCustosLLM fazia dois GROUP BY sobre `llm_calls` inteira no
+período pedido a cada pergunta -- e toda rodada do orquestrador acrescenta
+linhas nessa tabela, então a consulta só ficava mais lenta. Agora ele lê
+estes totais, que têm no máximo uma linha por hora (ou dia), modelo e skill.
+
+Os totais são mantidos de forma incremental pelo services/telemetry_writer.py:
+no mesmo commit que grava um lote de `llm_calls`, `apply_llm_rollups` soma o
+lote às linhas dos períodos correspondentes (um upsert por período/modelo/
+skill). Assim, totais e linhas brutas nunca divergem.
+
+Linhas de `llm_calls` gravadas antes dessas tabelas existirem (ou por fora
+do telemetry_writer) não entram nos totais sozinhas. Para (re)calcular a
+partir de `llm_calls`:
+
+    cd app && python -m services.llm_rollups            # tudo
+    cd app && python -m services.llm_rollups --dias 30  # só os últimos 30 dias
+
+De preferência com a aplicação parada (ou sem tráfego): um lote gravado
+durante a reconstrução pode ser contado duas vezes ou nenhuma.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session as DBSession
+
+from db.models import LLMCall, LLMUsageDaily, LLMUsageHourly
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLES = (LLMUsageHourly, LLMUsageDaily)
+
+RollupKey = Tuple[datetime, str, str]
+
+
+def hour_start(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _as_utc(dt: Optional[datetime]) -> datetime:
+    if dt is None:
+        return datetime.now(timezone.utc)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _aggregate(rows: Iterable[Dict[str, Any]], bucket) -> Dict[RollupKey, Dict[str, Any]]:
+    """Soma as linhas (no formato de `llm_calls`) por (período, modelo, skill)."""
+    totals: Dict[RollupKey, Dict[str, Any]] = {}
+    for row in rows:
+        key = (bucket(_as_utc(row.get("created_at"))), row["model"], row["skill_name"])
+        total = totals.setdefault(key, {"calls": 0, "tokens_in": 0, "tokens_out": 0, "estimated_cost_usd": 0.0})
+        total["calls"] += 1
+        total["tokens_in"] += row.get("tokens_in") or 0
+        total["tokens_out"] += row.get("tokens_out") or 0
+        total["estimated_cost_usd"] += row.get("estimated_cost_usd") or 0.0
+    return totals
+
+
+def _hourly_to_daily(hourly: Dict[RollupKey, Dict[str, Any]]) -> Dict[RollupKey, Dict[str, Any]]:
+    daily: Dict[RollupKey, Dict[str, Any]] = {}
+    for (bucket_start, model, skill_name), total in hourly.items():
+        day = daily.setdefault((day_start(bucket_start), model, skill_name), dict.fromkeys(total, 0))
+        for name, value in total.items():
+            day[name] += value
+    return daily
+
+
+def _upsert(db: DBSession, table: Any, totals: Dict[RollupKey, Dict[str, Any]]) -> None:
+    """Soma `totals` às linhas de `table` (INSERT ... ON CONFLICT DO UPDATE quando o dialeto suporta)."""
+    values = [
+        {"bucket_start": bucket_start, "model": model, "skill_name": skill_name, **total}
+        for (bucket_start, model, skill_name), total in totals.items()
+    ]
+    if not values:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bucket_start", "model", "skill_name"],
+            set_={
+                name: getattr(table, name) + getattr(stmt.excluded, name)
+                for name in ("calls", "tokens_in", "tokens_out", "estimated_cost_usd")
+            },
+        )
+        db.execute(stmt, values)
+        return
+
+    # Outros dialetos: UPDATE e, se a linha ainda não existe, INSERT.
+    for value in values:
+        updated = (
+            db.query(table)
+            .filter(
+                table.bucket_start == value["bucket_start"],
+                table.model == value["model"],
+                table.skill_name == value["skill_name"],
+            )
+            .update({
+                name: getattr(table, name) + value[name]
+                for name in ("calls", "tokens_in", "tokens_out", "estimated_cost_usd")
+            })
+        )
+        if not updated:
+            db.execute(insert(table).values(**value))
+
+
+def apply_llm_rollups(db: DBSession, rows: List[Dict[str, Any]]) -> None:
+    """
+    Soma um lote de linhas de `llm_calls` aos totais por hora e por dia.
+    Chamado pelo telemetry_writer dentro da mesma transação do INSERT.
+    """
+    hourly = _aggregate(rows, hour_start)
+    _upsert(db, LLMUsageHourly, hourly)
+    _upsert(db, LLMUsageDaily, _hourly_to_daily(hourly))
+
+
+def rebuild_rollups(db: DBSession, since: Optional[datetime] = None) -> int:
+    """
+    Recalcula os totais a partir de `llm_calls` (desde `since`, arredondado
+    para o início do dia; None = tudo). Apaga e regrava os períodos
+    afetados numa transação. Devolve quantas linhas de `llm_calls` leu.
+    """
+    since = day_start(_as_utc(since)) if since is not None else None
+
+    query = db.query(
+        LLMCall.created_at, LLMCall.model, LLMCall.skill_name,
+        LLMCall.tokens_in, LLMCall.tokens_out, LLMCall.estimated_cost_usd,
+    )
+    if since is not None:
+        query = query.filter(LLMCall.created_at >= since)
+    count = 0
+
+    def stream():
+        nonlocal count
+        for row in query.yield_per(5000):
+            count += 1
+            yield row._asdict()
+
+    hourly = _aggregate(stream(), hour_start)
+
+    for table in ROLLUP_TABLES:
+        delete = db.query(table)
+        if since is not None:
+            delete = delete.filter(table.bucket_start >= since)
+        delete.delete(synchronize_session=False)
+    _upsert(db, LLMUsageHourly, hourly)
+    _upsert(db, LLMUsageDaily, _hourly_to_daily(hourly))
+    db.commit()
+    return count
+
+
+def usage_since(db: DBSession, since: datetime) -> List[Dict[str, Any]]:
+    """
+    Uso de LLM desde `since`, por (modelo, skill): dias inteiros vêm de
+    `llm_usage_daily`, as horas inteiras do começo do período de
+    `llm_usage_hourly`, e só o pedaço de hora inicial é lido de `llm_calls`
+    (pelo índice de (created_at, model)).
+    """
+    since = _as_utc(since)
+    # Primeira hora cheia e primeiro dia cheio a partir de `since`.
+    first_hour = hour_start(since)
+    if first_hour < since:
+        first_hour += timedelta(hours=1)
+    first_day = day_start(first_hour)
+    if first_day < first_hour:
+        first_day += timedelta(days=1)
+
+    def totals(source, time_column, calls, start, end=None):
+        query = db.query(
+            source.model,
+            source.skill_name,
+            calls,
+            func.sum(source.tokens_in),
+            func.sum(source.tokens_out),
+            func.sum(source.estimated_cost_usd),
+        ).filter(time_column >= start)
+        if end is not None:
+            query = query.filter(time_column < end)
+        return query.group_by(source.model, source.skill_name).all()
+
+    merged: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    sources = [
+        totals(LLMCall, LLMCall.created_at, func.count(LLMCall.id), since, first_hour),
+        totals(LLMUsageHourly, LLMUsageHourly.bucket_start, func.sum(LLMUsageHourly.calls), first_hour, first_day),
+        totals(LLMUsageDaily, LLMUsageDaily.bucket_start, func.sum(LLMUsageDaily.calls), first_day),
+    ]
+    for rows in sources:
+        for model, skill_name, calls, tokens_in, tokens_out, cost in rows:
+            total = merged.setdefault((model, skill_name), {
+                "model": model, "skill_name": skill_name,
+                "calls": 0, "tokens_in": 0, "tokens_out": 0, "estimated_cost_usd": 0.0,
+            })
+            total["calls"] += calls or 0
+            total["tokens_in"] += tokens_in or 0
+            total["tokens_out"] += tokens_out or 0
+            total["estimated_cost_usd"] += cost or 0.0
+    return list(merged.values())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db.base import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Recalcula llm_usage_hourly/llm_usage_daily a partir de llm_calls.")
+    parser.add_argument("--dias", type=int, default=None, help="Só os últimos N dias (padrão: tudo).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    since = datetime.now(timezone.utc) - timedelta(days=args.dias) if args.dias else None
+    db = SessionLocal()
+    try:
+        lidas = rebuild_rollups(db, since)
+    finally:
+        db.close()
+    print(f"✅ Totais recalculados a partir de {lidas} linha(s) de llm_calls.")
@@ -13,10 +13,12 @@ relativo entre modelos/skills, não reconciliar com a fatura real.
 """
 
 import logging
+from datetime import datetime, timezone
 from typing import Any, Optional
 
-from db.base import SessionLocal
 from db.models import LLMCall
+from services.llm_rollups import apply_llm_rollups
+from services.telemetry_writer import telemetry_writer
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +31,11 @@ PRECOS_POR_1M_TOKENS = {
 }
 
 
+# Os totais por hora/dia (MonitorDeCustosLLM) são atualizados no mesmo commit
+# que grava cada lote de llm_calls.
+telemetry_writer.add_hook(LLMCall, apply_llm_rollups)
+
+
 def estimate_cost(model_family: str, tokens_in: int, tokens_out: int) -> Optional[float]:
     precos = PRECOS_POR_1M_TOKENS.get(model_family)
     if precos is None or tokens_in is None or tokens_out is None:
@@ -70,8 +77,9 @@ def log_llm_call(
     LangChain (`llm_response`, e os tokens são extraídos dela automaticamente)
     ou os tokens já contados manualmente (`tokens_in`/`tokens_out`).
 
-    Uma falha aqui nunca deve interromper a resposta ao usuário -- por isso
-    o try/except só loga o erro.
+    A linha só é enfileirada (services/telemetry_writer.py) -- a gravação
+    acontece em lote, fora da requisição. Uma falha aqui nunca deve
+    interromper a resposta ao usuário -- por isso o try/except só loga o erro.
     """
     try:
         if llm_response is not None and (tokens_in is None or tokens_out is None):
@@ -79,18 +87,14 @@ def log_llm_call(
 
         cost = estimate_cost(model_family, tokens_in, tokens_out) if (tokens_in and tokens_out) else None
 
-        db = SessionLocal()
-        try:
-            db.add(LLMCall(
-                session_id=session_id,
-                model=model_family,
-                skill_name=skill_name,
-                tokens_in=tokens_in,
-                tokens_out=tokens_out,
-                estimated_cost_usd=cost,
-            ))
-            db.commit()
-        finally:
-            db.close()
+        telemetry_writer.submit(LLMCall, {
+            "session_id": session_id,
+            "model": model_family,
+            "skill_name": skill_name,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "estimated_cost_usd": cost,
+            "created_at": datetime.now(timezone.utc),
+        })
     except Exception:
         logger.exception(f"Falha ao registrar uso de LLM ({skill_name}/{model_family}) — resposta ao usuário não é afetada")
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Contexto por requisição (credenciais Google do usuário) -- guardado num
+`ContextVar`, não como atributo das tools.
+
+Antes, as tools de Calendar/Gmail/Drive recebiam as credenciais via
+`tool.set_credentials(...)`, ou seja, como estado da própria instância. Isso
+obrigava a criar uma AgentFactory nova a cada /chat: uma factory
+compartilhada correria o risco de uma requisição ler as credenciais de outra.
+Com um ContextVar, cada requisição enxerga só o próprio valor (inclusive
+dentro das threads/tasks que o LangChain abre para executar as tools -- ele
+copia o contexto ao despachar), então as mesmas instâncias de tool e o mesmo
+grafo compilado podem ser reaproveitados entre usuários com segurança.
+
+Junto vai a identidade do usuário (e-mail do login Google ou, na falta
+dele, o session_id), usada para separar por usuário o cache das ferramentas
+que leem dados pessoais (agent/tool_cache_policy.py).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+_user_credentials: ContextVar[Optional[Any]] = ContextVar("user_credentials", default=None)
+_user_identity: ContextVar[Optional[str]] = ContextVar("user_identity", default=None)
+
+
+def get_user_credentials() -> Optional[Any]:
+    """Credenciais Google da requisição atual (None se o usuário não fez login)."""
+    return _user_credentials.get()
+
+
+def get_user_identity() -> Optional[str]:
+    """Identidade do usuário da requisição atual (None se desconhecida)."""
+    return _user_identity.get()
+
+
+@contextmanager
+def user_credentials_context(
+    credentials: Optional[Any],
+    identity: Optional[str] = None,
+) -> Iterator[None]:
+    """Define credenciais e identidade durante o bloco `with` e restaura os valores anteriores ao sair."""
+    token = _user_credentials.set(credentials)
+    identity_token = _user_identity.set(identity)
+    try:
+        yield
+    finally:
+        _user_identity.reset(identity_token)
+        _user_credentials.reset(token)
@@ -0,0 +1,278 @@
+"""
+Retenção de dados: arquiva e apaga linhas antigas de `tool_calls` e
+`llm_calls` e remove sessões expiradas há muito tempo (com suas mensagens).
+
+Sem isso, essas tabelas (e seus índices) só cresciam: `tool_calls` guarda
+até 4 KB de resultado por chamada, toda rodada do orquestrador acrescenta
+uma linha em `llm_calls`, e sessões expiradas ficavam no banco para sempre.
+Tudo o que consulta essas tabelas ficava mais lento com o tempo.
+
+Políticas (utils/settings.py, RETENTION_*; <= 0 desliga cada uma):
+
+- `tool_calls` mais antigos que RETENTION_TOOL_CALLS_DAYS;
+- `llm_calls` mais antigos que RETENTION_LLM_CALLS_DAYS -- os totais por
+  hora/dia (services/llm_rollups.py) não são apagados, então o
+  MonitorDeCustosLLM continua enxergando o custo desses períodos;
+- sessões inativas há mais que SESSION_TTL_MINUTES + RETENTION_SESSION_GRACE_DAYS
+  (já expiradas para a API), junto com as mensagens e credenciais Google.
+  As linhas de `tool_calls` dessas sessões ficam, sem `session_id` -- elas
+  seguem a política de `tool_calls`.
+
+Antes de apagar, cada lote é gravado em RETENTION_ARCHIVE_DIR como JSONL
+comprimido com gzip (um arquivo por lote, em uma subpasta por tabela; uma
+sessão vira uma linha, com as mensagens dentro). Credenciais Google não são
+arquivadas. O arquivo é gravado ANTES do DELETE ser confirmado: se o
+commit falhar, o lote pode reaparecer num próximo arquivo, mas nenhuma linha
+é apagada sem ter sido arquivada. Parquet ficou de fora para não
+acrescentar o pyarrow às dependências.
+
+Pode rodar com a aplicação no ar: cada lote (RETENTION_BATCH_SIZE linhas) é
+uma transação curta, com DELETE pela chave primária. No Postgres, o lote é
+selecionado com FOR UPDATE SKIP LOCKED, então dois processos de retenção ao
+mesmo tempo (ex.: vários workers com RETENTION_INTERVAL_HOURS ligado) não
+disputam as mesmas linhas. No SQLite, as transações curtas deixam o banco
+livre para as requisições entre um lote e outro.
+
+Uso:
+
+    cd app && python -m services.retention            # roda as políticas
+    cd app && python -m services.retention --compact  # e depois VACUUM
+
+ou em background na própria aplicação, com RETENTION_INTERVAL_HOURS > 0.
+"""
+
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from threading import Event, Thread
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import inspect, text
+
+from db.base import SessionLocal, engine
+from db.models import GoogleCredential, LLMCall, Message, SessionModel, ToolCall
+from utils.settings import WrappedSettings as Settings
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _row_dict(row: Any) -> Dict[str, Any]:
+    return {column.key: getattr(row, column.key) for column in inspect(row).mapper.column_attrs}
+
+
+class RetentionJob:
+    def __init__(
+        self,
+        archive_dir: str,
+        batch_size: int = 1000,
+        tool_calls_days: int = 90,
+        llm_calls_days: int = 180,
+        session_grace_days: int = 30,
+        session_ttl_minutes: int = 120,
+    ):
+        self.archive_dir = archive_dir
+        self.batch_size = max(1, batch_size)
+        self.tool_calls_days = tool_calls_days
+        self.llm_calls_days = llm_calls_days
+        self.session_grace_days = session_grace_days
+        self.session_ttl = timedelta(minutes=session_ttl_minutes)
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    # ------------------------------------------------------------------
+    # Arquivo
+    # ------------------------------------------------------------------
+
+    def _archive(self, table: str, records: List[Dict[str, Any]], first_id: Any, last_id: Any) -> str:
+        """Grava `records` num .jsonl.gz novo e devolve o caminho."""
+        folder = os.path.join(self.archive_dir, table)
+        os.makedirs(folder, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        path = os.path.join(folder, f"{table}-{stamp}-{first_id}-{last_id}.jsonl.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=_json_default) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return path
+
+    @staticmethod
+    def _locked_batch(db, query):
+        """No Postgres, trava o lote e pula linhas já travadas por outro processo de retenção."""
+        if db.get_bind().dialect.name == "postgresql":
+            return query.with_for_update(skip_locked=True)
+        return query
+
+    # ------------------------------------------------------------------
+    # Políticas
+    # ------------------------------------------------------------------
+
+    def purge_table(self, model: Any, older_than_days: int) -> int:
+        """Arquiva e apaga, em lotes, as linhas de `model` com `created_at` mais antigo que o limite."""
+        if older_than_days <= 0:
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+        table = model.__tablename__
+        total = 0
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                rows = self._locked_batch(
+                    db,
+                    db.query(model).filter(model.created_at < cutoff).order_by(model.id).limit(self.batch_size),
+                ).all()
+                if not rows:
+                    break
+                ids = [row.id for row in rows]
+                self._archive(table, [_row_dict(row) for row in rows], ids[0], ids[-1])
+                db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+                total += len(ids)
+            finally:
+                db.close()
+        if total:
+            logger.info(f"Retenção: {total} linha(s) de {table} arquivada(s) e apagada(s)")
+        return total
+
+    def purge_sessions(self) -> int:
+        """
+        Arquiva e apaga sessões inativas há mais que TTL + carência, com
+        mensagens e credenciais. `tool_calls` dessas sessões ficam, sem session_id.
+        """
+        if self.session_grace_days <= 0:
+            return 0
+        cutoff = datetime.now(timezone.utc) - self.session_ttl - timedelta(days=self.session_grace_days)
+        total = 0
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                sessions = self._locked_batch(
+                    db,
+                    db.query(SessionModel)
+                    .filter(SessionModel.last_active < cutoff)
+                    .order_by(SessionModel.last_active, SessionModel.id)
+                    .limit(self.batch_size),
+                ).all()
+                if not sessions:
+                    break
+                ids = [s.id for s in sessions]
+
+                messages: Dict[str, List[Dict[str, Any]]] = {}
+                for m in (
+                    db.query(Message.session_id, Message.id, Message.role, Message.content, Message.created_at)
+                    .filter(Message.session_id.in_(ids))
+                    .order_by(Message.id)
+                ):
+                    messages.setdefault(m.session_id, []).append(
+                        {"id": m.id, "role": m.role, "content": m.content, "created_at": m.created_at}
+                    )
+                records = [{**_row_dict(s), "messages": messages.get(s.id, [])} for s in sessions]
+                self._archive("sessions", records, ids[0], ids[-1])
+
+                # Filhos antes do pai (as FKs apontam para sessions.id).
+                db.query(ToolCall).filter(ToolCall.session_id.in_(ids)).update(
+                    {"session_id": None}, synchronize_session=False
+                )
+                db.query(Message).filter(Message.session_id.in_(ids)).delete(synchronize_session=False)
+                db.query(GoogleCredential).filter(GoogleCredential.session_id.in_(ids)).delete(synchronize_session=False)
+                db.query(SessionModel).filter(SessionModel.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+                total += len(ids)
+            finally:
+                db.close()
+        if total:
+            logger.info(f"Retenção: {total} sessão(ões) expirada(s) arquivada(s) e apagada(s)")
+        return total
+
+    def run(self) -> Dict[str, int]:
+        """Aplica todas as políticas. Devolve quantas linhas saíram de cada tabela."""
+        return {
+            # Sessões primeiro: os tool_calls delas perdem o session_id, mas
+            # continuam sujeitos à própria política logo em seguida.
+            "sessions": self.purge_sessions(),
+            "tool_calls": self.purge_table(ToolCall, self.tool_calls_days),
+            "llm_calls": self.purge_table(LLMCall, self.llm_calls_days),
+        }
+
+    def compact(self) -> None:
+        """
+        Devolve ao sistema o espaço liberado pelos DELETEs. No SQLite,
+        VACUUM reescreve o arquivo inteiro e bloqueia escritas enquanto roda
+        -- use fora do horário de uso. No Postgres, o autovacuum já reaproveita
+        o espaço; aqui só se adianta um VACUUM ANALYZE das tabelas afetadas.
+        """
+        dialect = engine.dialect.name
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if dialect == "sqlite":
+                conn.execute(text("VACUUM"))
+            elif dialect == "postgresql":
+                for table in ("tool_calls", "llm_calls", "messages", "sessions", "google_credentials"):
+                    conn.execute(text(f"VACUUM ANALYZE {table}"))
+        logger.info(f"Retenção: compactação concluída ({dialect})")
+
+    # ------------------------------------------------------------------
+    # Execução periódica
+    # ------------------------------------------------------------------
+
+    def start(self, interval_hours: float) -> None:
+        """Roda as políticas agora e depois a cada `interval_hours` (idempotente; <= 0 não inicia)."""
+        if interval_hours <= 0:
+            logger.info("Retenção: execução periódica desativada (rode python -m services.retention)")
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run()
+                except Exception:
+                    logger.exception("Retenção: erro na execução periódica")
+                self._stop.wait(interval_hours * 3600)
+
+        self._thread = Thread(target=loop, name="retention", daemon=True)
+        self._thread.start()
+        logger.info(f"Retenção: execução periódica iniciada (a cada {interval_hours}h)")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+# Instância única compartilhada pela aplicação inteira.
+retention_job = RetentionJob(
+    archive_dir=Settings.retention["archive_dir"],
+    batch_size=Settings.retention["batch_size"],
+    tool_calls_days=Settings.retention["tool_calls_days"],
+    llm_calls_days=Settings.retention["llm_calls_days"],
+    session_grace_days=Settings.retention["session_grace_days"],
+    session_ttl_minutes=Settings.session_ttl_minutes,
+)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db.base import init_db
+
+    parser = argparse.ArgumentParser(description="Arquiva e apaga dados antigos conforme RETENTION_*.")
+    parser.add_argument("--compact", action="store_true", help="Roda VACUUM depois de apagar.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    resultado = retention_job.run()
+    for tabela, linhas in resultado.items():
+        print(f"  {tabela:<12} {linhas} linha(s) removida(s)")
+    if args.compact:
+        retention_job.compact()
+    print(f"✅ Retenção concluída (arquivos em {retention_job.archive_dir})")
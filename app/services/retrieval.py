@@ -0,0 +1,260 @@
+"""
+Busca híbrida das ferramentas de RAG (AjudaShark, RAGDaBaseDeCodigo,
+OnboardingGuiado): ranking vetorial do Chroma + ranking BM25 de um índice
+invertido local, combinados por reciprocal-rank fusion (RRF).
+
+Só com similaridade de embedding, perguntas com termos exatos -- nome de um
+bloco do Blip, um código de erro, o nome de um serviço -- muitas vezes não
+traziam o chunk que contém exatamente aquele termo, e as ferramentas
+compensavam pedindo mais chunks por consulta. O BM25 acerta justamente
+esses casos; o vetor continua acertando as perguntas em linguagem natural.
+
+Índice: a tabela `knowledge_terms` (termo -> chunk, frequência) e o tamanho
+de cada chunk em `knowledge_chunks.num_terms`. É gravado pela própria
+ingestão, em `aplicar_chunks` (services/knowledge_tracking.py), na mesma
+transação do mapa de chunks: quando o hash de um documento muda, os termos
+dos chunks que saíram são apagados e só os chunks novos são tokenizados.
+Chunks indexados antes do índice existir são preenchidos na próxima
+reindexação do arquivo, ou de uma vez, sem gerar embeddings:
+
+    cd app && python -m services.retrieval --colecao shark_helper --reindexar
+
+Consulta (`hybrid_search`): para cada texto da consulta, um ranking
+vetorial e um BM25 de até RAG_CANDIDATES chunks; a fusão soma
+1 / (RAG_RRF_K + posição) de cada ranking e fica com os `n_results`
+melhores. O BM25 roda numa thread enquanto o Chroma responde, e chunks que
+só o BM25 achou têm o texto buscado no Chroma numa única chamada. Se o
+índice estiver vazio ou a consulta BM25 falhar, o resultado é o vetorial
+puro, como antes. Para comparar os rankings de uma pergunta:
+
+    cd app && python -m services.retrieval --colecao shark_helper --buscar "erro 504 no bloco de início"
+"""
+
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy import func, insert
+
+from db.base import SessionLocal
+from db.models import KnowledgeChunk, KnowledgeTerm
+from services import chroma
+from utils.settings import WrappedSettings as Settings
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros usuais do BM25 (saturação da frequência e normalização pelo tamanho).
+K1 = 1.2
+B = 0.75
+# Termos presentes em mais que essa fração dos chunks quase não pesam no
+# BM25 e trariam metade da coleção do banco a cada consulta: são ignorados.
+MAX_DF_RATIO = 0.5
+MAX_TERM_LENGTH = 64
+# Chunks por lote ao preencher o índice a partir do Chroma.
+BACKFILL_BATCH_SIZE = 300
+
+_TOKEN = re.compile(r"\w+")
+_COMBINING = re.compile(r"[\u0300-\u036f]")
+
+STOPWORDS = frozenset(
+    """
+    a ao aos as com como da das de do dos e ela ele em entre era essa esse esta este eu foi
+    for ha isso isto ja lhe mais mas me mesmo muito na nas nao no nos num numa o os ou para
+    pela pelas pelo pelos por qual quando que quem se sem ser seu sua sao tem tambem te um uma
+    the and of to in is for on with
+    """.split()
+)
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bm25")
+
+
+def tokenize(text: str) -> List[str]:
+    """Termos do texto: minúsculas, sem acentos, sem stopwords ("Início" e "inicio" são o mesmo termo)."""
+    text = _COMBINING.sub("", unicodedata.normalize("NFKD", text.casefold()))
+    return [
+        token
+        for token in _TOKEN.findall(text)
+        if token not in STOPWORDS and len(token) <= MAX_TERM_LENGTH and (len(token) > 1 or token.isdigit())
+    ]
+
+
+def indexar_termos(db, collection: str, chunks: Dict[str, str]) -> Dict[str, int]:
+    """
+    Grava em `db` (sem commit) os termos de cada chunk (id -> texto) e
+    devolve quantos termos cada um tem, para `knowledge_chunks.num_terms`.
+    """
+    if not chunks:
+        return {}
+    ids = list(chunks)
+    for start in range(0, len(ids), BACKFILL_BATCH_SIZE):
+        batch = ids[start:start + BACKFILL_BATCH_SIZE]
+        db.query(KnowledgeTerm).filter(KnowledgeTerm.chunk_id.in_(batch)).delete(synchronize_session=False)
+
+    num_terms: Dict[str, int] = {}
+    rows = []
+    for chunk_id, text in chunks.items():
+        counts = Counter(tokenize(text))
+        num_terms[chunk_id] = sum(counts.values())
+        rows.extend(
+            {"chunk_id": chunk_id, "term": term, "collection": collection, "tf": tf}
+            for term, tf in counts.items()
+        )
+    if rows:
+        db.execute(insert(KnowledgeTerm), rows)
+    return num_terms
+
+
+def bm25_search(collection: str, query_texts: Sequence[str], limit: int) -> List[List[str]]:
+    """Um ranking BM25 (ids de chunks, melhor primeiro) por texto de `query_texts`."""
+    queries = [list(dict.fromkeys(tokenize(text))) for text in query_texts]
+    terms = sorted({term for query in queries for term in query})
+    if not terms:
+        return [[] for _ in queries]
+
+    db = SessionLocal()
+    try:
+        total, avg_len = (
+            db.query(func.count(KnowledgeChunk.id), func.avg(KnowledgeChunk.num_terms))
+            .filter(KnowledgeChunk.collection == collection, KnowledgeChunk.num_terms.isnot(None))
+            .one()
+        )
+        if not total:
+            return [[] for _ in queries]
+        df = dict(
+            db.query(KnowledgeTerm.term, func.count())
+            .filter(KnowledgeTerm.collection == collection, KnowledgeTerm.term.in_(terms))
+            .group_by(KnowledgeTerm.term)
+            .all()
+        )
+        useful = [term for term, n in df.items() if n <= MAX_DF_RATIO * total] or list(df)
+        if not useful:
+            return [[] for _ in queries]
+        postings = (
+            db.query(KnowledgeTerm.term, KnowledgeTerm.chunk_id, KnowledgeTerm.tf, KnowledgeChunk.num_terms)
+            .join(KnowledgeChunk, KnowledgeChunk.id == KnowledgeTerm.chunk_id)
+            .filter(KnowledgeTerm.collection == collection, KnowledgeTerm.term.in_(useful))
+            .all()
+        )
+    finally:
+        db.close()
+
+    avg_len = float(avg_len or 1) or 1.0
+    idf = {term: math.log(1 + (total - n + 0.5) / (n + 0.5)) for term, n in df.items()}
+    by_term: Dict[str, List[tuple]] = defaultdict(list)
+    for term, chunk_id, tf, length in postings:
+        weight = tf * (K1 + 1) / (tf + K1 * (1 - B + B * (length or 0) / avg_len))
+        by_term[term].append((chunk_id, idf[term] * weight))
+
+    rankings = []
+    for query in queries:
+        scores: Dict[str, float] = defaultdict(float)
+        for term in query:
+            for chunk_id, score in by_term.get(term, ()):
+                scores[chunk_id] += score
+        rankings.append(sorted(scores, key=scores.get, reverse=True)[:limit])
+    return rankings
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> List[str]:
+    """Funde rankings de ids: cada id soma 1 / (k + posição) em cada ranking em que aparece."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for position, id_ in enumerate(ranking, start=1):
+            scores[id_] += 1.0 / (k + position)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def hybrid_search(collection: str, query_texts: List[str], n_results: int) -> List[str]:
+    """
+    Textos dos `n_results` melhores chunks de `collection` para
+    `query_texts`, pela fusão dos rankings vetorial e BM25 (sem repetidos).
+    Erros do Chroma sobem para a ferramenta; do BM25, só viram log.
+    """
+    config = Settings.rag
+    if not config["hybrid"]:
+        data = chroma.query(collection, query_texts=query_texts, n_results=n_results)
+        return list(dict.fromkeys(doc for docs in data.get("documents") or [] for doc in docs))[:n_results]
+
+    candidates = max(n_results, config["candidates"])
+    lexical = _executor.submit(bm25_search, collection, query_texts, candidates)
+    data = chroma.query(collection, query_texts=query_texts, n_results=candidates)
+
+    documents: Dict[str, str] = {}
+    rankings: List[Sequence[str]] = []
+    for ids, docs in zip(data.get("ids") or [], data.get("documents") or []):
+        rankings.append(ids)
+        documents.update(zip(ids, docs))
+    try:
+        rankings.extend(lexical.result())
+    except Exception as e:
+        logger.warning(f"BM25 em '{collection}' falhou ({e}); usando só o ranking vetorial")
+
+    fused = reciprocal_rank_fusion(rankings, k=config["rrf_k"])[:n_results]
+    missing = [id_ for id_ in fused if id_ not in documents]
+    if missing:
+        found = chroma.get(collection, ids=missing, include=["documents"])
+        documents.update(zip(found.get("ids") or [], found.get("documents") or []))
+    return list(dict.fromkeys(documents[id_] for id_ in fused if documents.get(id_)))
+
+
+def preencher_indice(collection: str) -> int:
+    """
+    Indexa no BM25 os chunks de `collection` que ainda não têm termos
+    (num_terms NULL), com o texto lido do Chroma. Devolve quantos indexou.
+    """
+    db = SessionLocal()
+    try:
+        pending = [
+            row.id
+            for row in db.query(KnowledgeChunk.id)
+            .filter(KnowledgeChunk.collection == collection, KnowledgeChunk.num_terms.is_(None))
+            .all()
+        ]
+        indexados = 0
+        for start in range(0, len(pending), BACKFILL_BATCH_SIZE):
+            found = chroma.get(collection, ids=pending[start:start + BACKFILL_BATCH_SIZE], include=["documents"])
+            textos = {id_: doc for id_, doc in zip(found["ids"], found["documents"]) if doc is not None}
+            for chunk_id, n in indexar_termos(db, collection, textos).items():
+                db.query(KnowledgeChunk).filter(KnowledgeChunk.id == chunk_id).update(
+                    {KnowledgeChunk.num_terms: n}, synchronize_session=False
+                )
+            db.commit()
+            indexados += len(textos)
+            logger.info(f"BM25 '{collection}': {indexados}/{len(pending)} chunk(s) indexado(s)")
+        return indexados
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db.base import init_db
+
+    parser = argparse.ArgumentParser(description="Índice BM25 e busca híbrida das coleções de RAG.")
+    parser.add_argument("--colecao", required=True, help="Coleção do Chroma (ex.: shark_helper).")
+    parser.add_argument("--reindexar", action="store_true", help="Indexa no BM25 os chunks que ainda não estão no índice.")
+    parser.add_argument("--buscar", help="Mostra os rankings vetorial, BM25 e fundido de uma pergunta.")
+    parser.add_argument("-n", type=int, default=3, help="Resultados da busca (padrão: 3).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    init_db()
+    if args.reindexar:
+        print(f"✅ {preencher_indice(args.colecao)} chunk(s) indexado(s) no BM25 de '{args.colecao}'.")
+    if args.buscar:
+        candidates = max(args.n, Settings.rag["candidates"])
+        vetorial = chroma.query(args.colecao, query_texts=[args.buscar], n_results=candidates)["ids"][0]
+        lexico = bm25_search(args.colecao, [args.buscar], candidates)[0]
+        print("vetorial:", vetorial[:args.n])
+        print("bm25:    ", lexico[:args.n])
+        print("fusão:   ", reciprocal_rank_fusion([vetorial, lexico], k=Settings.rag["rrf_k"])[:args.n])
+        for doc in hybrid_search(args.colecao, [args.buscar], args.n):
+            print("\n---\n" + doc[:500])
@@ -13,13 +13,26 @@ restart/deploy do processo (antes, um dict em memória, zerava toda vez) e,
 se DATABASE_URL apontar para Postgres, ficam visíveis para múltiplas
 instâncias/workers ao mesmo tempo -- o que a versão em memória não permitia.
 
-Uma simplificação deliberada em relação à versão anterior: não há mais uma
-rotina ativa de "purge" de sessões expiradas. Na versão em memória isso era
-necessário para não vazar RAM indefinidamente; numa tabela em disco, uma
-sessão expirada que ninguém mais acessa não causa o mesmo tipo de problema --
-ela só deixa de ser considerada válida por `exists()`/`get_or_create()`
-(comparando `last_active` contra o TTL), mas a linha continua no banco
-disponível para consulta/auditoria caso um dia isso seja útil.
+Não há uma rotina de "purge" aqui: uma sessão expirada só deixa de ser
+considerada válida por `exists()`/`get_or_create()` (comparando
+`last_active` contra o TTL). Quem tira essas linhas do banco é a retenção
+(services/retention.py), que arquiva e apaga sessões expiradas há mais de
+RETENTION_SESSION_GRACE_DAYS, junto com as mensagens -- até lá, continuam
+disponíveis para consulta/auditoria.
+
+Caminho do /chat: em vez de get_or_create + get_messages +
+get_google_credentials + get_user_info (cada um abrindo sua própria sessão
+do SQLAlchemy) e depois append_messages + get_messages, uma mensagem faz
+só duas idas ao banco -- `load_context` (uma consulta com JOIN que traz
+validade da sessão, credenciais, perfil e histórico) e `save_turn` (uma
+única transação de escrita no final). Os métodos individuais continuam
+existindo para as rotas de autenticação e histórico.
+
+O histórico nunca precisa ser lido inteiro: `get_messages` pagina por
+cursor (`after_id`/`limit`, sobre o índice de `messages.session_id` -- que
+em ordem de id é a ordem da conversa), e `load_context(full_history=False)`
+traz só as mensagens ainda não cobertas pelo resumo da sessão, que é tudo o
+que o agente usa (agent/context.py).
 """
 
 import json
@@ -28,6 +41,8 @@ import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
+from sqlalchemy import and_, insert, or_
+
 from db.base import SessionLocal
 from db.models import GoogleCredential, Message, SessionModel
 from utils.settings import WrappedSettings as Settings
@@ -91,20 +106,163 @@ class SessionStore:
                 db.close()
         return self.create()
 
+    # ------------------------------------------------------------------
+    # Caminho do /chat: uma leitura e uma escrita por mensagem
+    # ------------------------------------------------------------------
+
+    def load_context(self, session_id: Optional[str], full_history: bool = True) -> Dict[str, Any]:
+        """
+        Tudo o que uma mensagem precisa da sessão, numa única consulta
+        (sessions LEFT JOIN google_credentials LEFT JOIN messages).
+
+        Com `full_history=False`, "messages" traz só as mensagens posteriores
+        a `summary_upto_message_id` -- o bastante para montar o prompt, sem
+        reler a conversa inteira a cada turno.
+
+        Se `session_id` não existir ou tiver expirado, cria uma sessão nova
+        e devolve o id dela com contexto vazio e `is_new=True`. A criação
+        acontece já aqui (e não só em `save_turn`) porque a auditoria das
+        ferramentas (`tool_calls.session_id`) referencia a sessão durante o
+        turno -- só a primeira mensagem de cada conversa paga essa escrita.
+
+        Returns:
+            {"session_id", "is_new", "messages", "summary",
+             "summary_upto_message_id", "google_credentials", "user_info"}
+            -- cada mensagem com "id", "role" e "content".
+        """
+        rows = []
+        if session_id:
+            message_join = Message.session_id == SessionModel.id
+            if not full_history:
+                message_join = and_(message_join, or_(
+                    SessionModel.summary_upto_message_id.is_(None),
+                    Message.id > SessionModel.summary_upto_message_id,
+                ))
+            db = SessionLocal()
+            try:
+                rows = (
+                    db.query(
+                        SessionModel.last_active,
+                        SessionModel.user_name,
+                        SessionModel.user_email,
+                        SessionModel.summary,
+                        SessionModel.summary_upto_message_id,
+                        GoogleCredential,
+                        Message.id,
+                        Message.role,
+                        Message.content,
+                    )
+                    .outerjoin(GoogleCredential, GoogleCredential.session_id == SessionModel.id)
+                    .outerjoin(Message, message_join)
+                    .filter(SessionModel.id == session_id)
+                    .order_by(Message.id.asc())
+                    .all()
+                )
+            finally:
+                db.close()
+
+        if not rows or (_utcnow() - _as_aware(rows[0].last_active)) > self._ttl:
+            return {
+                "session_id": self.create(),
+                "is_new": True,
+                "messages": [],
+                "summary": None,
+                "summary_upto_message_id": None,
+                "google_credentials": None,
+                "user_info": None,
+            }
+
+        first = rows[0]
+        return {
+            "session_id": session_id,
+            "is_new": False,
+            # Sessão sem mensagens ainda: uma única linha com role/content nulos.
+            "messages": [
+                {"id": r.id, "role": r.role, "content": r.content} for r in rows if r.role is not None
+            ],
+            "summary": first.summary,
+            "summary_upto_message_id": first.summary_upto_message_id,
+            "google_credentials": self._credentials_dict(first.GoogleCredential),
+            "user_info": (
+                {"user": first.user_name, "email": first.user_email}
+                if (first.user_name or first.user_email) else None
+            ),
+        }
+
+    def save_turn(self, session_id: str, new_messages: List[Dict[str, Any]]) -> List[int]:
+        """
+        Grava as mensagens de um turno e renova `last_active`, numa única
+        transação. Devolve os ids das mensagens gravadas, na mesma ordem.
+        """
+        db = SessionLocal()
+        try:
+            now = _utcnow()
+            # Core (não ORM) de propósito: tudo é executado na ordem escrita
+            # -- a sessão existe antes das mensagens que apontam para ela.
+            if not db.query(SessionModel).filter(SessionModel.id == session_id).update({"last_active": now}):
+                # Sumiu entre a leitura e a escrita (ex.: limpeza de sessões) -- recria.
+                db.execute(insert(SessionModel).values(id=session_id, created_at=now, last_active=now))
+            ids: List[int] = []
+            if new_messages:
+                # INSERT em lote em vez de um INSERT ... RETURNING por mensagem
+                # (o SQLAlchemy agrupa o RETURNING e devolve na ordem dos parâmetros).
+                ids = list(db.scalars(
+                    insert(Message).returning(Message.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "session_id": session_id,
+                            "role": str(m.get("role", "user")),
+                            "content": str(m.get("content", "")),
+                        }
+                        for m in new_messages
+                    ],
+                ))
+            db.commit()
+            return ids
+        finally:
+            db.close()
+
+    def save_summary(self, session_id: str, summary: str, upto_message_id: int) -> None:
+        """
+        Grava o resumo da conversa (agent/context.py). Só avança: se outro
+        turno já gravou um resumo que cobre mais mensagens, este é descartado.
+        """
+        db = SessionLocal()
+        try:
+            db.query(SessionModel).filter(
+                SessionModel.id == session_id,
+                or_(
+                    SessionModel.summary_upto_message_id.is_(None),
+                    SessionModel.summary_upto_message_id < upto_message_id,
+                ),
+            ).update({"summary": summary, "summary_upto_message_id": upto_message_id})
+            db.commit()
+        finally:
+            db.close()
+
     # ------------------------------------------------------------------
     # Histórico de conversa
     # ------------------------------------------------------------------
 
-    def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
+    def get_messages(
+        self,
+        session_id: str,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Mensagens da sessão em ordem, com "id". `after_id` e `limit` paginam
+        por cursor: a próxima página começa depois do último id recebido.
+        """
         db = SessionLocal()
         try:
-            rows = (
-                db.query(Message)
-                .filter(Message.session_id == session_id)
-                .order_by(Message.id.asc())
-                .all()
-            )
-            return [{"role": r.role, "content": r.content} for r in rows]
+            query = db.query(Message.id, Message.role, Message.content).filter(Message.session_id == session_id)
+            if after_id is not None:
+                query = query.filter(Message.id > after_id)
+            query = query.order_by(Message.id.asc())
+            if limit is not None:
+                query = query.limit(limit)
+            return [{"id": r.id, "role": r.role, "content": r.content} for r in query.all()]
         finally:
             db.close()
 
@@ -158,20 +316,24 @@ class SessionStore:
         finally:
             db.close()
 
+    @staticmethod
+    def _credentials_dict(row: Optional[GoogleCredential]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        return {
+            "token": row.token,
+            "refresh_token": row.refresh_token,
+            "token_uri": row.token_uri,
+            "client_id": row.client_id,
+            "client_secret": row.client_secret,
+            "scopes": json.loads(row.scopes) if row.scopes else [],
+        }
+
     def get_google_credentials(self, session_id: str) -> Optional[Dict[str, Any]]:
         db = SessionLocal()
         try:
             row = db.query(GoogleCredential).filter(GoogleCredential.session_id == session_id).first()
-            if row is None:
-                return None
-            return {
-                "token": row.token,
-                "refresh_token": row.refresh_token,
-                "token_uri": row.token_uri,
-                "client_id": row.client_id,
-                "client_secret": row.client_secret,
-                "scopes": json.loads(row.scopes) if row.scopes else [],
-            }
+            return self._credentials_dict(row)
         finally:
             db.close()
 
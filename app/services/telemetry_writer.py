@@ -0,0 +1,235 @@
+"""
+Gravação em background da telemetria (`tool_calls` e `llm_calls`).
+
+Antes, cada execução de ferramenta (SQLAuditCallbackHandler) e cada chamada
+de LLM (`log_llm_call`) abria uma sessão do SQLAlchemy e fazia um INSERT +
+commit ali mesmo, dentro da requisição -- um turno com três ferramentas e
+quatro chamadas de LLM pagava sete commits antes de responder.
+
+Agora essas linhas só entram numa fila em memória (`submit`, custo de um
+append) e uma thread as grava em lote: a cada TELEMETRY_BATCH_SIZE linhas ou
+TELEMETRY_FLUSH_MS milissegundos, o que vier primeiro, num único commit com
+um INSERT em lote (executemany) por tabela. No Postgres, o SQLAlchemy 2.x
+agrupa esse executemany em INSERTs de várias linhas ("insertmanyvalues").
+
+A fila é limitada (TELEMETRY_QUEUE_SIZE). Se o banco ficar para trás e ela
+encher, TELEMETRY_OVERFLOW decide:
+
+- "drop_oldest" (padrão): descarta a linha mais antiga da fila -- a
+  requisição nunca espera por telemetria;
+- "block": a requisição espera por espaço, até BLOCK_TIMEOUT_SECONDS; depois
+  disso, a linha nova é descartada. Só vale para quem chama de uma thread
+  comum: chamado de dentro de um event loop (o `_arun` das skills, o
+  /chat/stream), esperar travaria todas as requisições do worker, então
+  ali a fila cheia descarta a linha mais antiga, como em "drop_oldest".
+
+Outros módulos podem pedir para ser chamados dentro da transação de cada
+lote de uma tabela (`add_hook`) -- é assim que os totais por hora/dia de
+`llm_calls` (services/llm_rollups.py) são mantidos junto com as linhas.
+
+Se um lote falha ao gravar (ex.: uma linha viola uma constraint), as linhas
+dele são regravadas uma a uma, para uma linha ruim não levar o lote junto.
+Linhas descartadas e as que falharam mesmo sozinhas são contadas em `stats()`.
+No shutdown, `stop()` grava o que ainda estiver na fila. Fora do servidor
+(scripts, `python -m ...`), sem a thread iniciada, `submit` grava na hora,
+como antes.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from threading import Condition, Event, Thread
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from db.base import SessionLocal
+from utils.settings import WrappedSettings as Settings
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "block")
+BLOCK_TIMEOUT_SECONDS = 5
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class TelemetryWriter:
+    def __init__(
+        self,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_ms: int = 500,
+        overflow: str = "drop_oldest",
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            logger.warning(f"TELEMETRY_OVERFLOW inválido ({overflow!r}) -- usando 'drop_oldest'")
+            overflow = "drop_oldest"
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = max(1, flush_ms) / 1000
+        self.overflow = overflow
+
+        self._queue: Deque[Tuple[Any, Dict[str, Any]]] = deque()
+        self._cond = Condition()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._stats = {"written": 0, "dropped": 0, "failed": 0}
+        self._hooks: Dict[Any, List[Callable[[Any, List[Dict[str, Any]]], None]]] = {}
+
+    def add_hook(self, model: Any, hook: Callable[[Any, List[Dict[str, Any]]], None]) -> None:
+        """
+        Registra `hook(db, rows)`, chamado a cada lote de `model` gravado, na
+        MESMA transação do INSERT (se o hook falhar, o lote inteiro falha).
+        """
+        self._hooks.setdefault(model, []).append(hook)
+
+    # ------------------------------------------------------------------
+    # Produtores (caminho da requisição)
+    # ------------------------------------------------------------------
+
+    def submit(self, model: Any, row: Dict[str, Any]) -> None:
+        """Enfileira uma linha para `model` (ex.: ToolCall, LLMCall). Nunca levanta exceção."""
+        if not self.running:
+            self._write([(model, row)])
+            return
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                # Dentro de um event loop, esperar pararia o loop inteiro.
+                if self.overflow == "block" and not _in_event_loop():
+                    deadline = time.monotonic() + BLOCK_TIMEOUT_SECONDS
+                    while len(self._queue) >= self.max_queue:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self.running:
+                            self._stats["dropped"] += 1
+                            return
+                        self._cond.wait(remaining)
+                else:
+                    self._queue.popleft()
+                    self._stats["dropped"] += 1
+            self._queue.append((model, row))
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------------
+
+    def _drain(self, limit: Optional[int] = None) -> List[Tuple[Any, Dict[str, Any]]]:
+        """Retira até `limit` linhas da fila (chamar com o lock)."""
+        count = len(self._queue) if limit is None else min(limit, len(self._queue))
+        batch = [self._queue.popleft() for _ in range(count)]
+        if batch:
+            self._cond.notify_all()  # libera produtores em modo "block"
+        return batch
+
+    def _insert(self, by_model: Dict[Any, List[Dict[str, Any]]]) -> None:
+        """Grava as linhas numa única transação: um INSERT em lote por tabela, mais os hooks."""
+        db = SessionLocal()
+        try:
+            for model, rows in by_model.items():
+                db.execute(insert(model), rows)
+                for hook in self._hooks.get(model, []):
+                    hook(db, rows)
+            db.commit()
+        finally:
+            db.close()
+
+    def _write(self, batch: List[Tuple[Any, Dict[str, Any]]]) -> None:
+        """Grava um lote; se a transação do lote falhar, tenta cada linha sozinha."""
+        if not batch:
+            return
+        by_model: Dict[Any, List[Dict[str, Any]]] = {}
+        for model, row in batch:
+            by_model.setdefault(model, []).append(row)
+
+        try:
+            self._insert(by_model)
+            with self._cond:
+                self._stats["written"] += len(batch)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                with self._cond:
+                    self._stats["failed"] += 1
+                logger.exception("Falha ao gravar 1 linha de telemetria (a resposta ao usuário não é afetada)")
+                return
+            logger.warning(f"Falha ao gravar lote de {len(batch)} linha(s) de telemetria ({e}); gravando uma a uma")
+
+        written = failed = 0
+        for model, row in batch:
+            try:
+                self._insert({model: [row]})
+                written += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"Linha de telemetria descartada ({model.__tablename__}): {e}")
+        with self._cond:
+            self._stats["written"] += written
+            self._stats["failed"] += failed
+
+    def flush(self) -> None:
+        """Grava agora tudo o que está na fila."""
+        with self._cond:
+            batch = self._drain()
+        self._write(batch)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_seconds
+                while len(self._queue) < self.batch_size and not self._stop.is_set():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._drain(self.batch_size)
+                stopping = self._stop.is_set()
+            self._write(batch)
+            if stopping:
+                return
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self) -> None:
+        """Inicia a thread de gravação (idempotente)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._loop, name="telemetry-writer", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Telemetria: gravação em lote iniciada (lote={self.batch_size}, "
+            f"intervalo={int(self.flush_seconds * 1000)}ms, fila={self.max_queue}, {self.overflow})"
+        )
+
+    def stop(self, timeout: float = 10) -> None:
+        """Para a thread e grava o que sobrou na fila (chamado no shutdown)."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"queued": len(self._queue), **self._stats}
+
+
+# Instância única compartilhada pela aplicação inteira.
+telemetry_writer = TelemetryWriter(**Settings.telemetry)
@@ -1,8 +1,9 @@
 """
 Ingestão de arquivos de texto/markdown (READMEs, ADRs, docs de onboarding)
-no Chroma -- irmã de app/utils/embedding.py, que só lida com PDF. Chunking
-mais simples aqui: por número de caracteres, já que não há conceito de
-"página" em markdown puro.
+no Chroma -- irmã de app/utils/embedding.py, que só lida com PDF. Sem
+conceito de "página" em markdown puro, os chunks seguem a estrutura do
+documento (títulos, parágrafos, blocos de código) e são limitados por
+tokens -- ver utils/chunking.py.
 
 Usado para popular as coleções consultadas por RAGDaBaseDeCodigo
 (tools/knowledge_rag.py) e OnboardingGuiado.
@@ -11,32 +12,39 @@ Usado para popular as coleções consultadas por RAGDaBaseDeCodigo
 import hashlib
 import logging
 import os
-import uuid
-from typing import List
+from typing import Any, Dict, List, Tuple
 
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 from services.chroma import get_collection
-from services.knowledge_tracking import registrar_documento_indexado
+from services.knowledge_tracking import documento_inalterado, remover_ausentes, sincronizar_documento
+from utils.chunking import chunk_markdown
 from utils.settings import WrappedSettings as Settings
 
 logger = logging.getLogger(__name__)
 
-CHUNK_SIZE_CHARS = 3000
-CHUNK_OVERLAP_CHARS = 300
+# Entra no content_hash junto com o tamanho dos chunks: mudar o chunking (ou
+# CHUNK_MAX_TOKENS) faz os arquivos já indexados serem reprocessados.
+CHUNKER_VERSION = "markdown-v3"
+TEXT_EXTENSIONS = (".md", ".txt")
 
 
-def _split_into_chunks(text: str, chunk_size: int = CHUNK_SIZE_CHARS, overlap: int = CHUNK_OVERLAP_CHARS) -> List[str]:
-    if len(text) <= chunk_size:
-        return [text] if text.strip() else []
+def normalize_newlines(content: str) -> str:
+    """\r\n e \r viram \n -- o mesmo texto dá o mesmo hash e os mesmos chunks, lido em modo texto ou binário."""
+    return content.replace("\r\n", "\n").replace("\r", "\n")
 
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start = end - overlap
-    return [c for c in chunks if c.strip()]
+
+def text_content_hash(content: str) -> str:
+    key = f"{CHUNKER_VERSION}:{Settings.chunk_max_tokens}\0{normalize_newlines(content)}"
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def chunk_document(filename: str, content: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Chunks de um arquivo de texto e os metadados de cada um (arquivo, posição, seção)."""
+    chunks = chunk_markdown(normalize_newlines(content), max_tokens=Settings.chunk_max_tokens)
+    docs = [chunk["text"] for chunk in chunks]
+    metadatas = [{"doc": filename, "chunk": i, "secao": chunk["secao"]} for i, chunk in enumerate(chunks)]
+    return docs, metadatas
 
 
 def create_text_embedding(collection: str, directory: str) -> int:
@@ -46,7 +54,10 @@ def create_text_embedding(collection: str, directory: str) -> int:
 
     Reindexação: se o arquivo já foi indexado antes com o mesmo conteúdo
     (mesmo content_hash em knowledge_documents), pula -- evita reprocessar
-    (e pagar por embeddings de novo) sem necessidade a cada execução.
+    (e pagar por embeddings de novo) sem necessidade a cada execução. Se
+    mudou, só os chunks alterados são regravados e os que saíram são
+    apagados (ver services/knowledge_tracking.py). Arquivos .md/.txt que
+    estavam indexados e saíram da pasta são apagados da coleção.
     """
     if not os.path.isdir(directory):
         logger.warning(f"Diretório '{directory}' não existe -- nada para indexar.")
@@ -55,45 +66,27 @@ def create_text_embedding(collection: str, directory: str) -> int:
     collection_obj = get_collection(collection)
     embedding_func = GoogleGenerativeAIEmbeddings(model=Settings.gemini["embedding"])
 
-    from db.base import SessionLocal
-    from db.models import KnowledgeDocument
+    filenames = [f for f in os.listdir(directory) if f.lower().endswith(TEXT_EXTENSIONS)]
+    remover_ausentes(collection_obj, collection, filenames, TEXT_EXTENSIONS)
 
     processados = 0
-    for filename in os.listdir(directory):
-        if not filename.lower().endswith((".md", ".txt")):
-            continue
+    for filename in filenames:
 
         full_path = os.path.join(directory, filename)
         with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
             content = f.read()
-        content_hash = hashlib.md5(content.encode("utf-8")).hexdigest()
-
-        db = SessionLocal()
-        try:
-            existing = (
-                db.query(KnowledgeDocument)
-                .filter(KnowledgeDocument.collection == collection, KnowledgeDocument.filename == filename)
-                .first()
-            )
-            if existing is not None and existing.content_hash == content_hash:
-                logger.info(f"'{filename}' sem mudanças desde a última indexação — pulando.")
-                continue
-        finally:
-            db.close()
-
-        chunks = _split_into_chunks(content)
-        if not chunks:
-            continue
+        content_hash = text_content_hash(content)
 
-        ids, embeddings, metadatas, docs = [], [], [], []
-        for i, chunk in enumerate(chunks):
-            ids.append(str(uuid.uuid4()))
-            embeddings.append(embedding_func.embed_query(chunk))
-            metadatas.append({"doc": filename, "chunk": i})
-            docs.append(chunk)
+        if documento_inalterado(collection, filename, content_hash):
+            logger.info(f"'{filename}' sem mudanças desde a última indexação — pulando.")
+            continue
 
-        collection_obj.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=docs)
-        registrar_documento_indexado(collection, filename, len(chunks), content_hash)
+        # Sem chunks (arquivo esvaziado), a sincronização só apaga os antigos.
+        chunks, metadatas = chunk_document(filename, content)
+        sincronizar_documento(
+            collection_obj, collection, filename, chunks, metadatas, content_hash,
+            embedding_func=embedding_func,
+        )
         processados += 1
         logger.info(f"Indexado: {filename} ({len(chunks)} chunk(s)) em '{collection}'.")
 
@@ -4,6 +4,8 @@ chamam Claude diretamente (independente de qual modelo esteja orquestrando a
 conversa -- o mesmo precedente que o antigo CodeHelper já estabelecia),
 registram o uso em `llm_calls` (services/llm_usage.py) e retornam a resposta
 já pronta (`return_direct = True` -- ver TOOLS_RETURN_DIRECT em agent/agent.py).
+Prompt, chamada (sync e async), registro e tratamento de erro vêm de
+LLMSkillBase (tools/llm_skill.py), como nas demais skills.
 
 Claude foi escolhido para essa família por ser tipicamente mais cuidadoso em
 tarefas de geração/análise de código e seguir instruções detalhadas de forma
@@ -13,14 +15,11 @@ mudança de uma linha.
 """
 
 import logging
-import time
-from typing import ClassVar, Optional, Type
+from typing import Any, ClassVar, Optional, Type
 
 from langchain_core.prompts import PromptTemplate
-from langchain_core.tools import BaseTool
 from pydantic import BaseModel
 
-from agent.llm_factory import LLMFactory
 from models.tools import (
     DiagnosticoDeErroInput,
     GeradorDeDocumentacaoInput,
@@ -28,37 +27,24 @@ from models.tools import (
     RevisorDeCodigoInput,
     RevisorDeSegurancaInput,
 )
-from services.llm_usage import log_llm_call
+from tools.llm_skill import LLMSkillBase
 
 logger = logging.getLogger(__name__)
 
 MODEL_FAMILY = "claude"
 
 
-def _run_prompt(skill_name: str, template: str, **kwargs) -> str:
-    """
-    Helper compartilhado pelas 5 skills desta família: monta o prompt, chama
-    o LLM especialista (sem o ping de teste extra -- ver create_llm_fast) e
-    registra o uso em llm_calls antes de devolver o texto da resposta.
-    """
-    start = time.time()
-    try:
-        llm = LLMFactory.create_llm_fast(MODEL_FAMILY)
-        prompt = PromptTemplate.from_template(template).format(**kwargs)
-        response = llm.invoke(prompt)
-        log_llm_call(model_family=MODEL_FAMILY, skill_name=skill_name, llm_response=response)
-        return response.content
-    except (ValueError, RuntimeError) as e:
-        logger.error(f"{skill_name}: erro ao usar LLM especialista ({MODEL_FAMILY}): {e}")
-        return f"Não consegui usar o modelo especialista ({MODEL_FAMILY}) agora: {e}"
-    except Exception as e:
-        logger.exception(f"{skill_name}: erro inesperado")
-        return f"Erro inesperado ao executar {skill_name}: {e}"
-    finally:
-        logger.info(f"{skill_name} — tempo de execução: {time.time() - start:.2f}s")
-
-
-class RevisorDeCodigo(BaseTool):
+class _CodeSkill(LLMSkillBase):
+    """Base das 5 skills desta família: Claude como especialista (ver tools/llm_skill.py)."""
+
+    MODEL_FAMILY: ClassVar[str] = MODEL_FAMILY
+
+    def _on_llm_error(self, error: Exception, **kwargs) -> str:
+        logger.error(f"{self.name}: erro ao usar LLM especialista ({self.MODEL_FAMILY}): {error}")
+        return f"Não consegui usar o modelo especialista ({self.MODEL_FAMILY}) agora: {error}"
+
+
+class RevisorDeCodigo(_CodeSkill):
     name: str = "RevisorDeCodigo"
     description: str = """
     Use para revisar um trecho de código, função ou PR colado pelo usuário.
@@ -88,10 +74,13 @@ Código para revisão:
 """
 
     def _run(self, codigo: str, contexto: Optional[str] = None) -> str:
-        return _run_prompt(self.name, self.TEMPLATE, codigo=codigo, contexto=contexto or "(nenhum fornecido)")
+        return self._generate(codigo=codigo, contexto=contexto or "(nenhum fornecido)")
+
+    async def _arun(self, codigo: str, contexto: Optional[str] = None) -> str:
+        return await self._agenerate(codigo=codigo, contexto=contexto or "(nenhum fornecido)")
 
 
-class GeradorDeTestes(BaseTool):
+class GeradorDeTestes(_CodeSkill):
     name: str = "GeradorDeTestes"
     description: str = """
     Use para gerar testes unitários a partir de uma função ou trecho de código
@@ -116,10 +105,13 @@ Código:
 """
 
     def _run(self, codigo: str, framework: Optional[str] = None) -> str:
-        return _run_prompt(self.name, self.TEMPLATE, codigo=codigo, framework=framework or "(não especificado, infira)")
+        return self._generate(codigo=codigo, framework=framework or "(não especificado, infira)")
 
+    async def _arun(self, codigo: str, framework: Optional[str] = None) -> str:
+        return await self._agenerate(codigo=codigo, framework=framework or "(não especificado, infira)")
 
-class DiagnosticoDeErro(BaseTool):
+
+class DiagnosticoDeErro(_CodeSkill):
     name: str = "DiagnosticoDeErro"
     description: str = """
     Use quando o usuário colar um stack trace, mensagem de erro ou trecho de
@@ -146,10 +138,13 @@ Erro/log:
 """
 
     def _run(self, erro: str, contexto: Optional[str] = None) -> str:
-        return _run_prompt(self.name, self.TEMPLATE, erro=erro, contexto=contexto or "(nenhum fornecido)")
+        return self._generate(erro=erro, contexto=contexto or "(nenhum fornecido)")
+
+    async def _arun(self, erro: str, contexto: Optional[str] = None) -> str:
+        return await self._agenerate(erro=erro, contexto=contexto or "(nenhum fornecido)")
 
 
-class GeradorDeDocumentacao(BaseTool):
+class GeradorDeDocumentacao(_CodeSkill):
     name: str = "GeradorDeDocumentacao"
     description: str = """
     Use para gerar documentação (docstrings inline ou um README.md completo)
@@ -180,12 +175,18 @@ Código:
 ```
 """
 
-    def _run(self, codigo: str, formato: str = "docstring") -> str:
+    def _prompt(self, formato: str = "docstring", **kwargs: Any) -> str:
         template = self.TEMPLATE_README if formato == "readme" else self.TEMPLATE_DOCSTRING
-        return _run_prompt(self.name, template, codigo=codigo)
+        return PromptTemplate.from_template(template).format(**kwargs)
 
+    def _run(self, codigo: str, formato: str = "docstring") -> str:
+        return self._generate(codigo=codigo, formato=formato)
 
-class RevisorDeSeguranca(BaseTool):
+    async def _arun(self, codigo: str, formato: str = "docstring") -> str:
+        return await self._agenerate(codigo=codigo, formato=formato)
+
+
+class RevisorDeSeguranca(_CodeSkill):
     name: str = "RevisorDeSeguranca"
     description: str = """
     Use para analisar um código em busca de vulnerabilidades de segurança
@@ -215,4 +216,7 @@ Código:
 """
 
     def _run(self, codigo: str) -> str:
-        return _run_prompt(self.name, self.TEMPLATE, codigo=codigo)
\ No newline at end of file
+        return self._generate(codigo=codigo)
+
+    async def _arun(self, codigo: str) -> str:
+        return await self._agenerate(codigo=codigo)
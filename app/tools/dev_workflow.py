@@ -4,30 +4,34 @@ dependências e resumo de standup individual a partir de commits reais do
 GitHub. Cada uma usa o modelo mais adequado à sua tarefa (ver MODEL_FAMILY em
 cada classe) -- tarefas rápidas e de baixo risco usam Gemini Flash; nenhuma
 delas precisa do raciocínio mais caro do Claude.
+
+Todas têm `_arun` nativo (usado quando o grafo roda via `ainvoke`): o LLM é
+aguardado com `llm.ainvoke`, o GitHub é consultado via httpx assíncrono e o
+pip-audit (subprocess) roda numa thread, sem bloquear o event loop. Prompt,
+registro de uso e erros do LLM são da base comum (tools/llm_skill.py): os
+dois caminhos só diferem na chamada de I/O.
 """
 
+import asyncio
 import logging
 import time
-from typing import ClassVar, List, Optional, Type
+from typing import Any, ClassVar, Dict, List, Optional, Tuple, Type
 
-from langchain_core.prompts import PromptTemplate
-from langchain_core.tools import BaseTool
 from pydantic import BaseModel
 
-from agent.llm_factory import LLMFactory
 from models.tools import (
     AuditoriaDeDependenciasInput,
     GeradorDeCommitMessageInput,
     GeradorDeStandupInput,
 )
 from services.dependency_audit import DependencyAuditError, run_pip_audit, summarize_findings
-from services.github_service import GitHubError, fetch_recent_commits
-from services.llm_usage import log_llm_call
+from services.github_service import GitHubError, afetch_recent_commits, fetch_recent_commits
+from tools.llm_skill import LLMSkillBase
 
 logger = logging.getLogger(__name__)
 
 
-class GeradorDeCommitMessage(BaseTool):
+class GeradorDeCommitMessage(LLMSkillBase):
     name: str = "GeradorDeCommitMessage"
     description: str = """
     Use para gerar uma mensagem de commit a partir de um 'git diff' (ou
@@ -47,22 +51,18 @@ Diff:
 ```
 """
 
+    def _on_llm_error(self, error: Exception, **kwargs) -> str:
+        logger.error(f"{self.name}: erro ao usar LLM ({self.MODEL_FAMILY}): {error}")
+        return f"Não consegui gerar a mensagem de commit agora: {error}"
+
     def _run(self, diff: str) -> str:
-        start = time.time()
-        try:
-            llm = LLMFactory.create_llm_fast(self.MODEL_FAMILY)
-            prompt = PromptTemplate.from_template(self.TEMPLATE).format(diff=diff)
-            response = llm.invoke(prompt)
-            log_llm_call(model_family=self.MODEL_FAMILY, skill_name=self.name, llm_response=response)
-            return response.content
-        except (ValueError, RuntimeError) as e:
-            logger.error(f"{self.name}: erro ao usar LLM ({self.MODEL_FAMILY}): {e}")
-            return f"Não consegui gerar a mensagem de commit agora: {e}"
-        finally:
-            logger.info(f"{self.name} — tempo de execução: {time.time() - start:.2f}s")
+        return self._generate(diff=diff)
 
+    async def _arun(self, diff: str) -> str:
+        return await self._agenerate(diff=diff)
 
-class AuditoriaDeDependencias(BaseTool):
+
+class AuditoriaDeDependencias(LLMSkillBase):
     name: str = "AuditoriaDeDependencias"
     description: str = """
     Use para auditar um requirements.txt (conteúdo colado pelo usuário) em
@@ -80,37 +80,49 @@ Achados brutos do pip-audit:
 {achados}
 """
 
+    def _on_llm_error(self, error: Exception, achados: str = "", **kwargs) -> str:
+        logger.warning(f"{self.name}: LLM de resumo falhou, devolvendo achados brutos: {error}")
+        return f"(Resumo automático indisponível, achados brutos do pip-audit abaixo)\n\n{achados}"
+
+    def _audit_failed(self, error: DependencyAuditError) -> str:
+        logger.error(f"{self.name}: {error}")
+        return f"Não consegui rodar a auditoria: {error}"
+
+    @staticmethod
+    def _achados(audit_json: dict) -> Tuple[str, bool]:
+        """Achados formatados e se vale resumi-los com o LLM."""
+        # Se não há nenhuma vulnerabilidade, a mensagem já é clara e objetiva
+        # o suficiente — não vale gastar uma chamada de LLM só pra reformular
+        # "nenhuma vulnerabilidade encontrada".
+        deps_com_vuln = [d for d in audit_json.get("dependencies", []) if d.get("vulns")]
+        return summarize_findings(audit_json), bool(deps_com_vuln)
+
     def _run(self, requirements_txt: str) -> str:
         start = time.time()
         try:
             audit_json = run_pip_audit(requirements_txt)
         except DependencyAuditError as e:
-            logger.error(f"{self.name}: {e}")
-            return f"Não consegui rodar a auditoria: {e}"
+            return self._audit_failed(e)
         finally:
             logger.info(f"{self.name} (pip-audit) — tempo de execução: {time.time() - start:.2f}s")
 
-        achados = summarize_findings(audit_json)
-
-        # Se não há nenhuma vulnerabilidade, a mensagem já é clara e objetiva
-        # o suficiente — não vale gastar uma chamada de LLM só pra reformular
-        # "nenhuma vulnerabilidade encontrada".
-        deps_com_vuln = [d for d in audit_json.get("dependencies", []) if d.get("vulns")]
-        if not deps_com_vuln:
-            return achados
+        achados, resumir = self._achados(audit_json)
+        return self._generate(achados=achados) if resumir else achados
 
+    async def _arun(self, requirements_txt: str) -> str:
+        start = time.time()
         try:
-            llm = LLMFactory.create_llm_fast(self.MODEL_FAMILY)
-            prompt = PromptTemplate.from_template(self.TEMPLATE).format(achados=achados)
-            response = llm.invoke(prompt)
-            log_llm_call(model_family=self.MODEL_FAMILY, skill_name=self.name, llm_response=response)
-            return response.content
-        except (ValueError, RuntimeError) as e:
-            logger.warning(f"{self.name}: LLM de resumo falhou, devolvendo achados brutos: {e}")
-            return f"(Resumo automático indisponível, achados brutos do pip-audit abaixo)\n\n{achados}"
+            audit_json = await asyncio.to_thread(run_pip_audit, requirements_txt)
+        except DependencyAuditError as e:
+            return self._audit_failed(e)
+        finally:
+            logger.info(f"{self.name} (pip-audit) — tempo de execução: {time.time() - start:.2f}s")
 
+        achados, resumir = self._achados(audit_json)
+        return await self._agenerate(achados=achados) if resumir else achados
 
-class GeradorDeStandup(BaseTool):
+
+class GeradorDeStandup(LLMSkillBase):
     name: str = "GeradorDeStandup"
     description: str = """
     Use quando o usuário pedir um resumo de standup/daily individual (o que
@@ -134,31 +146,44 @@ Commits (repositório | mensagem):
 {commits_formatados}
 """
 
+    def _on_llm_error(self, error: Exception, commits_formatados: str = "", **kwargs) -> str:
+        logger.warning(f"{self.name}: LLM de resumo falhou, devolvendo lista bruta: {error}")
+        return f"(Resumo automático indisponível, commits brutos abaixo)\n\n{commits_formatados}"
+
+    def _github_failed(self, error: GitHubError) -> str:
+        logger.error(f"{self.name}: {error}")
+        return f"Não consegui buscar os commits: {error}"
+
+    @staticmethod
+    def _prompt_args(github_username: str, desde_horas: int, commits: List[dict]) -> Dict[str, Any]:
+        return {
+            "username": github_username,
+            "desde_horas": desde_horas,
+            "commits_formatados": "\n".join(f"- {c['repo']} | {c['message'].splitlines()[0]}" for c in commits),
+        }
+
     def _run(self, github_username: str, desde_horas: int = 24, repos: Optional[List[str]] = None) -> str:
         start = time.time()
         try:
             commits = fetch_recent_commits(github_username, since_hours=desde_horas, repos=repos)
         except GitHubError as e:
-            logger.error(f"{self.name}: {e}")
-            return f"Não consegui buscar os commits: {e}"
+            return self._github_failed(e)
         finally:
             logger.info(f"{self.name} (GitHub) — tempo de execução: {time.time() - start:.2f}s")
 
         if not commits:
             return f"Não encontrei commits de '{github_username}' nas últimas {desde_horas}h."
+        return self._generate(**self._prompt_args(github_username, desde_horas, commits))
 
-        commits_formatados = "\n".join(f"- {c['repo']} | {c['message'].splitlines()[0]}" for c in commits)
-
+    async def _arun(self, github_username: str, desde_horas: int = 24, repos: Optional[List[str]] = None) -> str:
+        start = time.time()
         try:
-            llm = LLMFactory.create_llm_fast(self.MODEL_FAMILY)
-            prompt = PromptTemplate.from_template(self.TEMPLATE).format(
-                username=github_username,
-                desde_horas=desde_horas,
-                commits_formatados=commits_formatados,
-            )
-            response = llm.invoke(prompt)
-            log_llm_call(model_family=self.MODEL_FAMILY, skill_name=self.name, llm_response=response)
-            return response.content
-        except (ValueError, RuntimeError) as e:
-            logger.warning(f"{self.name}: LLM de resumo falhou, devolvendo lista bruta: {e}")
-            return f"(Resumo automático indisponível, commits brutos abaixo)\n\n{commits_formatados}"
\ No newline at end of file
+            commits = await afetch_recent_commits(github_username, since_hours=desde_horas, repos=repos)
+        except GitHubError as e:
+            return self._github_failed(e)
+        finally:
+            logger.info(f"{self.name} (GitHub) — tempo de execução: {time.time() - start:.2f}s")
+
+        if not commits:
+            return f"Não encontrei commits de '{github_username}' nas últimas {desde_horas}h."
+        return await self._agenerate(**self._prompt_args(github_username, desde_horas, commits))
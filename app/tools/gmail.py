@@ -1,16 +1,17 @@
 import logging
 import base64
-from typing import Any, Type
+from typing import Type
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from bs4 import BeautifulSoup
-from pydantic import BaseModel, PrivateAttr
+from pydantic import BaseModel
 from langchain_core.tools import BaseTool
 
 from models.tools import (
     CheckEmailInput,
     SendEmailInput
 )
+from services.request_context import get_user_credentials
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +20,6 @@ class CheckEmail(BaseTool):
     description: str = "Consultar emails."
     args_schema: Type[BaseModel] = CheckEmailInput
     return_direct: bool = False
-    _user_credentials: Any = PrivateAttr(default=None)
-
-    def set_credentials(self, creds):
-        self._user_credentials = creds
 
     def _run(
         self,
@@ -33,11 +30,12 @@ class CheckEmail(BaseTool):
     ):
         logger.info("Tool CheckEmail iniciada.")
 
-        if not self._user_credentials:
+        credentials = get_user_credentials()
+        if not credentials:
             return "Usuário não logado."
 
         from services.google_services import get_service
-        service = get_service(self._user_credentials, "gmail")
+        service = get_service(credentials, "gmail")
         if not service:
             return "Erro técnico ao autenticar no Gmail."
 
@@ -110,19 +108,16 @@ class SendEmail(BaseTool):
     description: str = "Enviar email."
     args_schema: Type[BaseModel] = SendEmailInput
     return_direct: bool = False
-    _user_credentials: Any = PrivateAttr(default=None)
-
-    def set_credentials(self, creds):
-        self._user_credentials = creds
 
     def _run(self, to: str, subject: str, body: str, body_type: str = "plain"):
         logger.info("Tool SendEmail iniciada.")
 
-        if not self._user_credentials:
+        credentials = get_user_credentials()
+        if not credentials:
             return "Usuário não logado."
 
         from services.google_services import get_service
-        service = get_service(self._user_credentials, "gmail")
+        service = get_service(credentials, "gmail")
         if not service:
             return "Erro técnico ao autenticar no Gmail."
 
@@ -2,8 +2,8 @@ import datetime
 import uuid
 import logging
 from zoneinfo import ZoneInfo
-from typing import Any, List, Type
-from pydantic import BaseModel, PrivateAttr
+from typing import List, Type
+from pydantic import BaseModel
 from langchain_core.tools import BaseTool
 
 from models.tools import (
@@ -12,8 +12,8 @@ from models.tools import (
 )
 
 import time
-from typing import Any, Type
 from models.tools import BuscarNoDriveInput
+from services.request_context import get_user_credentials
 
 logger = logging.getLogger(__name__)
 
@@ -29,10 +29,6 @@ class CreateEvent(BaseTool):
     description: str = "Criar novos eventos no Google Calendar."
     args_schema: Type[BaseModel] = CreateEventInput
     return_direct: bool = False
-    _user_credentials: Any = PrivateAttr(default=None)
-
-    def set_credentials(self, creds):
-        self._user_credentials = creds
 
     def _run(
         self,
@@ -44,11 +40,12 @@ class CreateEvent(BaseTool):
     ):
         logger.info(f"Tool CreateEvent iniciada. Params: {meeting_date}")
 
-        if not self._user_credentials:
+        credentials = get_user_credentials()
+        if not credentials:
             return MSG_LOGIN
 
         from services.google_services import get_service
-        service = get_service(self._user_credentials, "calendar")
+        service = get_service(credentials, "calendar")
         if not service:
             return "Erro técnico ao autenticar no Google Calendar."
 
@@ -105,19 +102,16 @@ class CheckCalendar(BaseTool):
     description: str = "Listar compromissos no Google Calendar."
     args_schema: Type[BaseModel] = CheckCalendarInput
     return_direct: bool = False
-    _user_credentials: Any = PrivateAttr(default=None)
-
-    def set_credentials(self, creds):
-        self._user_credentials = creds
 
     def _run(self, email: str, start_date: dict, end_date: dict):
         logger.info(f"Tool CheckCalendar iniciada. Email={email}")
 
-        if not self._user_credentials:
+        credentials = get_user_credentials()
+        if not credentials:
             return MSG_LOGIN
 
         from services.google_services import get_service
-        service = get_service(self._user_credentials, "calendar")
+        service = get_service(credentials, "calendar")
         if not service:
             return "Erro técnico ao autenticar no Google Calendar."
 
@@ -177,20 +171,17 @@ class BuscarNoDrive(BaseTool):
     """
     args_schema: Type[BaseModel] = BuscarNoDriveInput
     return_direct: bool = False
-    _user_credentials: Any = PrivateAttr(default=None)
-
-    def set_credentials(self, creds):
-        self._user_credentials = creds
 
     def _run(self, query: str, max_resultados: int = 5) -> str:
         start = time.time()
         logger.info(f"Tool BuscarNoDrive iniciada. query='{query}'")
 
-        if not self._user_credentials:
+        credentials = get_user_credentials()
+        if not credentials:
             return MSG_LOGIN
 
         from services.google_services import get_service
-        service = get_service(self._user_credentials, "drive")
+        service = get_service(credentials, "drive")
         if not service:
             return "Erro técnico ao autenticar no Google Drive."
 
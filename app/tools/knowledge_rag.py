@@ -3,7 +3,7 @@ RAGDaBaseDeCodigo e OnboardingGuiado -- mesmo padrão de RAG que o AjudaShark
 já usa (tools/shark.py), cada uma numa coleção diferente do Chroma. A lógica
 de consulta é idêntica entre as duas, então vive numa classe base comum
 (_RAGToolBase) -- cada subclasse só declara nome, descrição, schema e qual
-coleção consultar.
+coleção consultar. A busca é híbrida (vetorial + BM25, services/retrieval.py).
 
 Para popular as coleções, use services/text_ingestion.py:
     from services.text_ingestion import create_text_embedding
@@ -19,7 +19,7 @@ from langchain_core.tools import BaseTool
 from pydantic import BaseModel
 
 from models.tools import OnboardingInput, RAGCodebaseInput
-from services.chroma import get_collection
+from services.retrieval import hybrid_search
 
 logger = logging.getLogger(__name__)
 
@@ -28,15 +28,12 @@ class _RAGToolBase(BaseTool):
     """Base compartilhada -- subclasses só definem name/description/args_schema/collection_name."""
 
     collection_name: str = ""
-    n_results: int = 5
+    n_results: int = 3
 
     def _run(self, pergunta: str) -> str:
         start = time.time()
         try:
-            collection = get_collection(self.collection_name)
-            data = collection.query(query_texts=[pergunta], n_results=self.n_results)
-            documents = data.get("documents", [])
-            flat_docs = [item for sublist in documents for item in sublist]
+            flat_docs = hybrid_search(self.collection_name, [pergunta], self.n_results)
 
             if not flat_docs:
                 return f"Não encontrei informações sobre isso na base '{self.collection_name}'."
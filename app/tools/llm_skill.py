@@ -0,0 +1,71 @@
+"""
+Base das skills que montam um prompt a partir de um TEMPLATE e pedem a
+resposta a um LLM rápido (tools/code_assist.py, tools/dev_workflow.py,
+tools/translate.py).
+
+Montagem do prompt, registro do uso em `llm_calls`, tratamento de erro e log
+de tempo ficam aqui, uma vez só; `_generate` e `_agenerate` diferem apenas
+em `llm.invoke` x `await llm.ainvoke`. Cada subclasse declara MODEL_FAMILY e
+TEMPLATE e diz o que devolver quando o LLM falha (`_on_llm_error`). Um erro
+inesperado (qualquer outra exceção) vira a mesma resposta de erro em todas
+as skills, com o traceback no log.
+"""
+
+import logging
+import time
+from typing import Any, ClassVar
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import BaseTool
+
+from agent.llm_factory import LLMFactory
+from services.llm_usage import log_llm_call
+
+logger = logging.getLogger(__name__)
+
+
+class LLMSkillBase(BaseTool):
+    """Base compartilhada -- subclasses definem MODEL_FAMILY, TEMPLATE e `_on_llm_error`."""
+
+    MODEL_FAMILY: ClassVar[str] = "gemini"
+    TEMPLATE: ClassVar[str] = ""
+
+    def _prompt(self, **kwargs: Any) -> str:
+        return PromptTemplate.from_template(self.TEMPLATE).format(**kwargs)
+
+    def _reply(self, response: Any) -> str:
+        log_llm_call(model_family=self.MODEL_FAMILY, skill_name=self.name, llm_response=response)
+        return response.content
+
+    def _on_llm_error(self, error: Exception, **kwargs: Any) -> str:
+        """Resposta quando o LLM falha (recebe os mesmos argumentos do prompt)."""
+        logger.error(f"{self.name}: erro ao usar LLM ({self.MODEL_FAMILY}): {error}")
+        return f"Não consegui usar o modelo ({self.MODEL_FAMILY}) agora: {error}"
+
+    def _on_unexpected_error(self, error: Exception) -> str:
+        logger.exception(f"{self.name}: erro inesperado")
+        return f"Erro inesperado ao executar {self.name}: {error}"
+
+    def _generate(self, **kwargs: Any) -> str:
+        start = time.time()
+        try:
+            llm = LLMFactory.create_llm_fast(self.MODEL_FAMILY)
+            return self._reply(llm.invoke(self._prompt(**kwargs)))
+        except (ValueError, RuntimeError) as e:
+            return self._on_llm_error(e, **kwargs)
+        except Exception as e:
+            return self._on_unexpected_error(e)
+        finally:
+            logger.info(f"{self.name} (LLM) — tempo de execução: {time.time() - start:.2f}s")
+
+    async def _agenerate(self, **kwargs: Any) -> str:
+        start = time.time()
+        try:
+            llm = LLMFactory.create_llm_fast(self.MODEL_FAMILY)
+            return self._reply(await llm.ainvoke(self._prompt(**kwargs)))
+        except (ValueError, RuntimeError) as e:
+            return self._on_llm_error(e, **kwargs)
+        except Exception as e:
+            return self._on_unexpected_error(e)
+        finally:
+            logger.info(f"{self.name} (LLM) — tempo de execução: {time.time() - start:.2f}s")
@@ -15,10 +15,10 @@ from tools.translate import TradutorTecnico
 
 # Instâncias para registro no Agente.
 # Observação: create_event, check_calendar, check_email, send_email e
-# buscar_drive são reinstanciadas dentro de AgentFactory.__init__ (agent.py)
-# como ferramentas "de sessão" (recebem credenciais do usuário em tempo de
-# execução) — as instâncias abaixo continuam existindo só por consistência
-# de registro, mas não são as que efetivamente recebem credenciais.
+# buscar_drive dependem das credenciais Google do usuário, mas não guardam
+# nada como estado da instância -- leem as credenciais da requisição atual
+# via services/request_context.py. Por isso as mesmas instâncias abaixo
+# servem a todas as sessões (ver agent/pool.py).
 shark = SharkHelper()
 create_event = CreateEvent()
 check_calendar = CheckCalendar()
@@ -1,22 +1,23 @@
 """
 Skills de monitoramento -- nenhuma das duas chama um LLM. MonitorDeCustosLLM
-é pura agregação SQL sobre o que já é gravado em `llm_calls`
-(services/llm_usage.py); HealthCheckAgregado é uma checagem direta de cada
-dependência externa (banco, Chroma, credenciais de LLM configuradas).
+soma os totais por hora/dia de `llm_calls` (services/llm_rollups.py), em vez
+de agregar a tabela bruta a cada pergunta; HealthCheckAgregado é uma
+checagem direta de cada dependência externa (banco, Chroma) mais o último
+status de conectividade dos LLMs, lido do cache de agent/llm_health.py.
 """
 
 import logging
 import time
 from datetime import datetime, timedelta, timezone
-from typing import Type
+from typing import Any, Dict, Type
 
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel
-from sqlalchemy import func, text
+from sqlalchemy import text
 
-from db.base import SessionLocal
-from db.models import LLMCall
+from db.base import SessionLocal, pool_status
 from models.tools import HealthCheckAgregadoInput, MonitorDeCustosLLMInput
+from services.llm_rollups import usage_since
 
 logger = logging.getLogger(__name__)
 
@@ -35,51 +36,40 @@ class MonitorDeCustosLLM(BaseTool):
         desde = datetime.now(timezone.utc) - timedelta(days=dias)
         db = SessionLocal()
         try:
-            por_modelo = (
-                db.query(
-                    LLMCall.model,
-                    func.count(LLMCall.id).label("chamadas"),
-                    func.sum(LLMCall.tokens_in).label("tokens_in"),
-                    func.sum(LLMCall.tokens_out).label("tokens_out"),
-                    func.sum(LLMCall.estimated_cost_usd).label("custo"),
-                )
-                .filter(LLMCall.created_at >= desde)
-                .group_by(LLMCall.model)
-                .all()
-            )
-            por_skill = (
-                db.query(
-                    LLMCall.skill_name,
-                    func.count(LLMCall.id).label("chamadas"),
-                    func.sum(LLMCall.estimated_cost_usd).label("custo"),
-                )
-                .filter(LLMCall.created_at >= desde)
-                .group_by(LLMCall.skill_name)
-                .order_by(func.sum(LLMCall.estimated_cost_usd).desc())
-                .all()
-            )
+            uso = usage_since(db, desde)
         finally:
             db.close()
             logger.info(f"{self.name} — tempo de execução: {time.time() - start:.2f}s")
 
+        por_modelo: Dict[str, Dict[str, Any]] = {}
+        por_skill: Dict[str, Dict[str, Any]] = {}
+        for row in uso:
+            modelo = por_modelo.setdefault(row["model"], {"chamadas": 0, "tokens_in": 0, "tokens_out": 0, "custo": 0.0})
+            skill = por_skill.setdefault(row["skill_name"], {"chamadas": 0, "custo": 0.0})
+            modelo["chamadas"] += row["calls"]
+            modelo["tokens_in"] += row["tokens_in"]
+            modelo["tokens_out"] += row["tokens_out"]
+            modelo["custo"] += row["estimated_cost_usd"]
+            skill["chamadas"] += row["calls"]
+            skill["custo"] += row["estimated_cost_usd"]
+
         if not por_modelo:
             return f"Nenhuma chamada de LLM registrada nos últimos {dias} dia(s)."
 
         linhas = [f"Uso de LLM nos últimos {dias} dia(s):", "", "Por modelo:"]
         custo_total = 0.0
-        for row in por_modelo:
-            custo = row.custo or 0.0
-            custo_total += custo
+        for model, row in por_modelo.items():
+            custo_total += row["custo"]
             linhas.append(
-                f"- {row.model}: {row.chamadas} chamada(s), "
-                f"{(row.tokens_in or 0):,} tokens de entrada, {(row.tokens_out or 0):,} de saída, "
-                f"~US$ {custo:.4f}"
+                f"- {model}: {row['chamadas']} chamada(s), "
+                f"{row['tokens_in']:,} tokens de entrada, {row['tokens_out']:,} de saída, "
+                f"~US$ {row['custo']:.4f}"
             )
 
         linhas.append("")
         linhas.append("Por skill (top custos):")
-        for row in por_skill:
-            linhas.append(f"- {row.skill_name}: {row.chamadas} chamada(s), ~US$ {(row.custo or 0.0):.4f}")
+        for skill_name, row in sorted(por_skill.items(), key=lambda item: item[1]["custo"], reverse=True):
+            linhas.append(f"- {skill_name}: {row['chamadas']} chamada(s), ~US$ {row['custo']:.4f}")
 
         linhas.append("")
         linhas.append(f"Custo total estimado: ~US$ {custo_total:.4f} (valores aproximados, ver services/llm_usage.py)")
@@ -104,27 +94,46 @@ class HealthCheckAgregado(BaseTool):
             db = SessionLocal()
             db.execute(text("SELECT 1"))
             db.close()
-            checks.append(("Banco de dados", True, ""))
+            pool = pool_status()
+            detalhe = f"pool: {pool['checked_out']} conexão(ões) em uso" if "checked_out" in pool else ""
+            if pool["timeouts"]:
+                detalhe += f", {pool['timeouts']} espera(s) estourada(s)"
+            checks.append(("Banco de dados", True, detalhe))
         except Exception as e:
             checks.append(("Banco de dados", False, str(e)[:150]))
 
         # ChromaDB
         try:
-            from services.chroma import get_client
-            get_client().heartbeat()
+            from services.chroma import heartbeat
+            heartbeat()
             checks.append(("ChromaDB", True, ""))
         except Exception as e:
             checks.append(("ChromaDB", False, str(e)[:150]))
 
-        # Credenciais de LLM configuradas (checagem de configuração, não uma chamada real de teste)
+        # LLMs: último resultado do teste de conectividade feito em background
+        # (agent/llm_health.py) -- nenhuma chamada real de teste aqui. Modelos
+        # ainda não testados caem na checagem só de configuração (API key).
         from agent.llm_factory import LLMFactory
+        from agent.llm_health import llm_health
         for model_name in LLMFactory.get_available_models():
             valid, msg = LLMFactory.validate_model(model_name)
-            checks.append((f"Credencial LLM: {model_name}", valid, "" if valid else "API key não configurada"))
+            health = llm_health.get_status(model_name) if valid else None
+            if health is None:
+                checks.append((f"Credencial LLM: {model_name}", valid, "" if valid else "API key não configurada"))
+                continue
+            verificado = f"verificado às {health['checked_at']:%H:%M:%S} UTC"
+            if health["ok"]:
+                detalhe = f"{health['latency_ms']}ms, {verificado}"
+            else:
+                detalhe = f"{health['error']} ({verificado})"
+            checks.append((f"LLM: {model_name}", health["ok"], detalhe))
 
         linhas = []
         for nome, ok, detalhe in checks:
-            status = "✅ OK" if ok else f"❌ Falhou{f' — {detalhe}' if detalhe else ''}"
+            if ok:
+                status = f"✅ OK{f' — {detalhe}' if detalhe else ''}"
+            else:
+                status = f"❌ Falhou{f' — {detalhe}' if detalhe else ''}"
             linhas.append(f"- {nome}: {status}")
 
         todos_ok = all(ok for _, ok, _ in checks)
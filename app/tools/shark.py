@@ -4,7 +4,7 @@ from typing import List, Type
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel
 from models.tools import SharkHelperInput
-from services.chroma import get_collection
+from services.retrieval import hybrid_search
 from utils.settings import WrappedSettings as Settings
 
 logger = logging.getLogger(__name__)
@@ -30,12 +30,11 @@ class SharkHelper(BaseTool):
             # Adiciona a própria pergunta como tema para aumentar chances de match
             query_texts = temas + [pergunta]
             
-            collection = get_collection("shark_helper")
-            data = collection.query(query_texts=query_texts, n_results=5)
-            documents = data.get("documents", [])
-            
-            # Flatten lista de listas (o Chroma retorna [[doc1, doc2]])
-            flat_docs = [item for sublist in documents for item in sublist]
+            # Busca híbrida (vetorial + BM25): os rankings de todos os temas são
+            # fundidos num só. A base do Shark é de PDFs indexados por página
+            # (o chunker por estrutura não se aplica a ela), então continua o
+            # mesmo volume de antes: até 5 páginas por texto consultado.
+            flat_docs = hybrid_search("shark_helper", query_texts, n_results=5 * len(query_texts))
             
             if not flat_docs:
                 logger.info("RAG Shark: Nenhum documento encontrado.")
@@ -1,19 +1,15 @@
 import logging
-import time
 from typing import ClassVar, Dict, Type
 
-from langchain_core.prompts import PromptTemplate
-from langchain_core.tools import BaseTool
 from pydantic import BaseModel
 
-from agent.llm_factory import LLMFactory
 from models.tools import TradutorTecnicoInput
-from services.llm_usage import log_llm_call
+from tools.llm_skill import LLMSkillBase
 
 logger = logging.getLogger(__name__)
 
 
-class TradutorTecnico(BaseTool):
+class TradutorTecnico(LLMSkillBase):
     name: str = "TradutorTecnico"
     description: str = """
     Use para traduzir texto técnico (documentação, comentários de código,
@@ -32,18 +28,12 @@ Texto:
 {texto}
 """
 
+    def _on_llm_error(self, error: Exception, **kwargs) -> str:
+        logger.error(f"{self.name}: erro ao usar LLM ({self.MODEL_FAMILY}): {error}")
+        return f"Não consegui traduzir agora: {error}"
+
     def _run(self, texto: str, destino: str) -> str:
-        start = time.time()
-        try:
-            llm = LLMFactory.create_llm_fast(self.MODEL_FAMILY)
-            prompt = PromptTemplate.from_template(self.TEMPLATE).format(
-                texto=texto, idioma_destino=self.IDIOMAS.get(destino, destino)
-            )
-            response = llm.invoke(prompt)
-            log_llm_call(model_family=self.MODEL_FAMILY, skill_name=self.name, llm_response=response)
-            return response.content
-        except (ValueError, RuntimeError) as e:
-            logger.error(f"{self.name}: erro ao usar LLM ({self.MODEL_FAMILY}): {e}")
-            return f"Não consegui traduzir agora: {e}"
-        finally:
-            logger.info(f"{self.name} — tempo de execução: {time.time() - start:.2f}s")
\ No newline at end of file
+        return self._generate(texto=texto, idioma_destino=self.IDIOMAS.get(destino, destino))
+
+    async def _arun(self, texto: str, destino: str) -> str:
+        return await self._agenerate(texto=texto, idioma_destino=self.IDIOMAS.get(destino, destino))
@@ -0,0 +1,436 @@
+"""
+utils/cache_backends.py
+Armazenamento por trás do ToolResultCache (utils/tool_cache.py)
+
+Com `uvicorn --workers N` cada processo tem sua própria memória -- um cache
+só em memória acerta, na prática, 1/N das vezes que poderia. Os backends
+abaixo têm a mesma interface e a mesma semântica de TTL, e o
+ToolResultCache escolhe um deles via TOOL_CACHE_BACKEND:
+
+- "memory": dentro do processo (LRU limitado por entradas e bytes). Guarda
+  os objetos como estão, sem serializar. É o padrão.
+- "sqlite": um arquivo SQLite local (TOOL_CACHE_SQLITE_PATH), compartilhado
+  por todos os workers da mesma máquina. Sem servidor extra.
+- "redis": compartilhado entre workers e máquinas (REDIS_HOST/PORT/DB/
+  PASSWORD). O TTL é o próprio EXPIRE do Redis; o limite de memória é o
+  `maxmemory`/`maxmemory-policy` do servidor.
+
+Os backends compartilhados serializam em JSON compacto (comprimido com zlib
+a partir de COMPRESS_MIN_BYTES), então só aceitam valores serializáveis em
+JSON -- o caso dos resultados de ferramenta, que são texto.
+"""
+
+import json
+import logging
+import sqlite3
+import sys
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Custo fixo aproximado de uma entrada em memória além do valor em si (chave
+# sha256 em hex, tupla, nó do OrderedDict).
+_ENTRY_OVERHEAD_BYTES = 200
+
+# Valores serializados a partir deste tamanho são comprimidos com zlib
+# (texto de RAG/revisões comprime bem; abaixo disso não compensa).
+COMPRESS_MIN_BYTES = 1024
+
+
+def _estimate_size(value: Any) -> int:
+    """Tamanho aproximado (bytes) de um valor em memória."""
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def dumps(value: Any) -> bytes:
+    """Serialização compacta usada pelos backends compartilhados."""
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return b"z" + zlib.compress(raw)
+    return b"j" + raw
+
+
+def loads(data: bytes) -> Any:
+    raw = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+    return json.loads(raw)
+
+
+class CacheBackend(ABC):
+    """Interface comum dos backends. `key` já chega como hash (ver ToolResultCache._make_key)."""
+
+    name = "base"
+    # Se get/set fazem I/O (arquivo, rede): quem está num event loop deve
+    # chamá-los numa thread (ver utils.tool_cache.run_cache_io).
+    blocking_io = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Valor ainda válido de `key`, ou None."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        """Guarda `value` por `ttl_seconds`. False se não foi guardado."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove `key` (sem erro se não existir)."""
+
+    @abstractmethod
+    def clear(self) -> int:
+        """Remove todas as entradas deste cache. Devolve quantas eram."""
+
+    def cleanup_expired(self) -> int:
+        """Remove entradas vencidas. Devolve quantas (backends com expiração nativa não fazem nada)."""
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores próprios do backend (ocupação, despejos...)."""
+        return {}
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Detalhe por entrada, quando o backend consegue listar barato (só o de memória)."""
+        return []
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU em memória, limitado por número de entradas e por bytes aproximados."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        if max_entries <= 0 or max_bytes <= 0:
+            raise ValueError("max_entries e max_bytes devem ser > 0")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # {key: (valor, expira_em (monotonic), tamanho, gravado_em (datetime))},
+        # da entrada usada há mais tempo para a mais recente.
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self._counters = {
+            "expired_cleaned": 0,
+            "evicted_max_entries": 0,
+            "evicted_max_bytes": 0,
+            "rejected_too_large": 0,
+        }
+
+    def _remove(self, key: str) -> None:
+        """Remove uma entrada e desconta seu tamanho (chamar com o lock)."""
+        _, _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict_to_fit(self) -> None:
+        """Despeja as entradas menos usadas até caber nos limites (chamar com o lock)."""
+        while len(self._data) > self.max_entries:
+            self._remove(next(iter(self._data)))
+            self._counters["evicted_max_entries"] += 1
+        while self._bytes > self.max_bytes and self._data:
+            self._remove(next(iter(self._data)))
+            self._counters["evicted_max_bytes"] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _, _ = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self._counters["expired_cleaned"] += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        size = _estimate_size(value) + _ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if size > self.max_bytes:
+                self._counters["rejected_too_large"] += 1
+                return False
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, time.monotonic() + ttl_seconds, size, datetime.now())
+            self._bytes += size
+            self._evict_to_fit()
+        return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+            self._bytes = 0
+            return count
+
+    def cleanup_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired_keys = [key for key, (_, expires_at, _, _) in self._data.items() if now >= expires_at]
+            for key in expired_keys:
+                self._remove(key)
+            self._counters["expired_cleaned"] += len(expired_keys)
+        return len(expired_keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                **self._counters,
+            }
+
+    def entries(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "key": key[:16] + "...",  # Truncar chave longa
+                    "age_seconds": int((datetime.now() - stored_at).total_seconds()),
+                    "expires_in_seconds": int(expires_at - now),
+                    "size_bytes": size,
+                    "result_type": type(value).__name__,
+                    "expired": expires_at <= now,
+                }
+                for key, (value, expires_at, size, stored_at) in self._data.items()
+            ]
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache num arquivo SQLite local, compartilhado pelos workers da máquina.
+
+    Usa relógio de parede (time.time) porque o arquivo é lido por vários
+    processos. Acima de max_entries/max_bytes, saem primeiro as entradas
+    gravadas há mais tempo (aproximação de LRU que não transforma cada
+    leitura numa escrita no arquivo).
+
+    Número de entradas e bytes ficam numa linha de `tool_cache_stats`,
+    mantida por triggers na mesma transação de cada insert/update/delete --
+    vale para todos os processos que usam o arquivo, e `set` e `stats` não
+    precisam de um COUNT/SUM sobre a tabela inteira.
+    """
+
+    name = "sqlite"
+    blocking_io = True
+
+    def __init__(self, path: str, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction():
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_tool_cache_stored_at ON tool_cache (stored_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache_stats ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " entries INTEGER NOT NULL,"
+                " bytes INTEGER NOT NULL)"
+            )
+            # Arquivo de uma versão anterior (sem a tabela de stats): conta uma vez só.
+            self._conn.execute(
+                "INSERT OR IGNORE INTO tool_cache_stats (id, entries, bytes)"
+                " SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM tool_cache"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS tool_cache_stats_insert AFTER INSERT ON tool_cache BEGIN"
+                " UPDATE tool_cache_stats SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 1; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS tool_cache_stats_update AFTER UPDATE OF size ON tool_cache BEGIN"
+                " UPDATE tool_cache_stats SET bytes = bytes - OLD.size + NEW.size WHERE id = 1; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS tool_cache_stats_delete AFTER DELETE ON tool_cache BEGIN"
+                " UPDATE tool_cache_stats SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 1; END"
+            )
+        self._counters = {"evicted_max_entries": 0, "evicted_max_bytes": 0, "rejected_too_large": 0}
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT (ROLLBACK se der erro); chamar com o lock, ou no __init__."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _totals(self) -> Tuple[int, int]:
+        return self._conn.execute("SELECT entries, bytes FROM tool_cache_stats WHERE id = 1").fetchone()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM tool_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        data = dumps(value)
+        if len(data) > self.max_bytes:
+            self._counters["rejected_too_large"] += 1
+            return False
+        now = time.time()
+        with self._lock, self._transaction():
+            # Upsert em vez de INSERT OR REPLACE: o REPLACE apaga a linha antiga
+            # sem disparar o trigger de delete, e os totais ficariam errados.
+            self._conn.execute(
+                "INSERT INTO tool_cache (key, value, size, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size,"
+                " stored_at = excluded.stored_at, expires_at = excluded.expires_at",
+                (key, data, len(data), now, now + ttl_seconds),
+            )
+            self._evict_to_fit()
+        return True
+
+    def _evict_to_fit(self) -> None:
+        """Despeja as entradas mais antigas até caber nos limites (chamar dentro da transação)."""
+        count, total = self._totals()
+        if count > self.max_entries:
+            excess = count - self.max_entries
+            self._conn.execute(
+                "DELETE FROM tool_cache WHERE key IN (SELECT key FROM tool_cache ORDER BY stored_at LIMIT ?)",
+                (excess,),
+            )
+            self._counters["evicted_max_entries"] += excess
+            count, total = self._totals()
+        while total > self.max_bytes and count:
+            key, size = self._conn.execute("SELECT key, size FROM tool_cache ORDER BY stored_at LIMIT 1").fetchone()
+            self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+            self._counters["evicted_max_bytes"] += 1
+            total -= size
+            count -= 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+
+    def clear(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM tool_cache").rowcount
+
+    def cleanup_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._totals()
+        return {
+            "size": count,
+            "bytes": total,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            **self._counters,
+        }
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache no Redis, compartilhado entre workers e máquinas. `client` pode ser
+    injetado (ex.: fakeredis.FakeRedis() em testes); sem ele, conecta com os
+    parâmetros recebidos.
+    """
+
+    name = "redis"
+    blocking_io = True
+
+    def __init__(
+        self,
+        client: Any = None,
+        host: Optional[str] = None,
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        prefix: str = "cidinha:tool_cache:",
+    ):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("Backend 'redis' requer o pacote redis (pip install redis)") from e
+            client = redis.Redis(host=host, port=port, db=db, password=password)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        data = self.client.get(self.prefix + key)
+        return loads(data) if data is not None else None
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        # PX (milissegundos): mesma precisão de TTL dos outros backends.
+        self.client.set(self.prefix + key, dumps(value), px=max(1, int(ttl_seconds * 1000)))
+        return True
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> int:
+        # Só as chaves deste cache -- o mesmo Redis pode servir a outras coisas.
+        count = 0
+        for redis_key in self.client.scan_iter(match=self.prefix + "*", count=500):
+            count += self.client.delete(redis_key)
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        return {"prefix": self.prefix}
+
+
+def create_cache_backend(
+    kind: str,
+    max_entries: int,
+    max_bytes: int,
+    sqlite_path: Optional[str] = None,
+    redis_config: Optional[Dict[str, Any]] = None,
+) -> CacheBackend:
+    """
+    Cria o backend `kind` ("memory", "sqlite" ou "redis"). Se o backend
+    compartilhado não puder ser criado (pacote ausente, Redis sem host,
+    arquivo inacessível), cai para o de memória com um aviso -- cache é
+    otimização, não pode impedir a aplicação de subir.
+    """
+    kind = (kind or "memory").lower()
+    try:
+        if kind == "sqlite":
+            return SQLiteCacheBackend(sqlite_path, max_entries=max_entries, max_bytes=max_bytes)
+        if kind == "redis":
+            redis_config = redis_config or {}
+            if not redis_config.get("host"):
+                raise RuntimeError("REDIS_HOST não configurado")
+            return RedisCacheBackend(**redis_config)
+        if kind != "memory":
+            logger.warning(f"Backend de cache desconhecido: '{kind}'. Usando 'memory'.")
+    except Exception as e:
+        logger.warning(f"Não foi possível criar o backend de cache '{kind}' ({e}). Usando 'memory'.")
+    return MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
@@ -0,0 +1,287 @@
+"""
+Chunking de markdown/texto que respeita a estrutura do documento, usado na
+ingestão das bases de RAG (services/text_ingestion.py e
+services/ingestion_pipeline.py).
+
+O corte antigo era em janelas fixas de 3000 caracteres: partia títulos,
+blocos de código e frases no meio, e um mesmo chunk misturava o fim de uma
+seção com o começo de outra. A busca acertava menos, e as ferramentas
+compensavam pedindo mais chunks por consulta. Aqui:
+
+- o texto é lido em blocos numa passada só: títulos (`#`..`######`),
+  parágrafos (separados por linha em branco) e blocos de código cercados
+  (``` ou ~~~), que nunca são partidos por dentro enquanto couberem;
+- os blocos são agrupados em chunks de até `max_tokens` tokens (contados
+  como em utils/tokens.py); um título novo fecha o chunk atual, a não ser
+  que ele ainda seja pequeno demais (< min_tokens) -- aí as seções curtas
+  seguidas vão juntas. Um título sempre fica no mesmo chunk que o primeiro
+  trecho da sua seção;
+- um bloco maior que `max_tokens` é partido por frases (código, por linhas)
+  e, em último caso, por tamanho;
+- cada chunk leva o caminho de títulos em que está (ex.: "Deploy > Render"),
+  gravado como metadado `secao` no Chroma.
+
+Tempo linear no tamanho do texto: cada linha é vista uma vez e cada bloco é
+tokenizado uma vez. Para medir num documento grande sintético:
+
+    cd app && python -m utils.chunking --mb 5
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+DEFAULT_MAX_TOKENS = 500
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_SEPARATOR = "\n\n"
+
+Block = Tuple[str, str, Tuple[str, ...]]  # (tipo, texto, caminho de títulos)
+
+
+def _blocks(text: str) -> List[Block]:
+    """Quebra o texto em títulos, parágrafos e blocos de código, com o caminho de títulos de cada um."""
+    blocks: List[Block] = []
+    path: List[Tuple[int, str]] = []
+    paragraph: List[str] = []
+    fence: Optional[str] = None
+    code: List[str] = []
+
+    def breadcrumb() -> Tuple[str, ...]:
+        return tuple(title for _, title in path)
+
+    def flush_paragraph() -> None:
+        if paragraph:
+            blocks.append(("paragraph", "\n".join(paragraph), breadcrumb()))
+            paragraph.clear()
+
+    for line in text.splitlines():
+        if fence is not None:
+            code.append(line)
+            if line.strip().startswith(fence):
+                blocks.append(("code", "\n".join(code), breadcrumb()))
+                code, fence = [], None
+            continue
+
+        fence_match = _FENCE.match(line)
+        if fence_match:
+            flush_paragraph()
+            fence = fence_match.group(1)
+            code = [line]
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            flush_paragraph()
+            level, title = len(heading.group(1)), heading.group(2)
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, title))
+            blocks.append(("heading", line, breadcrumb()))
+            continue
+
+        if line.strip():
+            paragraph.append(line)
+        else:
+            flush_paragraph()
+
+    flush_paragraph()
+    if code:
+        # Bloco de código sem fechamento: vai como está.
+        blocks.append(("code", "\n".join(code), breadcrumb()))
+    return blocks
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    size = max(1, max_tokens * CHARS_PER_TOKEN)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _split_oversized(kind: str, text: str, max_tokens: int) -> List[Tuple[str, int]]:
+    """Parte um bloco grande demais em pedaços de até `max_tokens` (por frases, ou linhas no código)."""
+    if kind == "code":
+        units, sep = text.split("\n"), "\n"
+    else:
+        units, sep = _SENTENCE_END.split(text), " "
+
+    pieces: List[Tuple[str, int]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if unit_tokens > max_tokens:
+            if current:
+                pieces.append((sep.join(current), current_tokens))
+                current, current_tokens = [], 0
+            pieces.extend((part, estimate_tokens(part)) for part in _hard_split(unit, max_tokens))
+            continue
+        if current and current_tokens + unit_tokens > max_tokens:
+            pieces.append((sep.join(current), current_tokens))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        pieces.append((sep.join(current), current_tokens))
+    return pieces
+
+
+def _common_prefix(paths: Sequence[Tuple[str, ...]]) -> Tuple[str, ...]:
+    prefix = paths[0]
+    for path in paths[1:]:
+        n = 0
+        while n < len(prefix) and n < len(path) and prefix[n] == path[n]:
+            n += 1
+        prefix = prefix[:n]
+    return prefix
+
+
+def chunk_markdown(
+    text: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    min_tokens: Optional[int] = None,
+) -> List[Dict[str, str]]:
+    """
+    Divide `text` em chunks de até `max_tokens` tokens respeitando títulos,
+    parágrafos e blocos de código. Cada chunk é {"text": ..., "secao": "A > B"}.
+    """
+    min_tokens = max_tokens // 4 if min_tokens is None else min_tokens
+    sep_tokens = estimate_tokens(_SEPARATOR)
+    chunks: List[Dict[str, str]] = []
+    parts: List[str] = []
+    paths: List[Tuple[str, ...]] = []
+    tokens = 0
+
+    def flush() -> None:
+        nonlocal parts, paths, tokens
+        if parts:
+            chunks.append({"text": _SEPARATOR.join(parts), "secao": " > ".join(_common_prefix(paths))})
+        parts, paths, tokens = [], [], 0
+
+    def add(piece: str, piece_tokens: int, path: Tuple[str, ...]) -> None:
+        nonlocal tokens
+        if parts and tokens + sep_tokens + piece_tokens > max_tokens:
+            flush()
+        tokens += piece_tokens + (sep_tokens if parts else 0)
+        parts.append(piece)
+        paths.append(path)
+
+    # Títulos esperam o primeiro bloco de conteúdo da seção, para nunca
+    # ficarem sozinhos no fim de um chunk com o conteúdo no chunk seguinte.
+    # Eles entram na conta do tamanho: o bloco é partido com o que sobra
+    # de `max_tokens` depois dos títulos. Uma sequência de títulos sem
+    # conteúdo (um índice, por exemplo) só acumula até `heading_budget`;
+    # passando disso, os títulos acumulados vão sozinhos, e o bloco seguinte
+    # sempre tem pelo menos max(min_tokens, max_tokens // 4) de espaço.
+    heading_budget = max_tokens - max(min_tokens, max_tokens // 4)
+    pending: List[str] = []
+    pending_tokens = 0
+    pending_path: Tuple[str, ...] = ()
+
+    def flush_pending() -> None:
+        nonlocal pending, pending_tokens
+        if pending:
+            add(_SEPARATOR.join(pending), pending_tokens, pending_path)
+        pending, pending_tokens = [], 0
+
+    for kind, block, path in _blocks(text):
+        if kind == "heading":
+            if tokens >= min_tokens:
+                flush()
+            block_tokens = estimate_tokens(block)
+            if pending and pending_tokens + sep_tokens + block_tokens > heading_budget:
+                flush_pending()
+            pending_tokens += block_tokens + (sep_tokens if pending else 0)
+            pending.append(block)
+            pending_path = path
+            continue
+        if pending_tokens > heading_budget:
+            # Um título sozinho maior que o orçamento: vai num chunk próprio.
+            flush_pending()
+        headings = _SEPARATOR.join(pending)
+        heading_tokens = pending_tokens + sep_tokens if pending else 0
+        budget = max_tokens - heading_tokens
+        block_tokens = estimate_tokens(block)
+        pieces = [(block, block_tokens)] if block_tokens <= budget else _split_oversized(kind, block, budget)
+        for piece, piece_tokens in pieces:
+            if pending:
+                piece = headings + _SEPARATOR + piece
+                piece_tokens += heading_tokens
+                pending, pending_tokens = [], 0
+            add(piece, piece_tokens, path)
+
+    flush_pending()
+    flush()
+    return chunks
+
+
+def _split_fixed(text: str, chunk_size: int = 3000, overlap: int = 300) -> List[str]:
+    """O corte antigo, por janelas fixas de caracteres -- só para comparação no benchmark."""
+    if len(text) <= chunk_size:
+        return [text] if text.strip() else []
+    chunks, start = [], 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return [c for c in chunks if c.strip()]
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark do chunker de markdown num documento sintético.")
+    parser.add_argument("--mb", type=float, default=5.0, help="Tamanho aproximado do documento (MB).")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS)
+    args = parser.parse_args()
+
+    random.seed(0)
+    words = "deploy serviço bloco blip fila erro timeout cliente token webhook configuração ambiente".split()
+
+    def paragraph() -> str:
+        return " ".join(
+            " ".join(random.choices(words, k=random.randint(8, 25))).capitalize() + "."
+            for _ in range(random.randint(1, 8))
+        )
+
+    sections, size, n = [], 0, 0
+    while size < args.mb * 1024 * 1024:
+        n += 1
+        body = [f"{'#' * random.randint(1, 3)} Seção {n}"]
+        for _ in range(random.randint(1, 6)):
+            body.append(paragraph())
+            if random.random() < 0.2:
+                body.append("```python\n" + "\n".join(f"x_{i} = {i}" for i in range(random.randint(3, 40))) + "\n```")
+        section = "\n\n".join(body)
+        sections.append(section)
+        size += len(section)
+    document = "\n\n".join(sections)
+
+    start = time.perf_counter()
+    chunks = chunk_markdown(document, max_tokens=args.max_tokens)
+    elapsed = time.perf_counter() - start
+    sizes = [estimate_tokens(c["text"]) for c in chunks]
+    print(f"Documento: {len(document) / 1024 / 1024:.1f} MB, {n} seções")
+    print(f"chunk_markdown: {len(chunks)} chunks em {elapsed:.2f}s "
+          f"({len(document) / 1024 / 1024 / elapsed:.1f} MB/s), "
+          f"tokens por chunk: médio {sum(sizes) / len(sizes):.0f}, máx. {max(sizes)}")
+
+    # Regressão: uma sequência longa de títulos sem conteúdo (um índice)
+    # seguida de um parágrafo não pode estourar max_tokens nem picotar o parágrafo.
+    indice = "\n\n".join(f"## Item {i} do índice da documentação" for i in range(150))
+    frases = [f"Frase {i} de um parágrafo comum sobre deploy de bots." for i in range(40)]
+    indice_chunks = chunk_markdown(indice + "\n\n" + " ".join(frases), max_tokens=args.max_tokens)
+    indice_sizes = [estimate_tokens(c["text"]) for c in indice_chunks]
+    inteiras = all(any(frase in c["text"] for c in indice_chunks) for frase in frases)
+    print(f"✅ Títulos em sequência: {max(indice_sizes) <= args.max_tokens and inteiras} "
+          f"({len(indice_chunks)} chunks, máx. {max(indice_sizes)} tokens)")
+
+    start = time.perf_counter()
+    fixed = _split_fixed(document)
+    elapsed = time.perf_counter() - start
+    fixed_sizes = [estimate_tokens(c) for c in fixed]
+    print(f"janelas de 3000 caracteres: {len(fixed)} chunks em {elapsed:.2f}s, "
+          f"tokens por chunk: médio {sum(fixed_sizes) / len(fixed_sizes):.0f}")
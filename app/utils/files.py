@@ -2,6 +2,8 @@ import json
 import logging
 from pathlib import Path
 
+from utils.tool_cache import CacheDecorator
+
 logger = logging.getLogger(__name__)
 
 # Caminho absoluto da pasta "app/assets", calculado a partir deste arquivo
@@ -24,28 +26,55 @@ def get_employees_from_json() -> list:
         return []
 
 
-def get_emails(agent: bool = False):
+@CacheDecorator(ttl_minutes=5, stale_minutes=30)
+def _load_employees() -> list:
     """
-    Lista de funcionários da SharkDev, agora lida da tabela `employees`
-    (antes: direto de emails.json). Import feito dentro da função para
-    evitar import circular com db/base.py -> db/models.py -> ... -> utils.
+    Funcionários ativos lidos da tabela `employees`. Import feito dentro da
+    função para evitar import circular com db/base.py -> db/models.py -> ...
+    -> utils.
 
-    Mesma assinatura/retorno de antes: quem já chamava get_emails() em
-    agent.py ou api/auth.py não precisa mudar nada.
+    Erros do banco sobem: o CacheDecorator não guarda exceções, então uma
+    falha momentânea não fica presa no cache como lista vazia -- a próxima
+    chamada tenta de novo (e, com um valor vencido em cache, ele continua
+    sendo servido enquanto a releitura falha).
     """
     from db.base import SessionLocal
     from db.models import Employee
 
-    emails_list = []
     db = SessionLocal()
     try:
         rows = db.query(Employee).filter(Employee.ativo == True).all()  # noqa: E712
-        emails_list = [{"nome": r.nome, "email": r.email} for r in rows]
-    except Exception as e:
-        logger.error(f"Erro ao carregar employees do banco (utils/files.py): {e}")
+        return [{"nome": r.nome, "email": r.email} for r in rows]
     finally:
         db.close()
 
+
+def get_emails(agent: bool = False):
+    """
+    Lista de funcionários da SharkDev, agora lida da tabela `employees`
+    (antes: direto de emails.json).
+
+    Mesma assinatura/retorno de antes: quem já chamava get_emails() em
+    agent.py ou api/auth.py não precisa mudar nada -- inclusive a lista vazia
+    (com o erro no log) se o banco falhar.
+
+    Cacheado (a lista é lida a cada mensagem para o prompt do agente, mas
+    muda raramente): fresco por 5 minutos e, depois disso, ainda servido
+    enquanto é relido do banco em background. As rotas /admin/employees
+    chamam `invalidate_emails_cache()` a cada alteração, então a mudança
+    aparece na próxima mensagem.
+    """
+    try:
+        emails_list = _load_employees()
+    except Exception as e:
+        logger.error(f"Erro ao carregar employees do banco (utils/files.py): {e}")
+        emails_list = []
+
     if agent:
         return json.dumps(emails_list, ensure_ascii=False).replace("{", "{{").replace("}", "}}")
-    return emails_list
\ No newline at end of file
+    return emails_list
+
+
+def invalidate_emails_cache() -> None:
+    """Descarta a lista de funcionários em cache."""
+    _load_employees.invalidate()
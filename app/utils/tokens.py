@@ -0,0 +1,60 @@
+"""
+Estimativa de tokens para orçamento de contexto (agent/context.py).
+
+Não precisa ser exata -- serve para decidir quantas mensagens do histórico
+cabem no prompt, não para cobrar. Usa o tokenizer cl100k do tiktoken quando
+ele está disponível (vem junto com o langchain-openai) e, se não estiver ou
+não conseguir carregar o vocabulário (ex.: sem rede no primeiro uso), cai
+numa regra de ~4 caracteres por token, que é a ordem de grandeza dos
+tokenizers de Gemini/GPT/Claude para texto em português.
+"""
+
+import logging
+from threading import Lock
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+# Custo fixo por mensagem (papel, separadores) que os provedores somam ao texto.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding: Optional[Any] = None
+_encoding_loaded = False
+_encoding_lock = Lock()
+
+
+def _get_encoding() -> Optional[Any]:
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.info(f"tiktoken indisponível, estimando tokens por caracteres: {e}")
+                _encoding = None
+            _encoding_loaded = True
+    return _encoding
+
+
+def estimate_tokens(text: Any) -> int:
+    """Número aproximado de tokens de um texto (0 para vazio/None)."""
+    if not text:
+        return 0
+    text = str(text)
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """Tokens de uma mensagem no formato do histórico ({"role", "content"})."""
+    return estimate_tokens(message.get("content")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_messages_tokens(messages: Iterable[Dict[str, Any]]) -> int:
+    return sum(estimate_message_tokens(m) for m in messages)
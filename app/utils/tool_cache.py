@@ -1,14 +1,40 @@
 """
 utils/tool_cache.py
 Cache inteligente para resultados de ferramentas com TTL
+
+O cache vive o processo inteiro (um worker do Uvicorn pode ficar de pé por
+semanas) e guarda textos grandes -- concatenações de trechos de RAG, revisões
+de código completas. Por isso ele é limitado em DUAS dimensões:
+
+- número de entradas (max_entries) e
+- bytes aproximados dos resultados guardados (max_bytes).
+
+Ao passar de qualquer um dos limites, sai a entrada usada há mais tempo
+(LRU). Entradas expiradas saem na leitura ou pela varredura periódica
+(`start_sweeper`), então o cache nunca cresce além dos limites nem acumula
+lixo vencido em workers com pouco tráfego.
+
+Onde as entradas ficam guardadas é decidido pelo backend
+(utils/cache_backends.py, via TOOL_CACHE_BACKEND): em memória, por padrão,
+ou num SQLite/Redis compartilhado entre os workers. Esta classe cuida das
+chaves, do TTL e das estatísticas de acerto; o backend, do armazenamento e
+dos limites.
 """
 
+import asyncio
+import contextvars
+import functools
+import inspect
 import logging
 import hashlib
 import json
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import Future
+from datetime import timedelta
 from typing import Any, Dict, Optional
-from threading import Lock
+from threading import Event, Lock, Thread
+
+from utils.cache_backends import CacheBackend, MemoryCacheBackend, create_cache_backend
 
 logger = logging.getLogger(__name__)
 
@@ -19,33 +45,48 @@ class ToolResultCache:
     
     Características:
     - TTL (Time-To-Live) configurável por entrada
-    - Limpeza automática de expirados
+    - Limite de entradas e de bytes, com despejo LRU
+    - Varredura periódica de expirados em background
+    - Backend plugável (memória, SQLite local ou Redis)
     - Thread-safe com locks
     - Hash de argumentos para chaves
-    - Sem dependência externa
     """
     
-    def __init__(self, default_ttl_minutes: int = 10):
+    def __init__(
+        self,
+        default_ttl_minutes: int = 10,
+        max_entries: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        backend: Optional[CacheBackend] = None,
+    ):
         """
         Inicializa cache
         
         Args:
             default_ttl_minutes: TTL padrão em minutos
+            max_entries: Máximo de entradas guardadas (backend de memória padrão)
+            max_bytes: Orçamento aproximado de memória (backend de memória padrão)
+            backend: Onde guardar as entradas (None = memória do processo)
         """
         if default_ttl_minutes <= 0:
             raise ValueError("TTL deve ser > 0")
         
         self.default_ttl = timedelta(minutes=default_ttl_minutes)
-        self.cache: Dict[str, tuple] = {}  # {key: (resultado, timestamp, ttl)}
+        self.backend = backend or MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
         self.lock = Lock()
         self.stats = {
             "hits": 0,
             "misses": 0,
             "total_stored": 0,
-            "expired_cleaned": 0
+            "backend_errors": 0,
         }
+        self._stop = Event()
+        self._sweeper: Optional[Thread] = None
         
-        logger.info(f"ToolResultCache inicializado com TTL padrão: {default_ttl_minutes}m")
+        logger.info(
+            f"ToolResultCache inicializado com TTL padrão: {default_ttl_minutes}m "
+            f"(backend: {self.backend.name})"
+        )
 
     def _make_key(self, tool_name: str, **kwargs) -> str:
         """
@@ -69,6 +110,10 @@ class ToolResultCache:
             logger.warning(f"Erro ao gerar chave de cache: {e}")
             return f"fallback_{tool_name}_{id(kwargs)}"
 
+    def _count(self, stat: str) -> None:
+        with self.lock:
+            self.stats[stat] += 1
+
     def get(self, tool_name: str, **kwargs) -> Optional[Any]:
         """
         Recupera resultado em cache se ainda válido
@@ -78,7 +123,8 @@ class ToolResultCache:
             **kwargs: Argumentos da ferramenta
         
         Returns:
-            Resultado cacheado ou None se não encontrado/expirado
+            Resultado cacheado ou None se não encontrado/expirado (ou se o
+            backend estiver indisponível -- vira um miss, não um erro)
         
         Exemplo:
             >>> cache = ToolResultCache()
@@ -89,25 +135,21 @@ class ToolResultCache:
         """
         key = self._make_key(tool_name, **kwargs)
         
-        with self.lock:
-            if key not in self.cache:
-                self.stats["misses"] += 1
-                logger.debug(f"Cache miss: {tool_name}")
-                return None
-            
-            result, timestamp, ttl = self.cache[key]
-            
-            # Verificar se ainda válido
-            if datetime.now() - timestamp < ttl:
-                self.stats["hits"] += 1
-                logger.debug(f"Cache hit: {tool_name}")
-                return result
-            else:
-                # Remover expirado
-                del self.cache[key]
-                self.stats["misses"] += 1
-                logger.debug(f"Cache expirado: {tool_name}")
-                return None
+        try:
+            result = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Erro ao ler do cache ({self.backend.name}): {e}")
+            self._count("backend_errors")
+            result = None
+        
+        if result is None:
+            self._count("misses")
+            logger.debug(f"Cache miss: {tool_name}")
+            return None
+        
+        self._count("hits")
+        logger.debug(f"Cache hit: {tool_name}")
+        return result
 
     def set(
         self,
@@ -126,7 +168,8 @@ class ToolResultCache:
             **kwargs: Argumentos da ferramenta
         
         Returns:
-            bool: True se armazenado com sucesso
+            bool: True se armazenado com sucesso (False também quando o
+            resultado sozinho já passa de max_bytes)
         
         Exemplo:
             >>> cache = ToolResultCache()
@@ -139,17 +182,25 @@ class ToolResultCache:
         try:
             key = self._make_key(tool_name, **kwargs)
             ttl = timedelta(minutes=ttl_minutes) if ttl_minutes else self.default_ttl
-            
-            with self.lock:
-                self.cache[key] = (result, datetime.now(), ttl)
-                self.stats["total_stored"] += 1
+            stored = self.backend.set(key, result, ttl.total_seconds())
+            if stored:
+                self._count("total_stored")
                 logger.debug(f"Cache set: {tool_name} (TTL: {ttl.total_seconds()}s)")
-            
-            return True
+            else:
+                logger.debug(f"Cache: resultado de {tool_name} não guardado (grande demais)")
+            return stored
         except Exception as e:
             logger.error(f"Erro ao armazenar em cache: {e}")
+            self._count("backend_errors")
             return False
 
+    def delete(self, tool_name: str, **kwargs) -> None:
+        """Remove a entrada de `tool_name` com esses argumentos, se existir."""
+        try:
+            self.backend.delete(self._make_key(tool_name, **kwargs))
+        except Exception as e:
+            logger.warning(f"Erro ao remover do cache ({self.backend.name}): {e}")
+
     def clear(self) -> int:
         """
         Limpa todo o cache
@@ -157,11 +208,9 @@ class ToolResultCache:
         Returns:
             int: Número de entradas removidas
         """
-        with self.lock:
-            count = len(self.cache)
-            self.cache.clear()
-            logger.info(f"Cache limpo: {count} entradas removidas")
-            return count
+        count = self.backend.clear()
+        logger.info(f"Cache limpo: {count} entradas removidas")
+        return count
 
     def cleanup_expired(self) -> int:
         """
@@ -170,32 +219,42 @@ class ToolResultCache:
         Returns:
             int: Número de entradas expiradas removidas
         """
-        now = datetime.now()
-        expired_count = 0
+        expired_count = self.backend.cleanup_expired()
+        if expired_count > 0:
+            logger.debug(f"Limpeza de cache: {expired_count} entradas expiradas removidas")
+        return expired_count
+
+    def start_sweeper(self, interval_seconds: int) -> None:
+        """Inicia a thread que chama cleanup_expired() periodicamente (idempotente; <= 0 desativa)."""
+        if interval_seconds <= 0:
+            logger.info("ToolResultCache: varredura periódica desativada (intervalo <= 0)")
+            return
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
         
-        with self.lock:
-            expired_keys = []
-            
-            for key, (_, timestamp, ttl) in self.cache.items():
-                if now - timestamp >= ttl:
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                del self.cache[key]
-                expired_count += 1
-            
-            if expired_count > 0:
-                self.stats["expired_cleaned"] += expired_count
-                logger.debug(f"Limpeza de cache: {expired_count} entradas expiradas removidas")
+        self._stop.clear()
         
-        return expired_count
+        def loop():
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.cleanup_expired()
+                except Exception:
+                    logger.exception("ToolResultCache: erro na varredura de expirados")
+        
+        self._sweeper = Thread(target=loop, name="tool-cache-sweeper", daemon=True)
+        self._sweeper.start()
+        logger.info(f"ToolResultCache: varredura de expirados a cada {interval_seconds}s")
+
+    def stop_sweeper(self) -> None:
+        self._stop.set()
 
     def get_stats(self) -> Dict[str, Any]:
         """
         Retorna estatísticas do cache
         
         Returns:
-            Dict com estatísticas
+            Dict com estatísticas: acertos deste processo + ocupação e
+            contadores de despejo informados pelo backend
         
         Exemplo:
             >>> cache = ToolResultCache()
@@ -203,71 +262,77 @@ class ToolResultCache:
             >>> print(f"Taxa de acerto: {stats['hit_rate']:.2%}")
         """
         with self.lock:
-            total_requests = self.stats["hits"] + self.stats["misses"]
-            hit_rate = (
-                self.stats["hits"] / total_requests
-                if total_requests > 0
-                else 0
-            )
-            
-            return {
-                "size": len(self.cache),
-                "hits": self.stats["hits"],
-                "misses": self.stats["misses"],
-                "hit_rate": hit_rate,
-                "total_stored": self.stats["total_stored"],
-                "expired_cleaned": self.stats["expired_cleaned"],
-                "total_requests": total_requests
-            }
+            counters = dict(self.stats)
+        
+        total_requests = counters["hits"] + counters["misses"]
+        hit_rate = (
+            counters["hits"] / total_requests
+            if total_requests > 0
+            else 0
+        )
+        
+        try:
+            backend_stats = self.backend.stats()
+        except Exception as e:
+            logger.warning(f"Erro ao ler estatísticas do cache ({self.backend.name}): {e}")
+            backend_stats = {}
+        
+        return {
+            "backend": self.backend.name,
+            **backend_stats,
+            **counters,
+            "hit_rate": hit_rate,
+            "total_requests": total_requests
+        }
 
     def get_detailed_info(self) -> Dict[str, Any]:
         """
-        Retorna informações detalhadas do cache incluindo chaves
+        Retorna informações detalhadas do cache incluindo chaves (só o
+        backend de memória lista as entradas)
         
         Returns:
             Dict com informações detalhadas
         """
-        with self.lock:
-            entries = []
-            now = datetime.now()
-            
-            for key, (result, timestamp, ttl) in self.cache.items():
-                age = now - timestamp
-                expires_in = ttl - age
-                
-                entries.append({
-                    "key": key[:16] + "...",  # Truncar chave longa
-                    "age_seconds": int(age.total_seconds()),
-                    "ttl_seconds": int(ttl.total_seconds()),
-                    "expires_in_seconds": int(expires_in.total_seconds()),
-                    "result_type": type(result).__name__,
-                    "expired": expires_in.total_seconds() <= 0
-                })
-            
-            stats = self.get_stats()
-            stats["entries"] = entries
-            
-            return stats
+        stats = self.get_stats()
+        stats["entries"] = self.backend.entries()
+        return stats
 
     def __repr__(self) -> str:
         """Representação em string do cache"""
         stats = self.get_stats()
         return (
-            f"ToolResultCache(size={stats['size']}, "
+            f"ToolResultCache(backend={stats['backend']}, "
+            f"size={stats.get('size', '?')}, "
             f"hits={stats['hits']}, "
             f"misses={stats['misses']}, "
             f"hit_rate={stats['hit_rate']:.1%})"
         )
 
 
+async def run_cache_io(cache: ToolResultCache, func, *args, **kwargs):
+    """
+    Chama `func` (uma operação em `cache`) a partir de código async sem
+    bloquear o event loop: numa thread, se o backend faz I/O (SQLite,
+    Redis); direto, se é o de memória. O contexto (contextvars) vai junto.
+    """
+    if cache.backend.blocking_io:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+
 # Instância global
 _cache: Optional[ToolResultCache] = None
+_cache_lock = Lock()
 
 
 def get_tool_cache(ttl_minutes: int = 10) -> ToolResultCache:
     """
     Factory para obter instância singleton de ToolResultCache
     
+    Backend e limites vêm de Settings (TOOL_CACHE_BACKEND,
+    TOOL_CACHE_MAX_ENTRIES, TOOL_CACHE_MAX_BYTES, TOOL_CACHE_SQLITE_PATH e
+    REDIS_*).
+    
     Args:
         ttl_minutes: TTL padrão (ignorado se já inicializado)
     
@@ -281,65 +346,226 @@ def get_tool_cache(ttl_minutes: int = 10) -> ToolResultCache:
     global _cache
     
     if _cache is None:
-        _cache = ToolResultCache(default_ttl_minutes=ttl_minutes)
+        from utils.settings import WrappedSettings as Settings
+        
+        with _cache_lock:
+            if _cache is None:
+                config = Settings.tool_cache
+                backend = create_cache_backend(
+                    config["backend"],
+                    max_entries=config["max_entries"],
+                    max_bytes=config["max_bytes"],
+                    sqlite_path=config["sqlite_path"],
+                    redis_config=Settings.redis,
+                )
+                _cache = ToolResultCache(default_ttl_minutes=ttl_minutes, backend=backend)
     
     return _cache
 
 
 class CacheDecorator:
     """
-    Decorator para cachear resultados de funções automaticamente
+    Decorator para cachear resultados de funções automaticamente (síncronas
+    ou `async def`), com TTL.
+    
+    - Coalescência (single-flight): chamadas simultâneas com os mesmos
+      argumentos e cache vazio executam a função UMA vez; as demais esperam
+      e recebem o mesmo resultado (ou a mesma exceção -- exceções não são
+      cacheadas).
+    - Stale-while-revalidate (opcional, `stale_minutes`): vencido o TTL, o
+      valor antigo ainda é devolvido na hora por mais `stale_minutes`
+      enquanto uma atualização roda em background.
+    - Os argumentos são normalizados pela assinatura da função, então f(),
+      f(x=1) e f(1) (com x=1 de default) caem na mesma entrada.
+    
+    Por padrão usa o cache do processo (get_tool_cache(), com o backend
+    configurado -- o valor precisa ser serializável em JSON se o backend for
+    compartilhado). Com `local=True`, usa um cache em memória próprio, para
+    valores que não são serializáveis (ex.: objetos de cliente). Em funções
+    `async def`, a leitura e a gravação num backend compartilhado rodam numa
+    thread (`run_cache_io`), sem bloquear o event loop.
     
     Exemplo:
         >>> @CacheDecorator(ttl_minutes=30)
         ... def expensive_search(query: str) -> str:
         ...     return perform_search(query)
+        >>> expensive_search.invalidate("Python")  # remove uma entrada
     """
     
-    def __init__(self, ttl_minutes: int = 10):
-        """Inicializa decorator com TTL"""
-        self.cache = get_tool_cache(ttl_minutes)
-        self.ttl = ttl_minutes
+    def __init__(
+        self,
+        ttl_minutes: float = 10,
+        stale_minutes: float = 0,
+        local: bool = False,
+        name: Optional[str] = None,
+    ):
+        """
+        Inicializa decorator com TTL
+        
+        Args:
+            ttl_minutes: Por quanto tempo o valor é considerado fresco
+            stale_minutes: Janela extra em que o valor vencido ainda é
+                servido enquanto é recalculado em background (0 = desligado)
+            local: Cache em memória exclusivo deste decorator
+            name: Nome da entrada no cache (padrão: módulo.função). Duas
+                funções com o mesmo `name` e os mesmos argumentos
+                compartilham o resultado (ex.: versões sync e async).
+        """
+        if ttl_minutes <= 0 or stale_minutes < 0:
+            raise ValueError("ttl_minutes deve ser > 0 e stale_minutes >= 0")
+        self.ttl_seconds = ttl_minutes * 60
+        self.stale_seconds = stale_minutes * 60
+        self.name = name
+        self._cache: Optional[ToolResultCache] = (
+            ToolResultCache(default_ttl_minutes=max(1, int(ttl_minutes)), max_entries=256) if local else None
+        )
+        self._lock = Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[tuple, "asyncio.Task"] = {}
+        self._background: set = set()
+    
+    @property
+    def cache(self) -> ToolResultCache:
+        return self._cache if self._cache is not None else get_tool_cache()
     
     def __call__(self, func):
         """Wrap da função"""
-        def wrapper(*args, **kwargs):
-            # Criar chave a partir do nome da função e argumentos
-            key = self.cache._make_key(func.__name__, *args, **kwargs)
+        name = self.name or f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+        
+        def key_args(args, kwargs) -> Dict[str, Any]:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return {"call": bound.arguments}
+        
+        def lookup(args, kwargs):
+            """(chave, entrada em cache ou None)."""
+            kw = key_args(args, kwargs)
+            return self.cache._make_key(name, **kw), kw, self.cache.get(name, **kw)
+        
+        def store(kw: Dict[str, Any], value: Any) -> None:
+            entry = {"value": value, "fresh_until": time.time() + self.ttl_seconds}
+            self.cache.set(name, entry, ttl_minutes=(self.ttl_seconds + self.stale_seconds) / 60, **kw)
+        
+        def is_fresh(entry: Dict[str, Any]) -> bool:
+            return time.time() < entry["fresh_until"]
+        
+        if inspect.iscoroutinefunction(func):
+            async def compute_async(key: str, kw: Dict[str, Any], args, kwargs) -> Any:
+                loop_key = (id(asyncio.get_running_loop()), key)
+                with self._lock:
+                    task = self._ainflight.get(loop_key)
+                    if task is None:
+                        async def run():
+                            try:
+                                value = await func(*args, **kwargs)
+                                await run_cache_io(self.cache, store, kw, value)
+                                return value
+                            finally:
+                                with self._lock:
+                                    self._ainflight.pop(loop_key, None)
+                        task = asyncio.ensure_future(run())
+                        self._ainflight[loop_key] = task
+                # shield: se quem chamou for cancelado, a execução segue para os demais
+                return await asyncio.shield(task)
             
-            # Verificar cache
-            result = self.cache.get(func.__name__, *args, **kwargs)
-            if result is not None:
-                logger.debug(f"Cache hit para {func.__name__}")
-                return result
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key, kw, entry = await run_cache_io(self.cache, lookup, args, kwargs)
+                if entry is not None:
+                    if not is_fresh(entry):
+                        logger.debug(f"Cache vencido para {name}, atualizando em background")
+                        refresh = asyncio.ensure_future(compute_async(key, kw, args, kwargs))
+                        self._background.add(refresh)
+                        refresh.add_done_callback(self._background_done)
+                    return entry["value"]
+                logger.debug(f"Cache miss para {name}, executando...")
+                return await compute_async(key, kw, args, kwargs)
             
-            # Executar função
-            logger.debug(f"Cache miss para {func.__name__}, executando...")
-            result = func(*args, **kwargs)
+            wrapper = async_wrapper
+        else:
+            def compute(key: str, kw: Dict[str, Any], args, kwargs) -> Any:
+                with self._lock:
+                    future = self._inflight.get(key)
+                    leader = future is None
+                    if leader:
+                        future = Future()
+                        self._inflight[key] = future
+                if not leader:
+                    return future.result()
+                try:
+                    value = func(*args, **kwargs)
+                    store(kw, value)
+                    future.set_result(value)
+                    return value
+                except BaseException as e:
+                    future.set_exception(e)
+                    raise
+                finally:
+                    with self._lock:
+                        self._inflight.pop(key, None)
             
-            # Armazenar em cache
-            self.cache.set(
-                func.__name__,
-                result,
-                ttl_minutes=self.ttl,
-                *args,
-                **kwargs
-            )
+            @functools.wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                key, kw, entry = lookup(args, kwargs)
+                if entry is not None:
+                    if not is_fresh(entry):
+                        with self._lock:
+                            refreshing = key in self._inflight
+                        if not refreshing:
+                            logger.debug(f"Cache vencido para {name}, atualizando em background")
+                            Thread(
+                                target=contextvars.copy_context().run,
+                                args=(self._refresh_quietly, compute, key, kw, args, kwargs),
+                                daemon=True,
+                            ).start()
+                    return entry["value"]
+                logger.debug(f"Cache miss para {name}, executando...")
+                return compute(key, kw, args, kwargs)
             
-            return result
+            wrapper = sync_wrapper
+        
+        def invalidate(*args, **kwargs) -> None:
+            """Remove a entrada correspondente a esses argumentos."""
+            self.cache.delete(name, **key_args(args, kwargs))
         
+        wrapper.invalidate = invalidate
         return wrapper
+    
+    @staticmethod
+    def _refresh_quietly(compute, *args) -> None:
+        try:
+            compute(*args)
+        except Exception as e:
+            logger.warning(f"Falha ao atualizar cache em background: {e}")
+    
+    def _background_done(self, task: "asyncio.Task") -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Falha ao atualizar cache em background: {task.exception()}")
 
 
 if __name__ == "__main__":
     # Script de teste
-    cache = ToolResultCache(default_ttl_minutes=1)
+    cache = ToolResultCache(default_ttl_minutes=1, max_entries=3, max_bytes=2000)
     
     # Testar set/get
     cache.set("TestTool", "result1", query="test")
     result = cache.get("TestTool", query="test")
     print(f"✅ Set/Get: {result == 'result1'}")
     
+    # Testar LRU: "test" é lido de novo antes de "d" entrar, então quem sai é "b"
+    cache.set("TestTool", "b", query="b")
+    cache.set("TestTool", "c", query="c")
+    cache.get("TestTool", query="test")
+    cache.set("TestTool", "d", query="d")
+    print(f"✅ LRU (entradas): {cache.get('TestTool', query='test') == 'result1' and cache.get('TestTool', query='b') is None}")
+    
+    # Testar orçamento de bytes
+    cache.set("TestTool", "x" * 1200, query="grande")
+    cache.set("TestTool", "y" * 5000, query="enorme")
+    print(f"✅ Bytes: {cache.get_stats()['bytes'] <= cache.backend.max_bytes}")
+    
     # Testar stats
     stats = cache.get_stats()
     print(f"✅ Stats: {stats}")
@@ -347,4 +573,51 @@ if __name__ == "__main__":
     
     # Testar cleanup
     cache.cleanup_expired()
-    print(f"✅ Cleanup: OK")
\ No newline at end of file
+    print(f"✅ Cleanup: OK")
+    print(f"✅ Detalhes: {len(cache.get_detailed_info()['entries'])} entradas")
+    
+    # Testar backend SQLite: duas instâncias (como dois workers) no mesmo arquivo
+    import os
+    import tempfile
+    from utils.cache_backends import SQLiteCacheBackend
+    
+    path = os.path.join(tempfile.mkdtemp(), "tool_cache.db")
+    worker_a = ToolResultCache(backend=SQLiteCacheBackend(path))
+    worker_b = ToolResultCache(backend=SQLiteCacheBackend(path))
+    worker_a.set("TestTool", "compartilhado " * 200, query="sqlite")
+    print(f"✅ SQLite compartilhado: {worker_b.get('TestTool', query='sqlite') == 'compartilhado ' * 200}")
+    print(f"   Stats SQLite: {worker_b.get_stats()}")
+    
+    # Testar limites do SQLite: os totais (mantidos por trigger) batem com a tabela
+    limitado = SQLiteCacheBackend(os.path.join(tempfile.mkdtemp(), "tool_cache.db"), max_entries=3, max_bytes=4000)
+    for i in range(5):
+        limitado.set(f"k{i}", "v" * 900, 60)
+    limitado.set("k4", "curto", 60)
+    entradas, total = limitado._conn.execute("SELECT COUNT(*), SUM(size) FROM tool_cache").fetchone()
+    stats = limitado.stats()
+    print(f"✅ SQLite limites: {stats['size'] == entradas <= 3 and stats['bytes'] == total <= 4000}")
+    
+    # Testar backend Redis (com fakeredis, se estiver instalado)
+    try:
+        import fakeredis
+    except ImportError:
+        print("⚠️  Redis: fakeredis não instalado, pulando (pip install fakeredis)")
+    else:
+        from utils.cache_backends import RedisCacheBackend
+        
+        servidor = fakeredis.FakeServer()
+        redis_a = ToolResultCache(backend=RedisCacheBackend(client=fakeredis.FakeRedis(server=servidor)))
+        redis_b = ToolResultCache(backend=RedisCacheBackend(client=fakeredis.FakeRedis(server=servidor)))
+        redis_a.set("TestTool", "compartilhado " * 200, query="redis")
+        print(f"✅ Redis compartilhado: {redis_b.get('TestTool', query='redis') == 'compartilhado ' * 200}")
+        
+        redis_a.backend.set("curto", "valor", ttl_seconds=0.05)
+        time.sleep(0.1)
+        print(f"✅ Redis TTL: {redis_a.backend.get('curto') is None}")
+        
+        outro = fakeredis.FakeRedis(server=servidor)
+        outro.set("outra:chave", "x")
+        redis_b.backend.set("apagar", "valor", ttl_seconds=60)
+        redis_b.backend.delete("apagar")
+        limpas = redis_a.backend.clear()
+        print(f"✅ Redis delete/clear: {redis_b.backend.get('apagar') is None and limpas == 1 and outro.get('outra:chave') == b'x'}")